@@ -4,9 +4,25 @@ Agentnode实现
 简化的Agent实现，支持Leader和Backup角色
 """
 
+import contextvars
+import threading
 import time
 import random
-from typing import Dict, List, Optional, Callable
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Callable, Tuple
+
+import arith
+from answers import answer_class, equivalent
+from inbox import Inbox, DROP_OLDEST
+from llm_modules.breaker import ABSTAIN
+from llm_modules.context import remaining_time
+from verdicts import VerdictCache
+from verifiers import VerifierChain
+
+# 等待presolve结果的最长时间（秒）
+PRESOLVE_WAIT_SECONDS = 5.0
+# 有共识阶段截止时间时，等待presolve最多占用剩余时间的比例（其余留给完整验证）
+PRESOLVE_WAIT_RATIO = 0.25
 
 
 class Agent:
@@ -22,6 +38,11 @@ class Agent:
         role_config: Optional[Dict] = None,  # 专业领域角色配置
         malicious_peers: Optional[List[str]] = None,  # 恶意同伙列表
         malicious_answers_config: Optional[Dict] = None,  # 恶意节点的硬编码错误答案
+        inbox_capacity: int = 256,
+        inbox_policy: str = DROP_OLDEST,
+        verifiers: Optional[VerifierChain] = None,
+        verdict_cache: Optional[VerdictCache] = None,
+        samples: int = 1,
     ):
         """
         initAgent
@@ -35,12 +56,25 @@ class Agent:
             role_config: 专业领域角色配置（如：数学专家、逻辑分析师等）
             malicious_peers: 恶意同伙的ID列表（用于协同攻击）
             malicious_answers_config: 恶意节点的硬编码错误答案配置
+            inbox_capacity: 收件箱容量（消息数）
+            inbox_policy: 收件箱溢出策略 drop_oldest | drop_newest | block
+            verifiers: 确定性验证器链，验证时先于LLM运行（None表示不使用）
+            verdict_cache: 本节点的验证结论缓存，跨视图复用对相同答案的结论（None表示不使用）
+            samples: 作为leader时并发采样的次数，>1时按多数答案提案（自洽性）
         """
         self.id = agent_id
         self.role = role  # BFT协议角色：leader/backup
         self.reputation = reputation
         self.is_malicious = is_malicious
         self.llm_caller = llm_caller
+        self.verifiers = verifiers
+        self.verdict_cache = verdict_cache
+        self.samples = samples
+
+        # presolve模式下本节点对当前任务的独立解题 (任务内容, Future)
+        self._presolved = None
+        self.presolve_stats = {"matches": 0, "mismatches": 0, "timeouts": 0}
+        self._presolve_lock = threading.Lock()
 
         # 恶意答案配置（用于恶意节点生成固定的错误答案）
         self.malicious_answers_config = malicious_answers_config or {}
@@ -56,7 +90,7 @@ class Agent:
 
         # 状态
         self.last_seen = time.time()
-        self.message_queue = []
+        self.inbox = Inbox(capacity=inbox_capacity, policy=inbox_policy)
 
     def propose(self, task: Dict) -> Dict:
         """
@@ -90,7 +124,10 @@ class Agent:
         prompt = self._build_generation_prompt(task["content"])
 
         # 调用LLM生成reasoning
-        if self.llm_caller:
+        confidence = 0.95
+        if self.llm_caller and self.samples > 1:
+            reasoning, answer, confidence = self._self_consistent_generate(prompt)
+        elif self.llm_caller:
             reasoning, answer = self.llm_caller.generate(prompt)
         else:
             # 简单模拟
@@ -100,16 +137,107 @@ class Agent:
         proposal = {
             "task_id": task.get("task_id", f"task_{int(time.time())}"),
             "task_content": task.get("content", ""),  # 添加原始问题内容
+            "task_type": task.get("type"),
             "leader_id": self.id,
             "reasoning": reasoning,
             "answer": answer,
-            "confidence": 0.95,
+            "confidence": confidence,
             "timestamp": time.time(),
             "leader_specialty": self.specialty,  # 添加leader的专业领域
         }
 
         return proposal
 
+    def presolve(self, task: Dict) -> Optional[str]:
+        """
+        Backup: 在leader生成提案的同时独立解题（presolve模式）
+
+        Returns:
+            本节点的答案；恶意节点、没有LLM或生成失败时为None
+        """
+        if self.is_malicious or not self.llm_caller:
+            return None
+        prompt = self._build_generation_prompt(task["content"])
+        # 独立采样，不命中leader相同提示的响应缓存
+        _, answer = self.llm_caller.generate(prompt, independent=True)
+        return None if answer == "Error" else answer
+
+    def expect_presolved(self, task_content: str, future: Future):
+        """记录进行中的presolve，验证该任务的提案时比对其答案"""
+        self._presolved = (task_content, future)
+
+    def has_presolved(self, task_content: str) -> bool:
+        return self._presolved is not None and self._presolved[0] == task_content
+
+    def clear_presolved(self):
+        self._presolved = None
+
+    def _presolved_decision(self, proposal: Dict) -> Optional[str]:
+        """
+        与presolve答案比对：等价时为Y；不一致、未完成或失败时为None（回退到完整验证）
+
+        presolve尚未完成时最多等待min(PRESOLVE_WAIT_SECONDS, 剩余时间 * PRESOLVE_WAIT_RATIO)秒，
+        超时按没有presolve结果处理，剩余时间留给完整验证
+        """
+        presolved = self._presolved
+        if presolved is None:
+            return None
+        task_content, future = presolved
+        if task_content != proposal.get("task_content"):
+            return None
+        budget = remaining_time()
+        try:
+            wait = PRESOLVE_WAIT_SECONDS if budget is None else min(PRESOLVE_WAIT_SECONDS, max(0.0, budget) * PRESOLVE_WAIT_RATIO)
+            answer = future.result(timeout=wait)
+        except FutureTimeoutError:
+            self._count_presolve("timeouts")
+            return None
+        except Exception:
+            return None
+        if answer is None:
+            return None
+        if equivalent(answer, proposal.get("answer")):
+            self._count_presolve("matches")
+            return "Y"
+        self._count_presolve("mismatches")
+        print(f"[{self.id}] 提案答案与本节点presolve答案 {answer} 不一致，进行完整验证")
+        return None
+
+    def _count_presolve(self, key: str):
+        with self._presolve_lock:
+            self.presolve_stats[key] += 1
+
+    def _self_consistent_generate(self, prompt: str) -> Tuple[list, str, float]:
+        """
+        自洽性生成：并发独立采样self.samples次，按答案等价类多数投票
+
+        k次调用在线程池中并发执行，在同一个延迟窗口内完成（不新建事件循环，可在运行中的
+        事件循环内调用）；失败的采样不参与投票
+
+        Returns:
+            (多数答案的推理过程, 多数答案, 置信度=多数票数/有效采样数)
+        """
+        with ThreadPoolExecutor(max_workers=self.samples, thread_name_prefix=f"{self.id}-sample") as executor:
+            # 工作线程中沿用当前上下文（如共识阶段设置的截止时间），每个采样一份副本
+            futures = [
+                executor.submit(contextvars.copy_context().run, self.llm_caller.generate, prompt, independent=True)
+                for _ in range(self.samples)
+            ]
+        results = [future.result() for future in futures if future.exception() is None]
+        valid = [r for r in results if r[1] != "Error"]
+        if not valid:
+            return ["API调用失败"], "Error", 0.0
+
+        groups: Dict[int, List[Tuple[list, str]]] = {}
+        for reasoning, answer in valid:
+            groups.setdefault(answer_class(answer), []).append((reasoning, answer))
+        # 票数相同时取最先出现的答案（dict保持插入顺序）
+        majority = max(groups.values(), key=len)
+        reasoning, answer = majority[0]
+        confidence = len(majority) / len(valid)
+        print(f"[{self.id}] 自洽性采样: {len(majority)}/{len(valid)} 个样本答案为 {answer}")
+        return reasoning, answer, confidence
+
     def validate(self, proposal: Dict) -> Dict:
         """
         Backup: validateproposal
@@ -121,7 +249,7 @@ class Agent:
             vote字典 {
                 "voter_id": "...",
                 "proposal_hash": "...",
-                "decision": "Y",  # Y or N
+                "decision": "Y",  # Y or N（LLM后端熔断时为ABSTAIN）
                 "confidence": 0.9,
                 "reason": "..."
             }
@@ -130,18 +258,112 @@ class Agent:
         if self.is_malicious:
             return self._malicious_vote_with_strategy(proposal)
 
+        # 确定性验证器能判定时不再调用LLM
+        decision = self._verify(proposal)
+        if decision is not None:
+            return self._make_vote(proposal, decision)
+
+        # 已评价过语义相同的提案（如视图切换后新leader给出相同答案）：直接复用结论
+        decision = self._cached_verdict(proposal)
+        if decision is not None:
+            return self._make_vote(proposal, decision)
+
+        # presolve模式：与本节点独立解出的答案一致时直接投Y，不一致才做完整的LLM验证
+        decision = self._presolved_decision(proposal)
+        if decision is not None:
+            self._store_verdict(proposal, decision)
+            return self._make_vote(proposal, decision)
+
+        # LLM后端已全部熔断：立即弃权，不让法定人数统计等待本节点超时
+        if self.llm_caller and not self._llm_available():
+            print(f"[{self.id}] LLM后端已熔断，弃权")
+            return self._make_vote(proposal, ABSTAIN)
+
         # 诚实backup的正常逻辑
         # 构建带有角色信息的验证prompt
         enhanced_proposal = self._build_validation_prompt(proposal)
 
         # 正常validate逻辑
         if self.llm_caller:
-            decision = self.llm_caller.validate(enhanced_proposal)
+            decision, failed = self._llm_validate(enhanced_proposal)
+            # 后端全部失败时的占位结论不写入结论缓存，否则短暂故障会变成之后各视图的永久N
+            if not failed:
+                self._store_verdict(proposal, decision)
         else:
             # 简单validate：检查proposal是否合理
             decision = "Y" if self._is_valid_proposal(proposal) else "N"
 
-        vote = {
+        return self._make_vote(proposal, decision)
+
+    def validate_batch(self, proposals: List[Dict]) -> List[Dict]:
+        """
+        Backup: 一次LLM调用批量validate多个proposal（如一批任务或多个并行leader的候选）
+
+        Args:
+            proposals: proposal列表
+
+        Returns:
+            与输入顺序一致的vote列表
+        """
+        if self.is_malicious:
+            return [self._malicious_vote_with_strategy(proposal) for proposal in proposals]
+
+        # 验证器能判定的提案不进入LLM批次
+        decisions = [self._verify(proposal) for proposal in proposals]
+        decisions = [d if d is not None else self._cached_verdict(p) for p, d in zip(proposals, decisions)]
+        decisions = [d if d is not None else self._presolved_decision(p) for p, d in zip(proposals, decisions)]
+        pending = [i for i, decision in enumerate(decisions) if decision is None]
+
+        if pending and self.llm_caller and not self._llm_available():
+            for i in pending:
+                decisions[i] = ABSTAIN
+        elif pending and self.llm_caller:
+            enhanced = [self._build_validation_prompt(proposals[i]) for i in pending]
+            for i, (decision, failed) in zip(pending, self._llm_validate_batch(enhanced)):
+                decisions[i] = decision
+                if not failed:
+                    self._store_verdict(proposals[i], decision)
+        else:
+            for i in pending:
+                decisions[i] = "Y" if self._is_valid_proposal(proposals[i]) else "N"
+
+        return [self._make_vote(proposal, decision) for proposal, decision in zip(proposals, decisions)]
+
+    def _verify(self, proposal: Dict) -> Optional[str]:
+        """运行确定性验证器链，无法判定时返回None"""
+        if self.verifiers is None:
+            return None
+        return self.verifiers.verify(proposal)
+
+    def _cached_verdict(self, proposal: Dict) -> Optional[str]:
+        if self.verdict_cache is None:
+            return None
+        return self.verdict_cache.get(proposal)
+
+    def _store_verdict(self, proposal: Dict, decision: str):
+        if self.verdict_cache is not None:
+            self.verdict_cache.put(proposal, decision)
+
+    def _llm_validate(self, proposal: Dict) -> Tuple[str, bool]:
+        """LLM验证，返回 (结论, 是否所有后端均失败)"""
+        validate = getattr(self.llm_caller, "validate_with_status", None)
+        if validate is None:
+            return self.llm_caller.validate(proposal), False
+        return validate(proposal)
+
+    def _llm_validate_batch(self, proposals: List[Dict]) -> List[Tuple[str, bool]]:
+        validate_batch = getattr(self.llm_caller, "validate_batch_with_status", None)
+        if validate_batch is None:
+            return [(decision, False) for decision in self.llm_caller.validate_batch(proposals)]
+        return validate_batch(proposals)
+
+    def _llm_available(self) -> bool:
+        """LLM调用入口是否有可用（未熔断）的后端"""
+        available = getattr(self.llm_caller, "available", None)
+        return available() if available is not None else True
+
+    def _make_vote(self, proposal: Dict, decision: str) -> Dict:
+        return {
             "voter_id": self.id,
             "proposal_hash": self._hash_proposal(proposal),
             "decision": decision,
@@ -149,12 +371,10 @@ class Agent:
             "voter_specialty": self.specialty,  # 添加验证者的专业领域
         }
 
-        return vote
-
-    def receive_message(self, message: Dict):
-        """接收消息"""
-        self.message_queue.append(message)
+    def receive_message(self, message: Dict) -> bool:
+        """接收消息，返回是否被收件箱接收"""
         self.last_seen = time.time()
+        return self.inbox.put(message)
 
     def heartbeat(self):
         """更新心跳"""
@@ -271,6 +491,7 @@ class Agent:
         proposal = {
             "task_id": task_id_for_proposal,
             "task_content": task_content,  # 添加原始问题内容
+            "task_type": task.get("type"),
             "leader_id": self.id,
             "reasoning": reasoning,
             "answer": wrong_answer,
@@ -351,14 +572,13 @@ class Agent:
 
     def _mock_answer(self, question: str) -> str:
         """简单的Mock回答"""
-        try:
-            # 尝试计算数学表达式
-            if "=" in question:
-                expr = question.split("=")[0].strip()
-                result = eval(expr)
-                return str(result)
-        except:
-            pass
+        # 尝试计算数学表达式（安全求值，结果带缓存）
+        solved = arith.solve(question) if "=" in question else None
+        if solved is not None:
+            try:
+                return str(solved[1])
+            except ValueError:
+                pass
         return "Mock Answer"
 
     def _is_valid_proposal(self, proposal: Dict) -> bool:
@@ -405,6 +625,12 @@ def create_agents(
     llm_caller: Optional[Callable] = None,
     role_configs: Optional[List[Dict]] = None,
     random_assignment: bool = True,
+    inbox_capacity: int = 256,
+    inbox_policy: str = DROP_OLDEST,
+    llm_pool=None,
+    verifiers: Optional[VerifierChain] = None,
+    verdict_cache: Optional[Dict] = None,
+    self_consistency: Optional[Dict] = None,
 ) -> List[Agent]:
     """
     创建Agent列表
@@ -412,14 +638,21 @@ def create_agents(
     Args:
         num_agents: Agent总数
         malicious_ratio: maliciousnode比例
-        llm_caller: LLM调用函数（所有agent共享同一个LLM）
+        llm_caller: LLM调用函数（未使用后端池时所有agent共享同一个LLM）
         role_configs: 角色配置列表（可选）
         random_assignment: 是否随机分配角色（True=随机，False=按顺序）
+        inbox_capacity: 每个Agent收件箱容量
+        inbox_policy: 收件箱溢出策略
+        llm_pool: 后端池（llm_pool.BackendPool），给定时按Agent分配各自的后端，忽略llm_caller
+        verifiers: 所有Agent共享的确定性验证器链
+        verdict_cache: 验证结论缓存配置 {"enabled": True, "capacity": 1024}，每个Agent各自一份
+        self_consistency: leader自洽性采样配置 {"enabled": True, "samples": 5}
 
     Returns:
         Agent列表
     """
     agents = []
+    samples = self_consistency.get("samples", 1) if self_consistency and self_consistency.get("enabled", True) else 1
 
     num_malicious = int(num_agents * malicious_ratio)
 
@@ -452,9 +685,14 @@ def create_agents(
             role="backup",  # 初始都是backup，后续选举leader
             reputation=1.0,
             is_malicious=is_malicious,
-            llm_caller=llm_caller,
+            llm_caller=llm_pool.caller_for(agent_id) if llm_pool is not None else llm_caller,
             role_config=assigned_roles[i],  # 分配角色配置
             malicious_peers=[],  # 先设置为空列表，稍后填充
+            inbox_capacity=inbox_capacity,
+            inbox_policy=inbox_policy,
+            verifiers=verifiers,
+            verdict_cache=VerdictCache.from_config(verdict_cache),
+            samples=samples,
         )
 
         agents.append(agent)
@@ -0,0 +1,143 @@
+"""
+答案规范化与等价类
+
+各后端返回的答案形式各异（"4"、"4.0"、"答案是4"、整段文字），
+这里把数值、布尔与短文本答案规范化为统一写法，再映射为整数等价类ID：
+缓存、结论复用与准确率统计只需比较整数，无需反复解析字符串或调用LLM。
+"""
+
+import re
+import threading
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Dict, Optional
+
+# 超过该长度的答案视为段落，只取其中的最终答案/末尾数值
+SHORT_TEXT_LIMIT = 32
+
+# 答案前缀（"答案是"、"最终答案:"、"The answer is"等）
+_PREFIX = re.compile(r"^(?:最终答案|答案|结果|answer|the answer|final answer)\s*(?:是|为|is)?\s*[:：=]?\s*", re.I)
+# 段落中最后一个答案标记之后的内容
+_ANSWER_MARKER = re.compile(r"(?:最终答案|答案|answer)\s*(?:是|为|is)?\s*[:：=]\s*", re.I)
+# 数值（允许千分位逗号）+ 可选的短单位
+_NUMBER = re.compile(r"^([-+]?\d[\d,]*(?:\.\d+)?)\s*(%|[^\d\s.,;:!?]{1,3})?$")
+# 以"等于/是/="引出的末尾数值（"23乘以47等于1081"）
+_STATED_NUMBER = re.compile(r"(?:等于|是|为|=|\bis|\bequals)\s*([-+]?\d[\d,]*(?:\.\d+)?)\s*(%|[^\d\s.,;:!?]{1,3})?$")
+# 数值前的否定（"不是4"、"并非4"、"is not 4"），此时该数值不是答案
+_NEGATED = re.compile(r"(?:[不非]\s*(?:是|为|等于)?|没有|\bnot(?:\s+equal\s+to)?|isn't|≠)\s*$")
+# 段落末尾的数值（后面可跟单位）
+_TRAILING_NUMBER = re.compile(r"([-+]?\d[\d,]*(?:\.\d+)?)\s*(%|[^\d\s.,;:!?]{1,3})?$")
+# normalize_answer输出的数值形式
+_CANONICAL_NUMBER = re.compile(r"^-?\d+(?:\.\d+)?$")
+# 只计数、不改变数值含义的量词与货币单位（"5个"、"5个苹果"、"5岁"、"5元"），
+# 其后可跟名词；其他单位（cm、km、kg、%等）保留，"5cm"与"5km"属于不同等价类
+_COUNT_UNITS = frozenset("个只人名本件条次岁张颗位辆头支瓶杯份元块")
+_PUNCTUATION = " \t\n\"'`*。.!！,，;；:：、"
+
+_BOOLEANS = {
+    "是": "true", "对": "true", "正确": "true", "会": "true", "yes": "true", "true": "true", "y": "true",
+    "否": "false", "不是": "false", "不对": "false", "错误": "false", "不会": "false",
+    "no": "false", "false": "false", "n": "false",
+}
+
+
+def _canonical_number(number: str, unit: Optional[str]) -> Optional[str]:
+    try:
+        value = Decimal(number.replace(",", ""))
+    except InvalidOperation:
+        return None
+    text = format(value.normalize(), "f")
+    if text in ("-0", "+0"):
+        text = "0"
+    # 量词去掉；其他单位（含%）改变数值含义，保留
+    if not unit or unit[0] in _COUNT_UNITS:
+        return text
+    return f"{text}{unit}"
+
+
+@lru_cache(maxsize=65536)
+def normalize_answer(answer) -> str:
+    """
+    规范化答案
+
+    - 全角转半角、去掉markdown标记与首尾标点、合并空白、忽略大小写
+    - 去掉"答案是"、"The answer is"等前缀；段落取最后一个答案标记之后的内容
+    - 数值统一写法: "4.0" -> "4"，"1,081" -> "1081"，"5岁" -> "5"，"5 cm" -> "5cm"；
+      "……等于1081"取该数值，段落以数值结尾时取该数值（"不是4"等否定除外）
+    - 布尔: 是/对/yes/true -> "true"，否/错误/no/false -> "false"
+    """
+    text = unicodedata.normalize("NFKC", str(answer or ""))
+    text = " ".join(text.split()).strip(_PUNCTUATION).casefold()
+    if len(text) > SHORT_TEXT_LIMIT:
+        parts = _ANSWER_MARKER.split(text)
+        if len(parts) > 1:
+            text = parts[-1].strip(_PUNCTUATION)
+    text = _PREFIX.sub("", text).strip(_PUNCTUATION)
+
+    match = _NUMBER.match(text) or _STATED_NUMBER.search(text)
+    if match is None and len(text) > SHORT_TEXT_LIMIT:
+        match = _TRAILING_NUMBER.search(text)
+    if match is not None and _NEGATED.search(text, 0, match.start(1)):
+        match = None
+    if match is not None:
+        number = _canonical_number(match.group(1), match.group(2))
+        if number is not None:
+            return number
+    return _BOOLEANS.get(text, text)
+
+
+def to_number(answer) -> Optional[float]:
+    """规范化后为数值的答案转换为float（百分数按百分比换算），否则为None"""
+    text = normalize_answer(answer)
+    scale = 1.0
+    if text.endswith("%"):
+        text, scale = text[:-1], 0.01
+    if not _CANONICAL_NUMBER.match(text):
+        return None
+    return float(text) * scale
+
+
+class AnswerClasses:
+    """规范化答案 -> 整数等价类ID（线程安全；clear之后ID重新分配）"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def class_id(self, answer) -> int:
+        key = normalize_answer(answer)
+        class_id = self._ids.get(key)
+        if class_id is None:
+            with self._lock:
+                class_id = self._ids.setdefault(key, len(self._ids))
+        return class_id
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+    def __len__(self):
+        return len(self._ids)
+
+
+_classes = AnswerClasses()
+
+
+def answer_class(answer) -> int:
+    """答案的等价类ID（全局表，每个任务开始时由reset_answer_classes清空）"""
+    return _classes.class_id(answer)
+
+
+def reset_answer_classes():
+    """
+    清空全局等价类表，避免长时间运行时无限增长
+
+    之前分配的ID随之失效，持有ID的缓存（如VerdictCache）须同时清空
+    """
+    _classes.clear()
+
+
+def equivalent(a, b) -> bool:
+    """两个答案是否属于同一等价类"""
+    return answer_class(a) == answer_class(b)
@@ -0,0 +1,140 @@
+"""
+安全的算术表达式求值（Mock生成与验证共用）
+
+替代对提示文本的eval()：只接受数字与 + - * / // % ** 及括号，
+任务内容中的任意代码不会被执行。求值结果按规范化后的表达式缓存，
+同一任务在多个视图、多个验证者之间只解析计算一次。
+"""
+
+import ast
+import operator
+import re
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+Number = Union[int, float]
+
+MAX_EXPRESSION_LENGTH = 200
+MAX_EXPONENT = 100
+# 整数结果的位数上限（约2400位十进制，低于int转str的默认4300位限制）
+MAX_RESULT_BITS = 8192
+CACHE_SIZE = 65536
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+# 书写习惯 -> Python运算符
+_SYMBOLS = str.maketrans({"×": "*", "÷": "/", "（": "(", "）": ")"})
+# 文本中连续的算术片段，须含"数字 运算符 数字/括号"
+_EXPRESSION_RUN = re.compile(r"[\d.\s+\-*/%^×÷()（）]+")
+_HAS_OPERATOR = re.compile(r"\d\s*(?:\*\*|//|[+\-*/%^×÷])\s*[\d(（+\-]")
+
+
+def normalize_expression(expr: str) -> str:
+    """去掉空白并统一运算符写法（×÷、全角括号、^表示乘方），作为缓存键"""
+    return "".join(expr.translate(_SYMBOLS).split()).replace("^", "**")
+
+
+def _check_power(base: Number, exponent: Number):
+    """乘方前估计结果大小：嵌套乘方的每一步都受限，不会在pow中长时间计算"""
+    if abs(exponent) > MAX_EXPONENT:
+        raise ValueError(f"Exponent too large: {exponent}")
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+        if base.bit_length() * exponent > MAX_RESULT_BITS:
+            raise ValueError(f"Result too large: {base} ** {exponent}")
+
+
+def _eval_node(node) -> Number:
+    if isinstance(node, ast.Expression):
+        return _eval_node(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        left, right = _eval_node(node.left), _eval_node(node.right)
+        if isinstance(node.op, ast.Pow):
+            _check_power(left, right)
+        result = _BINARY_OPS[type(node.op)](left, right)
+        if isinstance(result, int) and result.bit_length() > MAX_RESULT_BITS:
+            raise ValueError(f"Result too large: {result.bit_length()} bits")
+        return result
+    raise ValueError(f"Unsupported expression element: {type(node).__name__}")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _evaluate_normalized(expr: str) -> Number:
+    if not expr or len(expr) > MAX_EXPRESSION_LENGTH:
+        raise ValueError(f"Invalid expression length: {len(expr)}")
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {expr}") from e
+    return _eval_node(tree)
+
+
+def evaluate(expr: str) -> Number:
+    """
+    计算算术表达式
+
+    结果与Python运算语义一致（整数运算得int，/得float）
+
+    Raises:
+        ValueError: 表达式不合法或含不支持的元素
+        ZeroDivisionError: 除以零
+    """
+    return _evaluate_normalized(normalize_expression(expr))
+
+
+def extract_expression(text: str) -> Optional[str]:
+    """
+    从任务或提示文本中提取算术表达式
+
+    取"问题:"/"Question:"之后、最后一个等号之前的内容（没有等号时为全文），
+    再取其中最后一段含运算符的算术片段，适配 "23 * 47 = ?" 与带系统提示的格式
+    """
+    for marker in ("问题:", "Question:"):
+        if marker in text:
+            text = text.split(marker)[-1]
+            break
+    if "=" in text:
+        text = text.rsplit("=", 1)[0]
+    for run in reversed(_EXPRESSION_RUN.findall(text)):
+        if _HAS_OPERATOR.search(run):
+            return run.strip()
+    return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def solve(text: str) -> Optional[Tuple[str, Number]]:
+    """
+    提取并计算文本中的算术题（按原文缓存，失败结果同样缓存）
+
+    Returns:
+        (表达式, 结果)，无法提取或计算时为None
+    """
+    expr = extract_expression(text)
+    if expr is None:
+        return None
+    try:
+        return expr, evaluate(expr)
+    except (ValueError, ArithmeticError):
+        return None
+
+
+def cache_info():
+    """表达式求值与文本解析两级缓存的命中统计"""
+    return {"expressions": _evaluate_normalized.cache_info(), "texts": solve.cache_info()}
+
+
+def clear_cache():
+    _evaluate_normalized.cache_clear()
+    solve.cache_clear()
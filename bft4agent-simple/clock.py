@@ -0,0 +1,84 @@
+"""
+时钟抽象
+
+WallClock使用真实时间，VirtualClock只在sleep/advance时前进，
+用于可重复的网络与LLM延迟模拟
+"""
+
+import threading
+import time
+
+
+class WallClock:
+    """真实时钟，now()返回自start()以来经过的秒数"""
+
+    def __init__(self):
+        self._start = time.time()
+
+    def start(self):
+        """重置起点"""
+        self._start = time.time()
+
+    def now(self) -> float:
+        return time.time() - self._start
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def sleep_until(self, t: float):
+        """等待到时刻t（已过去则立即返回）"""
+        self.sleep(t - self.now())
+
+    def __repr__(self):
+        return f"WallClock(t={self.now():.3f}s)"
+
+
+class VirtualClock:
+    """
+    虚拟时钟
+
+    sleep()/advance()不阻塞，只把时间向前推进（多线程并发sleep时累加）；
+    sleep_until(t)把时间推进到max(now, t)：并发的操作各自由起始时刻计算完成时刻，
+    虚拟时间取其中最晚者而非累加，不随线程交错顺序漂移
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._initial = start
+        self._lock = threading.Lock()
+
+    def start(self):
+        """重置到初始时间"""
+        with self._lock:
+            self._now = self._initial
+
+    def now(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float):
+        """推进虚拟时间"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._now += seconds
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def sleep_until(self, t: float):
+        """推进到时刻t（不回退）"""
+        with self._lock:
+            self._now = max(self._now, t)
+
+    def __repr__(self):
+        return f"VirtualClock(t={self._now:.3f}s)"
+
+
+def create_clock(kind: str = "wall"):
+    """根据名称创建时钟: wall | virtual"""
+    if kind == "wall":
+        return WallClock()
+    if kind == "virtual":
+        return VirtualClock()
+    raise ValueError(f"Unknown clock: {kind}")
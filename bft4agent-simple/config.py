@@ -83,11 +83,118 @@ CONFIG = {
         }
     ],
     "assign_roles_randomly": True,  # 是否随机分配角色（False则按顺序分配）
+    # 确定性验证器（verifiers.py）：验证时先于LLM运行，能判定的提案不再调用LLM
+    # types按任务type注册验证器，"*"对所有类型生效，"math"同时匹配"math_basic"等子类型
+    "validation_verifiers": {
+        "enabled": True,
+        "types": {"*": ["format"], "math": ["arithmetic"]},  # 内置: format | arithmetic
+    },
+    # 每个Agent的验证结论缓存（verdicts.py）：视图切换后对语义相同的提案（答案与推理相同）直接复用结论
+    "verdict_cache": {"enabled": True, "capacity": 1024},
+    # leader自洽性采样：并发独立生成samples次，按多数答案提案，一致比例作为置信度（减少诚实leader幻觉导致的视图切换）
+    "leader_self_consistency": {"enabled": False, "samples": 5},
 
     # LLM配置
     "llm_backend": "qwen",  # mock | openai | zhipu | qwen | custom
     "mock_accuracy": 1.0,  # Mock LLM准确率（诚实节点100%生成正确答案）
     "api_timeout": 30,
+    "llm_max_concurrency": 8,  # 每个后端的最大并发请求数（同步与异步调用共用）
+    # 共享HTTP连接池（同一后端/端点/密钥的所有Agent复用连接）
+    "llm_http_pool": {
+        "max_connections": 100,
+        "max_keepalive_connections": 20,
+        "keepalive_expiry": 30.0,  # 空闲连接保活时间（秒）
+        "warm_up": True,  # 启动时预热连接
+    },
+    "llm_streaming": False,  # 流式生成：读到"最终答案"行/首个Y或N即取消剩余生成（OpenAI兼容与智谱后端）
+    "llm_json_mode": False,  # 请求结构化JSON输出（OpenAI兼容后端的response_format），减少解析失败导致的误拒
+    "llm_validate_temperature": None,  # 覆盖验证温度（设为0使验证结果确定、可缓存），None表示后端默认
+    # LLM响应缓存（内存LRU + 可选SQLite持久化），按调用类型启用
+    "llm_cache": {
+        "enabled": False,
+        "calls": ["validate"],  # 只缓存确定性的验证；generate需要采样多样性
+        "memory_size": 1024,
+        "path": None,  # 如 "llm_cache.sqlite"，跨实验复用
+        "ttl": None,  # 过期时间（秒），None表示不过期
+        "max_disk_entries": 100000,
+    },
+    "llm_single_flight": True,  # 合并相同的并发LLM请求（共享结果）
+    # 每个后端的限速（None表示不限），接近服务商限额时排队而不是触发429
+    "llm_rate_limit": {
+        "requests_per_second": None,
+        "tokens_per_minute": None,
+        "burst": None,  # 允许的请求突发量，默认等于requests_per_second
+    },
+    # 429/5xx/超时的重试：指数退避 + jitter，优先采用Retry-After，受共识阶段超时约束
+    "llm_retry": {
+        "max_retries": 3,
+        "base_delay": 0.5,
+        "max_delay": 8.0,
+    },
+    # 熔断：连续失败或超出延迟SLO达到阈值后停止向该后端发请求；后端全部熔断的Agent直接弃权
+    "llm_circuit_breaker": {
+        "enabled": True,
+        "failure_threshold": 5,  # 连续不良结果次数
+        "latency_slo_ms": None,  # 延迟SLO（毫秒），超过也计为不良结果，None表示不检查
+        "reset_timeout": 30.0,  # 熔断后多少秒允许试探
+        "probe_interval": 5.0,  # 后台health_check探测间隔（秒），None表示只由真实请求试探
+    },
+    # 故障转移后端（按顺序），如 [{"backend": "zhipu"}, {"backend": "openai", "model": "gpt-4o-mini"}]
+    # 凭据取自llm_api_config，条目中的字段优先
+    "llm_fallbacks": [],
+    # 对冲请求：主请求超过该后端延迟分位仍未返回时，向下一个后端（无备用时为主后端）发副本
+    "llm_hedge": {
+        "enabled": False,
+        "quantile": 95,  # 触发对冲的延迟分位
+        "budget": 0.1,  # 对冲请求数不超过总调用数的10%
+        "min_samples": 20,  # 延迟样本不足时不对冲
+        "min_delay": 0.05,  # 对冲等待时间下限（秒）
+    },
+    # 每千token价格（按model或后端名查找），用于遥测中的费用估算
+    "llm_pricing": {
+        "gpt-3.5-turbo": {"prompt": 0.0005, "completion": 0.0015},
+    },
+    "llm_telemetry_path": None,  # 每次LLM调用的记录写入该JSONL文件，None表示只在内存中汇总
+    # 异构后端池：按Agent分配不同的后端/模型，每个后端独立的并发上限与等待队列（启用后忽略llm_backend）
+    # 凭据取自llm_api_config，后端条目中的字段优先；其余LLM参数沿用上面的全局设置
+    "llm_pool": {
+        "enabled": False,
+        "assignment": "round_robin",  # round_robin | random（按weight加权）
+        "seed": None,
+        "backends": {
+            # "qwen": {"max_concurrency": 4, "max_queue": 32, "weight": 2},
+            # "gpt": {"backend": "openai", "model": "gpt-4o-mini", "max_concurrency": 8,
+            #         "rate_limit": {"requests_per_second": 5}, "agents": ["agent_1"]},
+        },
+    },
+    # MockLLM延迟模型（llm_modules/latency.py），None时沿用 generate uniform:100:500 / validate uniform:50:200（毫秒）
+    "mock_latency": None,
+    # 示例:
+    # "mock_latency": {
+    #     "generate": "lognormal:300:0.6",  # fixed:ms | uniform:min:max | lognormal:median:sigma | pareto:scale:alpha
+    #     "validate": "lognormal:120:0.5",
+    #     "agent_spread": 0.3,  # 各Agent速度系数 ~ lognormal(0, 0.3)；也可用agent_factors显式指定
+    #     "agent_factors": {"agent_3": 2.5},
+    #     "stall_prob": 0.01,  # 偶发卡顿概率
+    #     "stall": "uniform:2000:8000",  # 卡顿的额外延迟
+    #     "timeout_prob": 0.002,  # 超时概率（等待timeout_seconds后失败）
+    #     "timeout_seconds": 30,
+    #     "clock": "wall",  # wall | virtual（virtual时只推进虚拟时间；fault_schedule使用虚拟时钟时共用其时钟）
+    #     "trace": None,  # 由llm_telemetry_path记录的真实后端JSONL拟合，其余字段覆盖拟合结果
+    #     "seed": None,
+    # },
+    # 本地OpenAI兼容模拟服务（llm_modules/server.py），启用后openai/custom后端改连该服务，用于离线压测
+    "llm_local_server": {
+        "enabled": False,
+        "port": 0,  # 0表示随机可用端口
+        "accuracy": 0.85,
+        "latency": "lognormal:300:0.5",  # fixed:ms | uniform:min:max | lognormal:median:sigma（毫秒）
+        "token_delay_ms": 5,  # 流式输出每个分片的间隔
+        "error_rate": 0.0,  # 随机返回500的比例
+        "rate_limit_rate": 0.0,  # 随机返回429的比例
+        "retry_after": 1.0,  # 429响应的Retry-After（秒）
+        "requests_per_second": None,  # 服务端限速，超出返回429
+    },
     "single_task_mode": False,  # 单任务模式（True=单任务用于测试，False=多任务用于实验）
 
     # LLM API配置（用于真实LLM）
@@ -120,10 +227,22 @@ CONFIG = {
     # 网络配置
     "network_delay": (10, 100),  # (min, max) in ms
     "packet_loss": 0.01,  # 1% 丢包率
+    "inbox_capacity": 256,  # 每个Agent收件箱容量（消息数）
+    "inbox_policy": "drop_oldest",  # 收件箱溢出策略: drop_oldest | drop_newest | block（背压）
+
+    # 故障注入调度（None表示只有均匀随机丢包），格式见faults.FaultSchedule.from_config
+    # 例: {"seed": 42, "clock": "wall", "events": [
+    #         {"type": "crash", "node": "agent_1", "at": 0, "restart_at": 30},
+    #         {"type": "bursty_loss", "p_good_to_bad": 0.05, "p_bad_to_good": 0.3}]}
+    "fault_schedule": None,
 
     # 共识配置
     "timeout": 30.0,  # 超时时间（秒）- 增加到30秒以适应真实LLM API调用速度
     "max_retries": 3,  # 最大重试次数
+    # 提案传输：chunked=True时大提案压缩分块分散发送（parity为纠删码校验块数，任意k块可重建）
+    "proposal_transfer": {"chunked": False, "parity": 1, "min_size": 2048, "codec": None},
+    # presolve：视图开始时把任务发给backup，与leader并发独立解题；提案答案一致直接投Y，不一致才调用LLM验证
+    "presolve": False,
     "quorum_ratio": 2.0 / 3.0,  # 法定人数比例
 
     # 任务配置
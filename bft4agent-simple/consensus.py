@@ -9,14 +9,23 @@
 包含视图更换机制处理主节点故障
 """
 
+import dataclasses
+import json
 import time
 import random
 import hashlib
 import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass, field
 
+from answers import reset_answer_classes
+from llm_modules.breaker import ABSTAIN
+from llm_modules.context import call_scope, deadline_scope
+from transfer import ChunkAssembler, encode_proposal
+
 
 class ReplicaState(Enum):
     """副本状态机"""
@@ -35,6 +44,16 @@ class MessageType(Enum):
     REPLY = "REPLY"
     VIEW_CHANGE = "VIEW-CHANGE"
     NEW_VIEW = "NEW-VIEW"
+    PROPOSAL_REQUEST = "PROPOSAL-REQUEST"  # 按摘要拉取提案正文
+    PROPOSAL_RESPONSE = "PROPOSAL-RESPONSE"
+    PROPOSAL_CHUNK = "PROPOSAL-CHUNK"  # 压缩分块传输的提案块
+    TASK = "TASK"  # presolve模式：视图开始时把任务发给backup
+
+
+def compute_proposal_digest(proposal: Dict) -> str:
+    """计算提案正文的内容摘要（规范化JSON的SHA-256）"""
+    content = json.dumps(proposal, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
 
 @dataclass
@@ -63,6 +82,7 @@ class PrePrepareMessage(PBFTMessage):
     """PRE-PREPARE消息（主节点发送）"""
     task: Dict = None
     proposal: Dict = None
+    proposal_digest: str = ""  # 提案正文的内容摘要
     message_type: str = MessageType.PRE_PREPARE.value
 
 
@@ -73,6 +93,7 @@ class PrepareMessage(PBFTMessage):
     decision: str = ""  # Y/N：对proposal的评价
     confidence: float = 0.0  # 置信度
     reason: str = ""  # 评价理由
+    proposal_digest: str = ""  # 只携带提案摘要，不携带正文
     message_type: str = MessageType.PREPARE.value
 
 
@@ -81,6 +102,7 @@ class CommitMessage(PBFTMessage):
     """COMMIT消息（副本发送）"""
     digest: str = ""  # 对应pre-prepare消息的摘要
     decision: str = ""  # Y/N：最终确认的决策
+    proposal_digest: str = ""  # 只携带提案摘要，不携带正文
     message_type: str = MessageType.COMMIT.value
 
 
@@ -158,16 +180,73 @@ class MessageLog:
         self.view_changes.clear()
 
 
+class ProposalStore:
+    """按内容摘要寻址的提案正文存储（LRU淘汰，线程安全）"""
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self._bodies: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, proposal: Dict, digest: Optional[str] = None) -> str:
+        """
+        存入提案正文
+
+        Args:
+            proposal: 提案正文
+            digest: 期望的摘要；给出时校验正文与摘要一致
+
+        Returns:
+            提案摘要
+        """
+        actual = compute_proposal_digest(proposal)
+        if digest and digest != actual:
+            raise ValueError(f"Proposal digest mismatch: expected {digest[:16]}, got {actual[:16]}")
+
+        with self._lock:
+            self._bodies[actual] = proposal
+            self._bodies.move_to_end(actual)
+            while len(self._bodies) > self.capacity:
+                self._bodies.popitem(last=False)
+        return actual
+
+    def get(self, digest: str) -> Optional[Dict]:
+        """按摘要获取正文，不存在时返回None"""
+        with self._lock:
+            proposal = self._bodies.get(digest)
+            if proposal is not None:
+                self._bodies.move_to_end(digest)
+            return proposal
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._bodies
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def clear(self):
+        with self._lock:
+            self._bodies.clear()
+
+
 class Replica:
     """PBFT副本节点 - 包装Agent以支持PBFT协议"""
 
-    def __init__(self, agent, is_primary: bool = False):
+    def __init__(self, agent, is_primary: bool = False, network=None):
         self.agent = agent
         self.is_primary = is_primary
+        # 用于应答PROPOSAL-REQUEST的网络
+        self.network = network
         self.state = ReplicaState.IDLE
         self.message_log = MessageLog()
         self.current_view = 0
         self.last_executed_sequence = 0
+        self.proposal_store = ProposalStore()
+        self.chunk_assembler = ChunkAssembler(
+            verify=lambda proposal, digest: compute_proposal_digest(proposal) == digest
+        )
+        # presolve模式下收到TASK消息时的回调 (replica, task)
+        self.task_listener = None
 
         # 用于等待消息的条件变量
         self.prepare_lock = threading.Lock()
@@ -175,6 +254,72 @@ class Replica:
         self.commit_lock = threading.Lock()
         self.commit_cond = threading.Condition(self.commit_lock)
 
+        # 网络送达的PBFT消息直接记入消息日志，不在收件箱中堆积
+        inbox = getattr(agent, "inbox", None)
+        if inbox is not None:
+            inbox.register_handler(MessageType.PRE_PREPARE.value, self._on_pre_prepare)
+            inbox.register_handler(MessageType.PREPARE.value, self._on_prepare)
+            inbox.register_handler(MessageType.COMMIT.value, self._on_commit)
+            inbox.register_handler(MessageType.PROPOSAL_REQUEST.value, self._on_proposal_request)
+            inbox.register_handler(MessageType.PROPOSAL_RESPONSE.value, self._on_proposal_response)
+            inbox.register_handler(MessageType.PROPOSAL_CHUNK.value, self._on_proposal_chunk)
+            inbox.register_handler(MessageType.TASK.value, self._on_task)
+
+    def _on_pre_prepare(self, message: Dict):
+        """收件箱handler：记录收到的PRE-PREPARE消息，并把提案正文存入本地"""
+        msg = message["data"]
+        self.message_log.add_pre_prepare(msg)
+        if msg.proposal is not None:
+            self.proposal_store.put(msg.proposal, msg.proposal_digest or None)
+
+    def _on_proposal_request(self, message: Dict):
+        """
+        收件箱handler：从本地存储应答按摘要拉取提案的请求
+
+        持有完整正文时回传PROPOSAL-RESPONSE；只持有部分分块时转发这些分块，
+        请求方凑齐k块即可重建；都没有时不应答
+        """
+        data = message["data"]
+        digest, requester = data["digest"], data["requester"]
+        if self.network is None:
+            return
+        proposal = self.proposal_store.get(digest)
+        if proposal is not None:
+            response = {
+                "type": MessageType.PROPOSAL_RESPONSE.value,
+                "data": {"digest": digest, "proposal": proposal},
+            }
+            self.network.send(response, sender_id=self.agent.id, receiver_id=requester)
+            return
+        for chunk in self.chunk_assembler.held(digest):
+            chunk_message = {"type": MessageType.PROPOSAL_CHUNK.value, "data": chunk}
+            self.network.send(chunk_message, sender_id=self.agent.id, receiver_id=requester)
+
+    def _on_proposal_response(self, message: Dict):
+        """收件箱handler：存入从其他副本拉取到的提案正文（校验摘要）"""
+        data = message["data"]
+        self.proposal_store.put(data["proposal"], data["digest"])
+
+    def _on_proposal_chunk(self, message: Dict):
+        """收件箱handler：收集提案分块，收齐k块后重建正文"""
+        chunk = message["data"]
+        proposal = self.chunk_assembler.add(chunk)
+        if proposal is not None:
+            self.proposal_store.put(proposal, chunk.digest)
+
+    def _on_task(self, message: Dict):
+        """收件箱handler：收到任务后开始独立解题（未启用presolve时忽略）"""
+        if self.task_listener is not None:
+            self.task_listener(self, message["data"])
+
+    def _on_prepare(self, message: Dict):
+        """收件箱handler：记录收到的PREPARE消息"""
+        self.message_log.add_prepare(message["data"])
+
+    def _on_commit(self, message: Dict):
+        """收件箱handler：记录收到的COMMIT消息"""
+        self.message_log.add_commit(message["data"])
+
 
 class BFT4Agent:
     """
@@ -195,6 +340,8 @@ class BFT4Agent:
         f: Optional[int] = None,
         timeout: float = 5.0,
         max_retries: int = 3,
+        proposal_transfer: Optional[Dict] = None,
+        presolve: bool = False,
     ):
         """
         初始化PBFT协议
@@ -205,11 +352,18 @@ class BFT4Agent:
             f: 最大容忍故障节点数（默认为总节点数的1/4向下取整）
             timeout: 超时时间（秒）
             max_retries: 最大重试次数
+            proposal_transfer: 提案传输配置 {"chunked": bool, "parity": int, "min_size": int, "codec": str}
+                chunked为True且提案不小于min_size字节时，正文压缩分块后分散发给各backup，
+                由backup互相转发（parity为纠删码校验块数）
+            presolve: 视图开始时把任务发给backup，backup与leader并发独立解题，
+                收到提案后答案一致直接投Y，不一致才做完整的LLM验证
         """
         self.agents = agents
         self.network = network
         self.timeout = timeout
         self.max_retries = max_retries
+        self.proposal_transfer = proposal_transfer or {}
+        self.presolve = presolve
 
         # PBFT参数
         self.total_nodes = len(agents)
@@ -234,12 +388,26 @@ class BFT4Agent:
         # 创建副本包装器
         self.replicas: Dict[str, Replica] = {}
         for agent in agents:
-            self.replicas[agent.id] = Replica(agent, is_primary=False)
+            self.replicas[agent.id] = Replica(agent, is_primary=False, network=network)
 
         # 统计信息
         self.consensus_count = 0
         self.view_change_count = 0
         self.total_messages = 0
+        self.proposal_fetches = 0
+        self.proposal_fetch_failures = 0
+        self.abstentions = 0  # 因LLM后端熔断而弃权的PREPARE票数
+        self.chunked_proposals = 0
+        self.presolves_started = 0
+        self.stats_lock = threading.Lock()
+
+        self._presolve_executor = None
+        if presolve:
+            self._presolve_executor = ThreadPoolExecutor(
+                max_workers=max(1, self.total_nodes), thread_name_prefix="presolve"
+            )
+            for replica in self.replicas.values():
+                replica.task_listener = self._start_presolve
 
     def _get_primary_id(self, view: int) -> str:
         """根据视图号获取主节点ID（轮换主节点）"""
@@ -266,7 +434,8 @@ class BFT4Agent:
     def _send_message(self, message: PBFTMessage, recipient_id: str = None):
         """发送消息（单播或广播）"""
         message.signature = self._sign_message(message)
-        self.total_messages += 1
+        with self.stats_lock:
+            self.total_messages += 1
 
         if recipient_id:
             # 单播
@@ -276,7 +445,7 @@ class BFT4Agent:
                     "data": message,
                 },
                 sender_id=message.sender_id,
-                recipient_id=recipient_id,
+                receiver_id=recipient_id,
             )
         else:
             # 广播
@@ -324,6 +493,16 @@ class BFT4Agent:
         print(f"  Prepare阈值: {self.prepare_quorum}, Commit阈值: {self.quorum_size}")
         print(f"{'='*60}")
 
+        # 验证结论缓存、presolve答案、提案分块与答案等价类表只在同一任务的各视图间复用
+        reset_answer_classes()
+        for replica in self.replicas.values():
+            replica.chunk_assembler.clear()
+        for agent in self.agents:
+            if getattr(agent, "verdict_cache", None) is not None:
+                agent.verdict_cache.clear()
+            if self.presolve:
+                agent.clear_presolved()
+
         # 尝试达成共识
         for attempt in range(self.max_retries):
             self.current_view = view_changes
@@ -339,6 +518,10 @@ class BFT4Agent:
                 for replica in self.replicas.values():
                     replica.message_log.clear()
 
+                # presolve模式：backup与leader并发解题，生成不再与验证串行
+                if self.presolve:
+                    self._announce_task(primary_id, task)
+
                 # === PHASE 1: PRE-PREPARE ===
                 # Leader生成proposal并广播
                 print(f"\n[阶段1] PRE-PREPARE - Leader生成提案")
@@ -447,6 +630,11 @@ class BFT4Agent:
         primary_replica = self.replicas[primary_id]
         primary_replica.is_primary = True
 
+        # 主节点宕机（故障注入）时无法发出PRE-PREPARE，由视图切换处理
+        if not self.network.is_up(primary_id):
+            print(f"[{primary_id}] 主节点宕机，无法生成提案")
+            return None
+
         # 设置Agent的role为leader（propose方法需要）
         primary_replica.agent.role = "leader"
 
@@ -461,7 +649,9 @@ class BFT4Agent:
 
         # 生成提案
         print(f"[{primary_id}] 正在生成提案...")
-        proposal = primary_replica.agent.propose(task)
+        # LLM调用（含限速排队与重试退避）的时间预算不超过本阶段超时
+        with deadline_scope(self.timeout), call_scope(agent=primary_id, phase="pre-prepare"):
+            proposal = primary_replica.agent.propose(task)
 
         # 打印提案详细内容
         print(f"\n{'='*80}")
@@ -480,7 +670,7 @@ class BFT4Agent:
         print(f"置信度: {proposal.get('confidence', 'N/A')}")
         print(f"{'='*80}\n")
 
-        # 创建PRE-PREPARE消息
+        # 创建PRE-PREPARE消息（提案正文只随PRE-PREPARE发送一次）
         pre_prepare_msg = PrePrepareMessage(
             view=self.current_view,
             sequence_number=sequence_number,
@@ -488,18 +678,105 @@ class BFT4Agent:
             timestamp=time.time(),
             task=task,
             proposal=proposal,
+            proposal_digest=compute_proposal_digest(proposal),
         )
 
-        # 记录到主节点日志
+        # 记录到主节点日志和本地提案存储
         primary_replica.message_log.add_pre_prepare(pre_prepare_msg)
+        primary_replica.proposal_store.put(proposal, pre_prepare_msg.proposal_digest)
         primary_replica.state = ReplicaState.PRE_PREPARED
 
         # 广播PRE-PREPARE消息
-        print(f"[{primary_id}] 广播PRE-PREPARE消息")
-        self._send_message(pre_prepare_msg)
+        if self._should_chunk(proposal):
+            # 大提案：PRE-PREPARE只带摘要，正文分块分散传输
+            print(f"[{primary_id}] 广播PRE-PREPARE消息（提案正文分块传输）")
+            self._send_message(dataclasses.replace(pre_prepare_msg, proposal=None))
+            self._disperse_proposal(primary_id, proposal, pre_prepare_msg.proposal_digest)
+        else:
+            print(f"[{primary_id}] 广播PRE-PREPARE消息")
+            self._send_message(pre_prepare_msg)
 
         return pre_prepare_msg
 
+    def _announce_task(self, primary_id: str, task: Dict):
+        """
+        后台把任务广播给尚未解过该任务的在线backup（不阻塞leader生成提案）
+
+        前一视图已在解题的backup沿用原有结果
+        """
+        content = task.get("content", "")
+        targets = [
+            rid for rid, replica in self.replicas.items()
+            if rid != primary_id and self.network.is_up(rid) and not replica.agent.has_presolved(content)
+        ]
+        if not targets:
+            return
+        message = {"type": MessageType.TASK.value, "data": task}
+        threading.Thread(target=self.network.broadcast, args=(message, primary_id, targets), daemon=True).start()
+
+    def _start_presolve(self, replica: Replica, task: Dict):
+        """收到TASK消息：在线程池中开始独立解题，结果登记到Agent供验证时比对"""
+        content = task.get("content", "")
+        if replica.agent.has_presolved(content):
+            return
+        future = self._presolve_executor.submit(self._replica_presolve, replica, task)
+        replica.agent.expect_presolved(content, future)
+        with self.stats_lock:
+            self.presolves_started += 1
+
+    def _replica_presolve(self, replica: Replica, task: Dict) -> Optional[str]:
+        with deadline_scope(self.timeout), call_scope(agent=replica.agent.id, phase="presolve"):
+            return replica.agent.presolve(task)
+
+    def _should_chunk(self, proposal: Dict) -> bool:
+        """提案是否走压缩分块传输"""
+        if not self.proposal_transfer.get("chunked", False) or self.total_nodes < 3:
+            return False
+        size = len(json.dumps(proposal, ensure_ascii=False, default=str).encode("utf-8"))
+        return size >= self.proposal_transfer.get("min_size", 2048)
+
+    def _disperse_proposal(self, primary_id: str, proposal: Dict, digest: str):
+        """
+        压缩分块分发提案正文
+
+        1. 正文压缩后切成 k 个数据块 + m 个校验块，块数等于在线backup数
+        2. leader把第i块只发给第i个backup（上行流量约为一份提案）
+        3. 每个backup把自己的块转发给其他backup，任意k块即可重建
+        重建失败的副本在PREPARE阶段按摘要拉取完整正文
+        """
+        backups = [rid for rid in self.replicas if rid != primary_id and self.network.is_up(rid)]
+        if not backups:
+            return
+        parity = min(self.proposal_transfer.get("parity", 1), len(backups) - 1)
+        chunks = encode_proposal(
+            proposal,
+            digest,
+            data_chunks=len(backups) - parity,
+            parity_chunks=parity,
+            codec=self.proposal_transfer.get("codec"),
+        )
+        with self.stats_lock:
+            self.chunked_proposals += 1
+        print(f"[{primary_id}] 提案分为 {len(chunks)} 块 (k={chunks[0].data_chunks}, m={parity}, codec={chunks[0].codec})")
+
+        holders = {}
+        for chunk, backup_id in zip(chunks, backups):
+            message = {"type": MessageType.PROPOSAL_CHUNK.value, "data": chunk}
+            if self.network.send(message, sender_id=primary_id, receiver_id=backup_id):
+                holders[backup_id] = message
+
+        threads = []
+        for backup_id, message in holders.items():
+            others = [rid for rid in backups if rid != backup_id]
+            thread = threading.Thread(
+                target=self.network.broadcast,
+                args=(message, backup_id, others),
+            )
+            threads.append(thread)
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=self.timeout)
+
     def _prepare_phase(self, pre_prepare_msg: PrePrepareMessage) -> Tuple[bool, str]:
         """
         PREPARE阶段
@@ -529,6 +806,9 @@ class BFT4Agent:
             if replica_id == primary_id:
                 print(f"[{primary_id}] Leader不参与PREPARE投票")
                 continue  # 跳过Leader
+            if not self.network.is_up(replica_id):
+                print(f"[{replica_id}] 节点宕机，不参与PREPARE投票")
+                continue
 
             thread = threading.Thread(
                 target=self._replica_prepare_phase,
@@ -567,6 +847,8 @@ class BFT4Agent:
         y_count = 0
         n_count = 0
         for prep_msg in prepare_messages:
+            if prep_msg.proposal_digest != pre_prepare_msg.proposal_digest:
+                continue  # 只统计针对本提案摘要的投票
             if prep_msg.decision == "Y":
                 y_count += 1
             elif prep_msg.decision == "N":
@@ -626,12 +908,23 @@ class BFT4Agent:
             return
 
         # === 核心设计：对proposal进行语义验证，获取Y/N评价 ===
-        proposal = pre_prepare_msg.proposal
+        # 正文从本地内容寻址存储中取；没收到PRE-PREPARE的副本按摘要向其他副本拉取
+        proposal = self._resolve_proposal(replica, pre_prepare_msg.proposal_digest, pre_prepare_msg.sender_id)
+        if proposal is None:
+            print(f"[{replica.agent.id}] 无法获取提案正文，放弃本轮投票")
+            return
         print(f"[{replica.agent.id}] 正在评价proposal...")
 
         # 调用agent的validate方法获取Y/N决策
-        vote = replica.agent.validate(proposal)
+        with deadline_scope(self.timeout), call_scope(agent=replica.agent.id, phase="prepare"):
+            vote = replica.agent.validate(proposal)
         decision = vote.get("decision", "N")  # Y or N
+        if decision == ABSTAIN:
+            # LLM后端熔断：不发送PREPARE，法定人数按其余节点统计
+            with self.stats_lock:
+                self.abstentions += 1
+            print(f"[{replica.agent.id}] 弃权（LLM后端不可用）")
+            return
         confidence = vote.get("confidence", 0.0)
         reason = vote.get("reason", "")
 
@@ -647,15 +940,54 @@ class BFT4Agent:
             decision=decision,
             confidence=confidence,
             reason=reason,
+            proposal_digest=pre_prepare_msg.proposal_digest,
         )
 
-        # 记录自己的PREPARE消息
+        # 记录自己的PREPARE消息并广播
         replica.message_log.add_prepare(prepare_msg)
         print(f"[{replica.agent.id}] 创建PREPARE消息 (决策: {decision})")
+        self._send_message(prepare_msg)
 
         # 将消息添加到共享列表（用于后续分发给所有副本）
         prepare_messages.append(prepare_msg)
 
+    def _resolve_proposal(self, replica: Replica, digest: str, primary_id: str) -> Optional[Dict]:
+        """
+        按摘要获取提案正文
+
+        本地存储命中则直接返回；否则依次向主节点和其他副本发送PROPOSAL-REQUEST，
+        对方的收件箱handler从其本地存储以PROPOSAL-RESPONSE（或所持分块）应答
+        （经网络，可能丢包）
+
+        Returns:
+            提案正文，所有副本都拉取失败时返回None
+        """
+        proposal = replica.proposal_store.get(digest)
+        if proposal is not None:
+            return proposal
+
+        requester_id = replica.agent.id
+        peers = [primary_id] + [rid for rid in self.replicas if rid not in (primary_id, requester_id)]
+        request = {
+            "type": MessageType.PROPOSAL_REQUEST.value,
+            "data": {"digest": digest, "requester": requester_id},
+        }
+        for peer_id in peers:
+            with self.stats_lock:
+                self.proposal_fetches += 1
+            print(f"[{requester_id}] 未收到提案正文，向 {peer_id} 拉取 (digest={digest[:16]})")
+
+            # 投递是同步的：send返回时对方的应答（若有）已送达本地存储
+            if not self.network.send(request, sender_id=requester_id, receiver_id=peer_id):
+                continue
+            proposal = replica.proposal_store.get(digest)
+            if proposal is not None:
+                return proposal
+
+        with self.stats_lock:
+            self.proposal_fetch_failures += 1
+        return None
+
     def _wait_for_prepares(self, replica: Replica, sequence_number: int, digest: str):
         """等待收集2f条PREPARE消息"""
         start_time = time.time()
@@ -701,6 +1033,9 @@ class BFT4Agent:
         commit_messages = []
         threads = []
         for replica_id, replica in self.replicas.items():
+            if not self.network.is_up(replica_id):
+                print(f"[{replica_id}] 节点宕机，不参与COMMIT")
+                continue
             thread = threading.Thread(
                 target=self._replica_commit_phase,
                 args=(replica, pre_prepare_msg, commit_messages, prepare_decision)
@@ -737,6 +1072,8 @@ class BFT4Agent:
         y_count = 0
         n_count = 0
         for commit_msg in commit_messages:
+            if commit_msg.proposal_digest != pre_prepare_msg.proposal_digest:
+                continue  # 只统计针对本提案摘要的提交
             if commit_msg.decision == "Y":
                 y_count += 1
             elif commit_msg.decision == "N":
@@ -798,11 +1135,13 @@ class BFT4Agent:
             timestamp=time.time(),
             digest=digest,
             decision=decision,
+            proposal_digest=pre_prepare_msg.proposal_digest,
         )
 
-        # 记录自己的COMMIT消息
+        # 记录自己的COMMIT消息并广播
         replica.message_log.add_commit(commit_msg)
         print(f"[{replica.agent.id}] 创建COMMIT消息 (决策: {decision})")
+        self._send_message(commit_msg)
 
         # 将消息添加到共享列表（用于后续分发给所有副本）
         commit_messages.append(commit_msg)
@@ -868,6 +1207,12 @@ class BFT4Agent:
             "total_nodes": self.total_nodes,
             "fault_tolerance": self.f,
             "total_messages": self.total_messages,
+            "proposal_fetches": self.proposal_fetches,
+            "proposal_fetch_failures": self.proposal_fetch_failures,
+            "abstentions": self.abstentions,
+            "chunked_proposals": self.chunked_proposals,
+            "presolves_started": self.presolves_started,
+            "presolve_matches": sum(getattr(agent, "presolve_stats", {}).get("matches", 0) for agent in self.agents),
             "current_view": self.current_view,
             "success_rate": (
                 self.consensus_count / (self.consensus_count + self.view_change_count)
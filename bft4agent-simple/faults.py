@@ -0,0 +1,303 @@
+"""
+确定性故障注入调度
+
+按（虚拟或真实）时间触发的网络故障，所有随机性来自带种子的RNG，
+同一种子+同一调度 => 同一故障序列，用于可重复的视图切换/恢复性能回归。
+
+支持的故障:
+- partition: 网络分区，不同分组之间的消息全部丢弃
+- link_loss: 指定链路的固定丢包率
+- bursty_loss: Gilbert-Elliott突发丢包（好/坏两状态马尔可夫链）
+- delay_spike: 延迟尖峰，为指定节点的消息额外增加延迟
+- crash: 节点宕机（可选在restart_at时刻重启）
+"""
+
+import hashlib
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from clock import create_clock
+
+
+PARTITION = "partition"
+LINK_LOSS = "link_loss"
+BURSTY_LOSS = "bursty_loss"
+DELAY_SPIKE = "delay_spike"
+CRASH = "crash"
+
+FAULT_TYPES = (PARTITION, LINK_LOSS, BURSTY_LOSS, DELAY_SPIKE, CRASH)
+
+
+class LinkRandom:
+    """
+    按链路派生的随机源
+
+    第n条src -> dst消息的随机数只由(seed, stream, src, dst, n)决定，
+    与多个发送线程之间的交错顺序无关；seed为None时退化为共享的不固定RNG
+    """
+
+    def __init__(self, seed: Optional[int] = None, stream: str = ""):
+        self.seed = seed
+        self.stream = stream
+        self._shared = random.Random(seed)
+        self._seq: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def next(self, src: str, dst: str) -> random.Random:
+        """取src -> dst下一条消息的RNG"""
+        if self.seed is None:
+            return self._shared
+        with self._lock:
+            seq = self._seq.get((src, dst), 0)
+            self._seq[(src, dst)] = seq + 1
+        # 用sha256而非hash()：字符串hash按进程随机化，跨进程无法复现
+        digest = hashlib.sha256(f"{self.seed}:{self.stream}:{src}:{dst}:{seq}".encode("utf-8")).digest()
+        return random.Random(digest)
+
+    def reset(self):
+        with self._lock:
+            self._seq.clear()
+        self._shared = random.Random(self.seed)
+
+
+@dataclass
+class FaultEvent:
+    """单个故障事件，在[start, end)内生效（end为None表示一直生效）"""
+    kind: str
+    start: float = 0.0
+    end: Optional[float] = None
+    params: Dict = field(default_factory=dict)
+
+    def is_active(self, now: float) -> bool:
+        return self.start <= now and (self.end is None or now < self.end)
+
+
+class FaultSchedule:
+    """带种子的故障调度引擎"""
+
+    def __init__(self, seed: Optional[int] = None, clock=None):
+        """
+        init故障调度
+
+        Args:
+            seed: 随机种子（决定丢包等随机故障的序列）
+            clock: 时钟（WallClock/VirtualClock），默认真实时钟
+        """
+        self.seed = seed
+        self.clock = clock or create_clock("wall")
+        self.link_rng = LinkRandom(seed, stream="faults")
+        self.events: List[FaultEvent] = []
+
+        # Gilbert-Elliott每条链路的状态: True表示处于"坏"状态
+        self._burst_state: Dict[Tuple[int, str, str], bool] = {}
+        self._lock = threading.Lock()
+
+        # stats
+        self.fault_drops: Dict[str, int] = {kind: 0 for kind in FAULT_TYPES}
+
+    # === 构建调度 ===
+
+    def partition(self, groups: List[List[str]], start: float = 0.0, end: Optional[float] = None):
+        """网络分区：groups中不同分组的节点互相不可达（未列出的节点与所有人连通）"""
+        self.events.append(FaultEvent(PARTITION, start, end, {"groups": [set(g) for g in groups]}))
+        return self
+
+    def link_loss(
+        self,
+        src: str,
+        dst: str,
+        loss: float,
+        start: float = 0.0,
+        end: Optional[float] = None,
+        bidirectional: bool = True,
+    ):
+        """指定链路的固定丢包率"""
+        self.events.append(FaultEvent(LINK_LOSS, start, end, {
+            "src": src, "dst": dst, "loss": loss, "bidirectional": bidirectional,
+        }))
+        return self
+
+    def bursty_loss(
+        self,
+        p_good_to_bad: float,
+        p_bad_to_good: float,
+        loss_good: float = 0.0,
+        loss_bad: float = 1.0,
+        nodes: Optional[List[str]] = None,
+        start: float = 0.0,
+        end: Optional[float] = None,
+    ):
+        """
+        Gilbert-Elliott突发丢包
+
+        Args:
+            p_good_to_bad: 每条消息从好状态转入坏状态的概率
+            p_bad_to_good: 每条消息从坏状态恢复的概率
+            loss_good: 好状态下的丢包率
+            loss_bad: 坏状态下的丢包率
+            nodes: 受影响节点（消息的发送方或接收方在其中），None表示所有链路
+        """
+        self.events.append(FaultEvent(BURSTY_LOSS, start, end, {
+            "p_good_to_bad": p_good_to_bad,
+            "p_bad_to_good": p_bad_to_good,
+            "loss_good": loss_good,
+            "loss_bad": loss_bad,
+            "nodes": set(nodes) if nodes else None,
+        }))
+        return self
+
+    def delay_spike(
+        self,
+        extra_ms: float,
+        start: float = 0.0,
+        end: Optional[float] = None,
+        nodes: Optional[List[str]] = None,
+    ):
+        """延迟尖峰：涉及nodes的消息额外增加extra_ms毫秒（nodes为None表示全部）"""
+        self.events.append(FaultEvent(DELAY_SPIKE, start, end, {
+            "extra_ms": extra_ms,
+            "nodes": set(nodes) if nodes else None,
+        }))
+        return self
+
+    def crash(self, node: str, at: float = 0.0, restart_at: Optional[float] = None):
+        """节点在at时刻宕机，restart_at时刻重启（None表示不重启）"""
+        self.events.append(FaultEvent(CRASH, at, restart_at, {"node": node}))
+        return self
+
+    @classmethod
+    def from_config(cls, spec: Dict) -> "FaultSchedule":
+        """
+        从配置字典创建调度
+
+        格式:
+            {"seed": 42, "clock": "wall", "events": [
+                {"type": "partition", "groups": [["agent_1"], ["agent_2"]], "start": 1, "end": 5},
+                {"type": "crash", "node": "agent_1", "at": 0, "restart_at": 10},
+                ...
+            ]}
+        """
+        schedule = cls(seed=spec.get("seed"), clock=create_clock(spec.get("clock", "wall")))
+
+        for event in spec.get("events", []):
+            event = dict(event)
+            kind = event.pop("type", None)
+            if kind == PARTITION:
+                schedule.partition(**event)
+            elif kind == LINK_LOSS:
+                schedule.link_loss(**event)
+            elif kind == BURSTY_LOSS:
+                schedule.bursty_loss(**event)
+            elif kind == DELAY_SPIKE:
+                schedule.delay_spike(**event)
+            elif kind == CRASH:
+                schedule.crash(**event)
+            else:
+                raise ValueError(f"Unknown fault type: {kind}")
+
+        return schedule
+
+    def reset(self):
+        """重置时钟、RNG和突发丢包状态，用于重复同一实验"""
+        self.clock.start()
+        self.link_rng.reset()
+        self._burst_state.clear()
+        self.fault_drops = {kind: 0 for kind in FAULT_TYPES}
+
+    # === 查询 ===
+
+    def now(self) -> float:
+        return self.clock.now()
+
+    def _active(self, kind: str, now: Optional[float] = None) -> List[FaultEvent]:
+        now = self.clock.now() if now is None else now
+        return [e for e in self.events if e.kind == kind and e.is_active(now)]
+
+    def is_crashed(self, node_id: str, now: Optional[float] = None) -> bool:
+        """节点在时刻now（默认当前）是否宕机"""
+        return any(e.params["node"] == node_id for e in self._active(CRASH, now))
+
+    def should_drop(self, src: str, dst: str, now: Optional[float] = None) -> Optional[str]:
+        """
+        判断src -> dst的消息是否被故障丢弃
+
+        Args:
+            now: 消息的发送时刻（默认当前时间），按该时刻判断生效的故障窗口
+
+        Returns:
+            丢弃原因（故障类型），不丢弃时返回None
+        """
+        now = self.clock.now() if now is None else now
+        reason = self._drop_reason(src, dst, now)
+        if reason:
+            with self._lock:
+                self.fault_drops[reason] += 1
+        return reason
+
+    def _drop_reason(self, src: str, dst: str, now: float) -> Optional[str]:
+        rng = self.link_rng.next(src, dst)
+        if self.is_crashed(src, now) or self.is_crashed(dst, now):
+            return CRASH
+
+        for event in self._active(PARTITION, now):
+            src_group = next((i for i, g in enumerate(event.params["groups"]) if src in g), None)
+            dst_group = next((i for i, g in enumerate(event.params["groups"]) if dst in g), None)
+            if src_group is not None and dst_group is not None and src_group != dst_group:
+                return PARTITION
+
+        for event in self._active(LINK_LOSS, now):
+            p = event.params
+            on_link = (p["src"], p["dst"]) == (src, dst) or (
+                p["bidirectional"] and (p["dst"], p["src"]) == (src, dst)
+            )
+            if on_link and rng.random() < p["loss"]:
+                return LINK_LOSS
+
+        for index, event in enumerate(self.events):
+            if event.kind != BURSTY_LOSS or not event.is_active(now):
+                continue
+            nodes = event.params["nodes"]
+            if nodes is not None and src not in nodes and dst not in nodes:
+                continue
+            if self._bursty_drop(rng, index, event.params, src, dst):
+                return BURSTY_LOSS
+
+        return None
+
+    def _bursty_drop(self, rng: random.Random, index: int, params: Dict, src: str, dst: str) -> bool:
+        """推进链路的Gilbert-Elliott状态并判断是否丢包"""
+        key = (index, src, dst)
+        with self._lock:
+            bad = self._burst_state.get(key, False)
+            if bad:
+                bad = rng.random() >= params["p_bad_to_good"]
+            else:
+                bad = rng.random() < params["p_good_to_bad"]
+            self._burst_state[key] = bad
+            loss = params["loss_bad"] if bad else params["loss_good"]
+            return rng.random() < loss
+
+    def extra_delay_ms(self, src: str, dst: str, now: Optional[float] = None) -> float:
+        """时刻now（默认当前）生效的延迟尖峰带来的额外延迟（毫秒）"""
+        extra = 0.0
+        for event in self._active(DELAY_SPIKE, now):
+            nodes = event.params["nodes"]
+            if nodes is None or src in nodes or dst in nodes:
+                extra += event.params["extra_ms"]
+        return extra
+
+    def get_stats(self) -> Dict:
+        """获取故障stats信息"""
+        with self._lock:
+            fault_drops = dict(self.fault_drops)
+        return {
+            "seed": self.seed,
+            "clock": repr(self.clock),
+            "events": len(self.events),
+            "fault_drops": fault_drops,
+        }
+
+    def __repr__(self):
+        return f"FaultSchedule(seed={self.seed}, events={len(self.events)})"
@@ -0,0 +1,216 @@
+"""
+Agent消息收件箱
+
+有界收件箱，替代原来只增不减的message_queue:
+- 基于deque的环形缓冲区，容量固定
+- 按消息类型注册handler，消息到达即分发，不再堆积
+- 溢出策略: drop_oldest（覆盖最旧）/ drop_newest（拒收新消息）/ block（背压，等待空位）
+- block策略只为有消费者的类型入队，无人消费的类型直接丢弃计数，避免收件箱被占满后发送方一直阻塞
+- 溢出、分发、背压等待计数，供network和实验统计使用
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+
+INBOX_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+logger = logging.getLogger(__name__)
+
+
+class Inbox:
+    """有界消息收件箱（线程安全）"""
+
+    def __init__(
+        self,
+        capacity: int = 256,
+        policy: str = DROP_OLDEST,
+        block_timeout: float = 0.5,
+        high_watermark: float = 0.8,
+    ):
+        """
+        init收件箱
+
+        Args:
+            capacity: 最大缓存消息数
+            policy: 溢出策略 drop_oldest | drop_newest | block
+            block_timeout: block策略下等待空位的最长时间（秒），超时后丢弃新消息
+            high_watermark: 拥塞阈值（占用率），超过后network对发送方施加背压
+        """
+        if capacity <= 0:
+            raise ValueError(f"Inbox capacity must be positive: {capacity}")
+        if policy not in INBOX_POLICIES:
+            raise ValueError(f"Unknown inbox policy: {policy}")
+
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.high_watermark = high_watermark
+
+        self._queue = deque()
+        self._handlers: Dict[str, Callable[[Dict], None]] = {}
+        self._consumers = set()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+
+        # stats
+        self.received_count = 0
+        self.dispatched_count = 0
+        self.enqueued_count = 0
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+        self.blocked_waits = 0
+        self.dropped_unconsumed = 0
+        self.handler_errors = 0
+        self.peak_size = 0
+
+    def register_handler(self, message_type: str, handler: Callable[[Dict], None]):
+        """为消息类型注册handler，该类型消息到达时直接分发而不入队"""
+        self._handlers[message_type] = handler
+
+    def unregister_handler(self, message_type: str):
+        """注销消息类型的handler"""
+        self._handlers.pop(message_type, None)
+
+    def register_consumer(self, message_type: str):
+        """声明该类型的消息由get/drain取走（block策略下只为有消费者的类型入队）"""
+        self._consumers.add(message_type)
+
+    def unregister_consumer(self, message_type: str):
+        self._consumers.discard(message_type)
+
+    def put(self, message: Dict) -> bool:
+        """
+        投递消息
+
+        Returns:
+            消息是否被接收（分发或入队）；被溢出策略拒收时返回False
+        """
+        self.received_count += 1
+
+        message_type = message.get("type")
+        handler = self._handlers.get(message_type)
+        if handler is not None:
+            try:
+                handler(message)
+                self.dispatched_count += 1
+                return True
+            except Exception:
+                # handler失败时退回到入队，避免消息静默丢失
+                self.handler_errors += 1
+                logger.exception("handler处理 %s 失败", message_type)
+
+        with self._lock:
+            # block策略下无人消费的消息入队后永远不会被取走，收件箱占满后每次发送都会阻塞
+            if self.policy == BLOCK and message_type not in self._consumers:
+                self.dropped_unconsumed += 1
+                return False
+
+            if len(self._queue) >= self.capacity:
+                if self.policy == DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped_oldest += 1
+                elif self.policy == DROP_NEWEST:
+                    self.dropped_newest += 1
+                    return False
+                else:
+                    self.blocked_waits += 1
+                    has_space = self._not_full.wait_for(
+                        lambda: len(self._queue) < self.capacity,
+                        timeout=self.block_timeout,
+                    )
+                    if not has_space:
+                        self.dropped_newest += 1
+                        return False
+
+            self._queue.append(message)
+            self.enqueued_count += 1
+            self.peak_size = max(self.peak_size, len(self._queue))
+            return True
+
+    def get(self) -> Optional[Dict]:
+        """取出最早的一条消息，空时返回None"""
+        with self._lock:
+            if not self._queue:
+                return None
+            message = self._queue.popleft()
+            self._not_full.notify()
+            return message
+
+    def drain(self, message_type: Optional[str] = None) -> List[Dict]:
+        """
+        取出所有（或指定类型的）消息
+
+        Args:
+            message_type: 只取该类型的消息，None表示全部
+        """
+        with self._lock:
+            if message_type is None:
+                drained = list(self._queue)
+                self._queue.clear()
+            else:
+                drained = [m for m in self._queue if m.get("type") == message_type]
+                kept = [m for m in self._queue if m.get("type") != message_type]
+                self._queue = deque(kept)
+            if drained:
+                self._not_full.notify_all()
+            return drained
+
+    def clear(self):
+        """清空收件箱"""
+        with self._lock:
+            self._queue.clear()
+            self._not_full.notify_all()
+
+    def pressure(self) -> float:
+        """当前占用率 (0.0-1.0)"""
+        return len(self._queue) / self.capacity
+
+    def is_congested(self) -> bool:
+        """是否超过拥塞阈值"""
+        return self.pressure() >= self.high_watermark
+
+    def wait_for_space(self, timeout: float) -> bool:
+        """
+        等待占用率降到拥塞阈值以下（供network对发送方施加背压）
+
+        Returns:
+            超时前是否已解除拥塞
+        """
+        deadline = time.time() + timeout
+        with self._lock:
+            return self._not_full.wait_for(
+                lambda: len(self._queue) / self.capacity < self.high_watermark,
+                timeout=max(0.0, deadline - time.time()),
+            )
+
+    def get_stats(self) -> Dict:
+        """获取收件箱stats信息"""
+        return {
+            "size": len(self._queue),
+            "capacity": self.capacity,
+            "policy": self.policy,
+            "received": self.received_count,
+            "dispatched": self.dispatched_count,
+            "enqueued": self.enqueued_count,
+            "dropped_oldest": self.dropped_oldest,
+            "dropped_newest": self.dropped_newest,
+            "dropped_unconsumed": self.dropped_unconsumed,
+            "overflow": self.dropped_oldest + self.dropped_newest,
+            "blocked_waits": self.blocked_waits,
+            "handler_errors": self.handler_errors,
+            "peak_size": self.peak_size,
+        }
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __repr__(self):
+        return f"Inbox({len(self._queue)}/{self.capacity}, policy={self.policy})"
@@ -1,9 +1,51 @@
 """LLM基类"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
 from abc import ABC, abstractmethod
-from typing import Dict, Tuple
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import LatencyHistogram
+
+from .breaker import CircuitBreaker
+from .context import record_usage, remaining_time
+from .parser import parse_batch_decisions
+from .ratelimit import DeadlineExceeded, RateLimiter, RetryPolicy, acall_with_retry, call_with_retry
+
+# 创建各后端实例并发信号量时的全局锁
+_SEMAPHORE_LOCK = threading.Lock()
+
+
+def _set_waiter(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
 
 
 class BaseLLM(ABC):
+    # 后端名（由LLMCaller设置，用于遥测）
+    backend_name: str = ""
+    # 最大并发请求数（每个后端实例一个信号量，同步与异步调用共用）
+    max_concurrency: int = 8
+    # 名额等待的观察者（llm_pool.BackendLane）：统计排队深度与等待时间，可拒绝超出队列上限的请求
+    slot_observer = None
+    # 采样温度（同时作为响应缓存键的一部分）
+    generate_temperature: float = 0.7
+    validate_temperature: float = 0.3
+    # 限速与重试（由LLMCaller按配置设置；None表示不限速）
+    rate_limiter: Optional[RateLimiter] = None
+    retry_policy: Optional[RetryPolicy] = None
+    # 熔断器（由LLMCaller按配置设置；None表示不熔断）
+    breaker: Optional[CircuitBreaker] = None
+    # True时API错误向上抛出而不是返回默认值（"Error"/"N"），供LLMCaller做故障转移
+    raise_errors: bool = False
+    # 流式读取并增量解析（读到最终答案/首个Y或N即结束），仅OpenAI兼容与智谱后端支持
+    streaming: bool = False
+    # 请求服务商输出结构化JSON（OpenAI兼容后端的response_format），解析更稳健
+    json_mode: bool = False
+
     @abstractmethod
     def generate(self, question: str) -> Tuple[list, str]:
         """生成推理过程和答案"""
@@ -16,4 +58,233 @@ class BaseLLM(ABC):
 
     def health_check(self) -> bool:
         """健康检查"""
-        return True
\ No newline at end of file
+        return True
+
+    @property
+    def latency(self) -> LatencyHistogram:
+        """成功调用的延迟分布（毫秒，由LLMCaller记录，用于确定对冲时机）"""
+        histogram = self.__dict__.get("_latency")
+        if histogram is None:
+            histogram = LatencyHistogram()
+            self._latency = histogram
+        return histogram
+
+    def _request(self, fn: Callable[[], Any], tokens: float = 0.0) -> Any:
+        """经限速与重试执行一次API请求（截止时间取自llm_modules.context）"""
+        return call_with_retry(fn, self.rate_limiter, self.retry_policy, tokens)
+
+    async def _arequest(self, fn: Callable[[], Awaitable[Any]], tokens: float = 0.0) -> Any:
+        return await acall_with_retry(fn, self.rate_limiter, self.retry_policy, tokens)
+
+    @staticmethod
+    def _report_usage(response=None, prompt: str = "", completion: str = ""):
+        """向当前调用记录报告token用量：优先取响应中的usage，缺失时按字符数估算"""
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None)
+        record_usage(
+            prompt_tokens if isinstance(prompt_tokens, int) else len(prompt),
+            completion_tokens if isinstance(completion_tokens, int) else len(completion),
+        )
+
+    def validate_batch(self, proposals: List[Dict]) -> List[str]:
+        """
+        一次请求批量验证多个提案，返回与输入等长的Y/N列表
+
+        后端实现_request_batch_validation时合并为一次调用（分摊每次请求的固定延迟），
+        否则或结果无法解析时逐个调用validate
+        """
+        if not proposals:
+            return []
+        if len(proposals) > 1:
+            try:
+                content = self._request_batch_validation(self._batch_validation_prompt(proposals), len(proposals))
+            except NotImplementedError:
+                content = None
+            except Exception as e:
+                print(f"[WARN] 批量验证请求失败，逐个验证: {e}")
+                content = None
+            decisions = self._parse_batch_decisions(content, len(proposals)) if content else None
+            if decisions is not None:
+                return decisions
+        return [self.validate(proposal) for proposal in proposals]
+
+    def _request_batch_validation(self, prompt: str, count: int) -> str:
+        """发送批量验证请求并返回原始文本，由支持的后端覆盖"""
+        raise NotImplementedError
+
+    def _batch_validation_prompt(self, proposals: List[Dict]) -> str:
+        items = []
+        for i, proposal in enumerate(proposals, 1):
+            items.append(
+                f"[提案{i}]\n"
+                f"问题: {proposal.get('task_id', '未知')}\n"
+                f"推理: {proposal.get('reasoning', [])}\n"
+                f"答案: {proposal.get('answer', '无')}"
+            )
+        example = json.dumps(["Y", "N"][:len(proposals)] + ["Y"] * (len(proposals) - 2))
+        return (
+            f"从是否存在幻觉、是否符合逻辑、是否有意识形态错误角度逐个简洁快速验证以下{len(proposals)}个提案:\n\n"
+            + "\n\n".join(items)
+            + f"\n\n请只输出一个JSON数组，按顺序给出每个提案的结论（Y 或 N），例如: {example}\n"
+        )
+
+    @staticmethod
+    def _parse_batch_decisions(content: str, count: int) -> Optional[List[str]]:
+        """解析批量验证结果（见llm_modules.parser.parse_batch_decisions）"""
+        return parse_batch_decisions(content, count)
+
+    def _response_format(self) -> Dict:
+        """json_mode下请求服务商输出JSON对象（OpenAI兼容的response_format参数）"""
+        return {"response_format": {"type": "json_object"}} if self.json_mode else {}
+
+    async def agenerate(self, question: str) -> Tuple[list, str]:
+        """异步生成推理过程和答案（受max_concurrency限制）"""
+        async with self._concurrency_slot():
+            return await self._agenerate(question)
+
+    async def avalidate(self, proposal: Dict) -> str:
+        """异步验证提案，返回Y/N（受max_concurrency限制）"""
+        async with self._concurrency_slot():
+            return await self._avalidate(proposal)
+
+    async def avalidate_batch(self, proposals: List[Dict]) -> List[str]:
+        """异步批量验证（整批占用一个并发名额）"""
+        async with self._concurrency_slot():
+            return await self._avalidate_batch(proposals)
+
+    async def _agenerate(self, question: str) -> Tuple[list, str]:
+        """默认实现：在线程池中运行同步generate，有异步客户端的后端应覆盖"""
+        return await asyncio.to_thread(self.generate, question)
+
+    async def _avalidate(self, proposal: Dict) -> str:
+        """默认实现：在线程池中运行同步validate，有异步客户端的后端应覆盖"""
+        return await asyncio.to_thread(self.validate, proposal)
+
+    async def _avalidate_batch(self, proposals: List[Dict]) -> List[str]:
+        return await asyncio.to_thread(self.validate_batch, proposals)
+
+    @property
+    def concurrency_semaphore(self) -> threading.BoundedSemaphore:
+        """该后端实例的并发名额（跨线程、跨事件循环共用）"""
+        semaphore = self.__dict__.get("_semaphore")
+        if semaphore is None:
+            with _SEMAPHORE_LOCK:
+                semaphore = self.__dict__.get("_semaphore")
+                if semaphore is None:
+                    # 等待名额的异步调用: (事件循环, future)，释放名额时唤醒其中一个
+                    self._slot_waiters = deque()
+                    semaphore = threading.BoundedSemaphore(self.max_concurrency)
+                    self._semaphore = semaphore
+        return semaphore
+
+    @contextmanager
+    def concurrency_slot(self):
+        """
+        同步调用占用一个并发名额（在共识阶段截止时间内等待）
+
+        LLMCaller在调用同步generate/validate前进入；异步接口见_concurrency_slot
+
+        Raises:
+            DeadlineExceeded: 截止时间内没有空闲名额
+        """
+        budget = remaining_time()
+        semaphore = self.concurrency_semaphore
+        observer = self._enter_queue()
+        start = time.monotonic()
+        acquired = False
+        try:
+            acquired = semaphore.acquire(timeout=None if budget is None else max(0.0, budget))
+        finally:
+            if observer is not None:
+                observer.leave_queue(acquired, time.monotonic() - start)
+        if not acquired:
+            raise DeadlineExceeded(f"backend {self.backend_name or type(self).__name__} concurrency wait exceeds deadline")
+        try:
+            yield
+        finally:
+            self._release_slot(observer)
+
+    def _enter_queue(self):
+        observer = self.slot_observer
+        if observer is not None:
+            observer.enter_queue()
+        return observer
+
+    def _release_slot(self, observer=None):
+        """归还名额并唤醒一个等待中的异步调用（同步调用直接阻塞在信号量上，无需唤醒）"""
+        if observer is not None:
+            observer.release()
+        self.concurrency_semaphore.release()
+        self._wake_slot_waiter()
+
+    def _wake_slot_waiter(self):
+        while True:
+            with _SEMAPHORE_LOCK:
+                if not self._slot_waiters:
+                    return
+                loop, waiter = self._slot_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_set_waiter, waiter)
+                return
+            except RuntimeError:
+                continue  # 事件循环已关闭，唤醒下一个
+
+    def _discard_slot_waiter(self, entry):
+        """撤销登记；已被取出（唤醒已发出）时把唤醒转交给下一个等待者，避免名额空闲而无人被唤醒"""
+        with _SEMAPHORE_LOCK:
+            try:
+                self._slot_waiters.remove(entry)
+                return
+            except ValueError:
+                pass
+        self._wake_slot_waiter()
+
+    @asynccontextmanager
+    async def _concurrency_slot(self):
+        """
+        异步调用占用一个并发名额（与同步调用共用同一信号量）
+
+        名额被占满时登记一个future并挂起，不占用线程；名额释放时立即唤醒，
+        协程被取消或超时时不会遗留名额，也不会吞掉唤醒
+        """
+        semaphore = self.concurrency_semaphore
+        observer = self._enter_queue()
+        start = time.monotonic()
+        acquired = False
+        try:
+            await self._acquire_slot(semaphore)
+            acquired = True
+        finally:
+            if observer is not None:
+                observer.leave_queue(acquired, time.monotonic() - start)
+        try:
+            yield
+        finally:
+            self._release_slot(observer)
+
+    async def _acquire_slot(self, semaphore: threading.BoundedSemaphore):
+        budget = remaining_time()
+        deadline = None if budget is None else time.monotonic() + max(0.0, budget)
+        loop = asyncio.get_running_loop()
+        while not semaphore.acquire(blocking=False):
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                raise DeadlineExceeded(
+                    f"backend {self.backend_name or type(self).__name__} concurrency wait exceeds deadline"
+                )
+            entry = (loop, loop.create_future())
+            with _SEMAPHORE_LOCK:
+                self._slot_waiters.append(entry)
+            # 登记后再试一次，避免登记前释放的名额没有唤醒任何人
+            if semaphore.acquire(blocking=False):
+                self._discard_slot_waiter(entry)
+                break
+            try:
+                await asyncio.wait_for(entry[1], timeout)
+            except asyncio.TimeoutError:
+                # 回到循环开头：再试一次获取，仍失败则抛出DeadlineExceeded
+                self._discard_slot_waiter(entry)
+            except BaseException:
+                self._discard_slot_waiter(entry)
+                raise
@@ -0,0 +1,191 @@
+"""
+LLM后端熔断与健康探测
+
+- CircuitBreaker: 连续失败或连续超出延迟SLO达到阈值后熔断（open），
+  冷却期后进入半开（half-open）放行一个试探请求，成功则恢复
+- HealthMonitor: 后台线程定期对已熔断且冷却期已过的后端调用health_check，
+  不必等真实请求来试探
+
+熔断的后端不再发出请求；所有后端都熔断时验证结果为ABSTAIN（弃权），
+Agent立即弃权，法定人数统计无需等待这些节点超时
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 弃权（不计入Y/N票数）
+ABSTAIN = "ABSTAIN"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class BackendUnavailable(RuntimeError):
+    """后端已熔断，请求未发出"""
+
+
+class CircuitBreaker:
+    """单个后端的熔断器（线程安全）"""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        latency_slo_ms: Optional[float] = None,
+        reset_timeout: float = 30.0,
+    ):
+        """
+        Args:
+            failure_threshold: 连续失败（含超出延迟SLO）多少次后熔断
+            latency_slo_ms: 延迟SLO（毫秒），成功但超过该值也计为一次不良结果，None表示不检查
+            reset_timeout: 熔断后多少秒进入半开状态
+        """
+        self.failure_threshold = failure_threshold
+        self.latency_slo_ms = latency_slo_ms
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "rejected": 0, "failures": 0, "slo_breaches": 0, "probes": 0, "recovered": 0}
+
+    @classmethod
+    def from_config(cls, spec: Optional[Dict]) -> Optional["CircuitBreaker"]:
+        """由配置创建，未配置或enabled=False时返回None"""
+        if not spec or not spec.get("enabled", True):
+            return None
+        return cls(
+            failure_threshold=spec.get("failure_threshold", 5),
+            latency_slo_ms=spec.get("latency_slo_ms"),
+            reset_timeout=spec.get("reset_timeout", 30.0),
+        )
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+        self.stats["opened"] += 1
+
+    def _close(self):
+        if self.state != CLOSED:
+            self.stats["recovered"] += 1
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """
+        是否放行一个请求
+
+        半开状态只放行一个试探请求，其结果决定恢复还是重新熔断
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self._cooled_down():
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def available(self) -> bool:
+        """只读判断：未熔断，或已到可以试探的时间"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return self._cooled_down()
+            return not self._trial_in_flight
+
+    def record_success(self, latency_ms: Optional[float] = None):
+        with self._lock:
+            if self.latency_slo_ms is not None and latency_ms is not None and latency_ms > self.latency_slo_ms:
+                self.stats["slo_breaches"] += 1
+                self._record_bad()
+                return
+            self._close()
+
+    def record_failure(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self._record_bad()
+
+    def _record_bad(self):
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+            self._open()
+
+    def probe_due(self) -> bool:
+        """已熔断且冷却期已过（供HealthMonitor探测），探测期间占用试探名额"""
+        with self._lock:
+            if self.state == OPEN and self._cooled_down():
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self.stats["probes"] += 1
+                return True
+            return False
+
+    def probe_result(self, healthy: bool):
+        with self._lock:
+            if healthy:
+                self._close()
+            else:
+                self._open()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "state": self.state, "consecutive_failures": self.consecutive_failures}
+
+
+class HealthMonitor:
+    """后台健康探测：对熔断冷却期已过的后端调用health_check"""
+
+    def __init__(self, targets: List[Tuple[CircuitBreaker, object]], interval: float = 5.0):
+        """
+        Args:
+            targets: (熔断器, 后端实例) 列表，后端实例需提供health_check()
+            interval: 探测间隔（秒）
+        """
+        self.targets = targets
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check_once(self) -> int:
+        """探测一轮，返回探测的后端数"""
+        probed = 0
+        for breaker, llm in self.targets:
+            if not breaker.probe_due():
+                continue
+            probed += 1
+            try:
+                healthy = bool(llm.health_check())
+            except Exception:
+                healthy = False
+            breaker.probe_result(healthy)
+            print(f"[health] {getattr(llm, 'backend_name', type(llm).__name__)} 探测{'恢复' if healthy else '失败'}")
+        return probed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check_once()
+
+    def start(self) -> "HealthMonitor":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="llm-health", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
@@ -0,0 +1,183 @@
+"""
+LLM响应缓存
+
+两级缓存：进程内LRU + 可选的SQLite持久化存储
+- 键为 (backend, model, 调用类型, temperature, 输入) 的SHA-256
+- 支持TTL过期与按条目数淘汰（内存与磁盘分别限制）
+- 重复实验、视图切换后重试时相同的请求直接命中，省去API费用与延迟
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# 调用类型
+CALL_GENERATE = "generate"
+CALL_VALIDATE = "validate"
+
+
+def make_cache_key(backend: str, model: str, call_type: str, temperature: Optional[float], payload: Any) -> str:
+    """计算缓存键（payload为问题字符串或提案dict，按规范JSON序列化）"""
+    material = json.dumps(
+        [backend, model or "", call_type, temperature, payload],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """两级LLM响应缓存（线程安全）"""
+
+    def __init__(
+        self,
+        memory_size: int = 1024,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_disk_entries: int = 100000,
+    ):
+        """
+        init缓存
+
+        Args:
+            memory_size: 内存LRU最大条目数
+            path: SQLite文件路径，None表示只用内存
+            ttl: 过期时间（秒），None表示不过期
+            max_disk_entries: 磁盘最大条目数，超出时淘汰最久未访问的条目
+        """
+        self.memory_size = memory_size
+        self.path = path
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed)")
+            self._db.commit()
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "puts": 0,
+            "evictions": 0,
+        }
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        查询缓存
+
+        Returns:
+            (是否命中, 缓存值)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return True, value
+                del self._memory[key]
+                self.stats["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = json.loads(row[0]), row[1]
+                    if not self._expired(created, now):
+                        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        # 提升到内存层
+                        self._remember(key, created, value)
+                        self.stats["disk_hits"] += 1
+                        return True, value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.stats["expired"] += 1
+
+            self.stats["misses"] += 1
+            return False, None
+
+    def put(self, key: str, value: Any):
+        """写入缓存（值须可JSON序列化）"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self.stats["puts"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now, now),
+                )
+                self._evict_disk()
+                self._db.commit()
+
+    def _remember(self, key: str, created: float, value: Any):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self):
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed ASC LIMIT ?)",
+                (excess,),
+            )
+            self.stats["evictions"] += excess
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        stats["hit_rate"] = self.hit_rate()
+        return stats
+
+    def clear(self):
+        """清空内存层与磁盘层"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self):
+        return len(self._memory)
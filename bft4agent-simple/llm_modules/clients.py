@@ -0,0 +1,177 @@
+"""
+进程级HTTP客户端注册表
+
+同一 (backend, base_url, api_key) 的所有后端实例共享一个SDK客户端及其连接池，
+避免每个Agent各自建立TCP/TLS连接；连接池大小和keep-alive可统一配置，并支持预热
+"""
+import asyncio
+import inspect
+import logging
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+
+# SDK自身不重试（默认max_retries=2）：重试只由RetryPolicy负责，受截止时间约束并计入遥测
+SDK_MAX_RETRIES = 0
+
+# 连接池默认参数（可通过configure_pool修改，只影响之后新建的客户端）
+POOL_SETTINGS = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,
+    "timeout": 60.0,
+}
+
+_clients: Dict[Tuple, object] = {}
+# 异步客户端的连接绑定事件循环，按事件循环分别缓存
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+# close_all等待其他线程中的事件循环完成关闭的最长时间（秒）
+ASYNC_CLOSE_TIMEOUT = 5.0
+
+
+def configure_pool(**settings):
+    """修改连接池参数: max_connections / max_keepalive_connections / keepalive_expiry / timeout"""
+    unknown = set(settings) - set(POOL_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown pool settings: {sorted(unknown)}")
+    POOL_SETTINGS.update({k: v for k, v in settings.items() if v is not None})
+
+
+def _httpx_limits():
+    import httpx
+
+    return httpx.Limits(
+        max_connections=POOL_SETTINGS["max_connections"],
+        max_keepalive_connections=POOL_SETTINGS["max_keepalive_connections"],
+        keepalive_expiry=POOL_SETTINGS["keepalive_expiry"],
+    )
+
+
+def get_openai_client(api_key: str, base_url: Optional[str] = None, backend: str = "openai"):
+    """获取共享的openai.OpenAI客户端（OpenAI与OpenAI兼容的自定义端点共用）"""
+    key = (backend, base_url, api_key)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            import httpx
+            import openai
+
+            http_client = httpx.Client(limits=_httpx_limits(), timeout=POOL_SETTINGS["timeout"])
+            client = openai.OpenAI(
+                api_key=api_key, base_url=base_url, http_client=http_client, max_retries=SDK_MAX_RETRIES
+            )
+            _clients[key] = client
+        return client
+
+
+def get_async_openai_client(api_key: str, base_url: Optional[str] = None, backend: str = "openai"):
+    """获取当前事件循环上共享的openai.AsyncOpenAI客户端（须在协程中调用）"""
+    key = (backend, base_url, api_key)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        per_loop = _async_clients.setdefault(loop, {})
+        client = per_loop.get(key)
+        if client is None:
+            import httpx
+            import openai
+
+            http_client = httpx.AsyncClient(limits=_httpx_limits(), timeout=POOL_SETTINGS["timeout"])
+            client = openai.AsyncOpenAI(
+                api_key=api_key, base_url=base_url, http_client=http_client, max_retries=SDK_MAX_RETRIES
+            )
+            per_loop[key] = client
+        return client
+
+
+def get_zhipu_client(api_key: str):
+    """获取共享的智谱客户端"""
+    key = ("zhipu", None, api_key)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            from zai import ZhipuAiClient
+
+            client = ZhipuAiClient(api_key=api_key)
+            _clients[key] = client
+        return client
+
+
+def warm_up(client) -> bool:
+    """
+    预热连接：发一个轻量请求，让TCP/TLS握手在首次validate之前完成
+
+    即使端点不支持该请求（返回4xx），连接也已建立并进入keep-alive池
+    """
+    try:
+        client.models.list()
+        return True
+    except Exception as e:
+        logger.warning("预热请求失败（连接可能已建立）: %s", e)
+        return False
+
+
+def registered_clients() -> int:
+    """已注册的同步客户端数量"""
+    return len(_clients)
+
+
+def _close_async_client(loop, client):
+    """
+    在异步客户端所属的事件循环上关闭它
+
+    - 事件循环在其他线程中运行：提交到该循环并等待完成（最多ASYNC_CLOSE_TIMEOUT秒）
+    - 在该事件循环自身的协程中调用：创建关闭任务，由循环稍后执行
+    - 事件循环未运行：在该循环上直接执行关闭
+    - 事件循环已关闭：其连接随循环一并失效，只释放引用
+    """
+    if loop.is_closed():
+        return
+    close = getattr(client, "aclose", None) or getattr(client, "close", None)
+    if close is None:
+        return
+    result = close()
+    if not inspect.isawaitable(result):
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        loop.create_task(result)
+    elif loop.is_running():
+        asyncio.run_coroutine_threadsafe(result, loop).result(ASYNC_CLOSE_TIMEOUT)
+    else:
+        loop.run_until_complete(result)
+
+
+def close_all():
+    """
+    关闭并清空所有共享客户端
+
+    异步客户端在各自的事件循环上关闭（见_close_async_client）；
+    已被垃圾回收的事件循环上的客户端不在注册表中，无法再关闭
+    """
+    with _lock:
+        sync_clients = list(_clients.values())
+        async_clients = [(loop, client) for loop, per_loop in _async_clients.items() for client in per_loop.values()]
+        _clients.clear()
+        _async_clients.clear()
+
+    for client in sync_clients:
+        close = getattr(client, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                logger.warning("关闭客户端失败: %s", e)
+    # 在锁外关闭：等待其他线程的事件循环时不阻塞新客户端的获取
+    for loop, client in async_clients:
+        try:
+            _close_async_client(loop, client)
+        except Exception as e:
+            logger.warning("关闭异步客户端失败: %s", e)
@@ -0,0 +1,98 @@
+"""
+LLM调用上下文
+
+用contextvars在调用链上传递共识阶段的截止时间、调用标签（agent/phase）以及
+当前调用的遥测记录，后端无需改动函数签名即可读取。
+每个线程/协程有独立的上下文，因此需在实际执行LLM调用的线程内设置
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# 绝对截止时间（time.monotonic()），None表示不限
+_deadline: contextvars.ContextVar = contextvars.ContextVar("llm_deadline", default=None)
+# 调用标签，如 {"agent": "agent_1", "phase": "prepare"}
+_labels: contextvars.ContextVar = contextvars.ContextVar("llm_labels", default={})
+# 当前进行中的调用记录（llm_modules.telemetry.CallRecord）
+_record: contextvars.ContextVar = contextvars.ContextVar("llm_record", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """
+    在作用域内设置剩余时间预算（嵌套时取更早的截止时间）
+
+    Args:
+        seconds: 预算秒数，None表示不额外限制
+    """
+    current = _deadline.get()
+    deadline = current
+    if seconds is not None:
+        candidate = time.monotonic() + seconds
+        deadline = candidate if current is None else min(current, candidate)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    """当前截止时间（time.monotonic()时刻）"""
+    return _deadline.get()
+
+
+def remaining_time() -> Optional[float]:
+    """距截止时间的剩余秒数（可能为负），未设置时返回None"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextmanager
+def call_scope(**labels):
+    """在作用域内为LLM调用附加标签（如agent、phase），嵌套时合并"""
+    token = _labels.set({**_labels.get(), **labels})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def current_labels() -> Dict:
+    return dict(_labels.get())
+
+
+@contextmanager
+def record_scope(record):
+    """在作用域内将record设为当前调用记录，供后端补充token数、重试次数等"""
+    token = _record.set(record)
+    try:
+        yield record
+    finally:
+        _record.reset(token)
+
+
+def current_record():
+    return _record.get()
+
+
+def record_usage(prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+    """后端报告本次请求的token用量（可多次调用，累加）"""
+    record = _record.get()
+    if record is None:
+        return
+    if prompt_tokens is not None:
+        record.prompt_tokens = (record.prompt_tokens or 0) + prompt_tokens
+    if completion_tokens is not None:
+        record.completion_tokens = (record.completion_tokens or 0) + completion_tokens
+
+
+def record_retry():
+    """重试逻辑报告一次重试"""
+    record = _record.get()
+    if record is not None:
+        record.retries += 1
@@ -0,0 +1,90 @@
+"""
+对冲请求（hedged requests）策略
+
+主请求超过该后端历史延迟的高分位（默认p95）仍未返回时，再发一个副本请求，
+取先完成者。对冲预算限制副本请求占总调用数的比例，避免在整体变慢时放大负载
+"""
+
+import threading
+from typing import Dict, Optional
+
+from metrics import LatencyHistogram
+
+
+class HedgePolicy:
+    """对冲时机与预算"""
+
+    def __init__(
+        self,
+        quantile: float = 95.0,
+        budget: float = 0.1,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        initial_delay: Optional[float] = None,
+    ):
+        """
+        Args:
+            quantile: 触发对冲的延迟分位（0-100）
+            budget: 对冲请求数 / 总调用数 的上限
+            min_samples: 延迟样本不足时不按分位对冲
+            min_delay: 对冲等待时间下限（秒）
+            initial_delay: 样本不足时使用的固定等待时间（秒），None表示样本不足时不对冲
+        """
+        self.quantile = quantile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "hedges": 0,  # 发出的对冲请求数
+            "hedge_wins": 0,  # 对冲请求先完成的次数
+            "budget_exhausted": 0,  # 因预算不足未能对冲的次数
+            "failovers": 0,  # 因错误切换到下一个后端的次数
+        }
+
+    @classmethod
+    def from_config(cls, spec: Optional[Dict]) -> Optional["HedgePolicy"]:
+        if not spec or not spec.get("enabled", True):
+            return None
+        return cls(
+            quantile=spec.get("quantile", 95.0),
+            budget=spec.get("budget", 0.1),
+            min_samples=spec.get("min_samples", 20),
+            min_delay=spec.get("min_delay", 0.05),
+            initial_delay=spec.get("initial_delay"),
+        )
+
+    def delay(self, histogram: LatencyHistogram) -> Optional[float]:
+        """
+        主请求发出后多久触发对冲（秒）
+
+        Args:
+            histogram: 主后端的延迟直方图（毫秒）
+        """
+        if histogram.count < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, histogram.percentile(self.quantile) / 1000.0)
+
+    def record_call(self):
+        with self._lock:
+            self.stats["calls"] += 1
+
+    def try_acquire(self) -> bool:
+        """申请一次对冲（不超过预算）"""
+        with self._lock:
+            if self.stats["hedges"] + 1 > self.budget * self.stats["calls"]:
+                self.stats["budget_exhausted"] += 1
+                return False
+            self.stats["hedges"] += 1
+            return True
+
+    def record(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
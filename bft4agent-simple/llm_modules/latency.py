@@ -0,0 +1,300 @@
+"""
+LLM延迟模型（供MockLLM与本地模拟服务使用）
+
+真实服务商的延迟是重尾的：大多数请求集中在中位数附近，少数请求慢一个数量级，
+偶尔整条请求卡住直到超时。均匀分布的sleep测不出尾延迟优化（对冲、熔断、提前结束）的效果。
+
+LatencyModel支持:
+- 按调用类型配置的分布: fixed / uniform / lognormal / pareto（重尾）/ empirical（样本回放）
+- 每个Agent的速度系数（显式指定，或按agent_spread随机但可复现地生成）
+- 偶发的卡顿（额外延迟）与超时（等待timeout_seconds后抛出LLMTimeout）
+- 由真实后端的遥测记录（LLMTelemetry的JSONL）拟合
+- 使用clock.VirtualClock时只推进虚拟时间，不真正阻塞；并发调用各自按起始时刻+延迟推进，不累加
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import statistics
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from clock import VirtualClock, create_clock
+
+from .context import current_labels
+
+
+class LLMTimeout(TimeoutError):
+    """模拟的服务商请求超时"""
+
+
+_DIST_ARGS = {
+    "fixed": ["ms"],
+    "uniform": ["min_ms", "max_ms"],
+    "lognormal": ["median_ms", "sigma"],
+    "pareto": ["scale_ms", "alpha"],
+}
+
+
+def parse_distribution(spec) -> Optional[Dict]:
+    """
+    规范化分布配置
+
+    spec可以是:
+        None / 0                    无延迟
+        数字                         固定毫秒
+        "uniform:min:max"           均匀分布（毫秒）
+        "lognormal:median:sigma"    对数正态分布（中位数毫秒）
+        "pareto:scale:alpha"        帕累托分布（最小值毫秒，alpha越小尾部越重）
+        dict                        {"dist": "lognormal", "median_ms": 300, "sigma": 0.5}、
+                                    {"dist": "empirical", "samples_ms": [...]} 等
+    """
+    if not spec:
+        return None
+    if isinstance(spec, (int, float)):
+        return {"dist": "fixed", "ms": float(spec)}
+    if isinstance(spec, str):
+        name, *args = spec.split(":")
+        keys = _DIST_ARGS.get(name)
+        if keys is None:
+            raise ValueError(f"Unknown latency distribution: {name}")
+        return {"dist": name, **dict(zip(keys, (float(a) for a in args)))}
+    if spec.get("dist", "fixed") not in _DIST_ARGS and spec.get("dist") != "empirical":
+        raise ValueError(f"Unknown latency distribution: {spec.get('dist')}")
+    return dict(spec)
+
+
+def make_latency_sampler(spec, rng: random.Random) -> Callable[[], float]:
+    """由分布配置构造采样函数（返回秒），spec格式见parse_distribution"""
+    spec = parse_distribution(spec)
+    if spec is None:
+        return lambda: 0.0
+
+    dist = spec.get("dist", "fixed")
+    if dist == "fixed":
+        return lambda: spec.get("ms", 0.0) / 1000.0
+    if dist == "uniform":
+        return lambda: rng.uniform(spec["min_ms"], spec["max_ms"]) / 1000.0
+    if dist == "lognormal":
+        mu = math.log(spec["median_ms"])
+        return lambda: rng.lognormvariate(mu, spec.get("sigma", 0.5)) / 1000.0
+    if dist == "pareto":
+        return lambda: spec["scale_ms"] * rng.paretovariate(spec.get("alpha", 1.5)) / 1000.0
+    samples = spec["samples_ms"]
+    return lambda: rng.choice(samples) / 1000.0
+
+
+class LatencyModel:
+    """按调用类型与Agent采样的LLM延迟模型"""
+
+    # 未配置时沿用MockLLM原有的均匀分布
+    DEFAULTS = {"generate": "uniform:100:500", "validate": "uniform:50:200"}
+
+    def __init__(
+        self,
+        generate=None,
+        validate=None,
+        agent_factors: Optional[Dict[str, float]] = None,
+        agent_spread: float = 0.0,
+        stall_prob: float = 0.0,
+        stall=None,
+        timeout_prob: float = 0.0,
+        timeout_seconds: float = 30.0,
+        seed: Optional[int] = None,
+        clock=None,
+    ):
+        """
+        Args:
+            generate, validate: 两类调用的延迟分布（见parse_distribution），None用默认值
+            agent_factors: 显式的Agent速度系数（>1表示更慢），如 {"agent_3": 2.5}
+            agent_spread: 未显式指定的Agent的系数服从 lognormal(0, agent_spread)，0表示都为1
+            stall_prob: 每次调用发生卡顿的概率
+            stall: 卡顿的额外延迟分布（默认 uniform:2000:8000）
+            timeout_prob: 每次调用超时的概率（等待timeout_seconds后抛出LLMTimeout）
+            timeout_seconds: 超时前等待的秒数
+            seed: 随机种子（Agent系数只由种子与Agent ID决定，可复现）
+            clock: 时钟（WallClock/VirtualClock），默认真实时钟
+        """
+        self.distributions = {
+            "generate": parse_distribution(generate or self.DEFAULTS["generate"]),
+            "validate": parse_distribution(validate or self.DEFAULTS["validate"]),
+        }
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self._samplers = {kind: make_latency_sampler(spec, self.rng) for kind, spec in self.distributions.items()}
+        self.agent_factors = dict(agent_factors or {})
+        self.agent_spread = agent_spread
+        self.stall_prob = stall_prob
+        self.stall = parse_distribution(stall or "uniform:2000:8000")
+        self._stall_sampler = make_latency_sampler(self.stall, self.rng)
+        self.timeout_prob = timeout_prob
+        self.timeout_seconds = timeout_seconds
+        self.clock = clock or create_clock("wall")
+        self.stats = {"calls": 0, "stalls": 0, "timeouts": 0}
+
+    @classmethod
+    def from_config(cls, spec) -> "LatencyModel":
+        """
+        由配置创建
+
+        spec为None时使用默认分布；含"trace"时先由遥测记录拟合，再用其余字段覆盖
+        """
+        if isinstance(spec, LatencyModel):
+            return spec
+        spec = dict(spec or {})
+        clock = create_clock(spec.pop("clock", "wall"))
+        trace = spec.pop("trace", None)
+        if trace:
+            fitted = cls.fit(load_trace(trace)).to_config()
+            spec = {**fitted, **spec}
+        return cls(clock=clock, **spec)
+
+    # === 采样 ===
+
+    def agent_factor(self, agent: Optional[str]) -> float:
+        """Agent的速度系数（同一种子下固定）"""
+        if agent is None:
+            return 1.0
+        if agent in self.agent_factors:
+            return self.agent_factors[agent]
+        if self.agent_spread <= 0:
+            return 1.0
+        digest = hashlib.sha256(f"{self.seed}:{agent}".encode()).digest()
+        factor = math.exp(random.Random(digest).gauss(0.0, self.agent_spread))
+        self.agent_factors[agent] = factor
+        return factor
+
+    def sample(self, call_type: str, agent: Optional[str] = None) -> Tuple[float, bool]:
+        """
+        采样一次调用的延迟
+
+        Args:
+            call_type: generate | validate（其他类型按validate处理）
+            agent: Agent ID，None时取当前调用上下文的agent标签
+
+        Returns:
+            (秒数, 是否超时)
+        """
+        if agent is None:
+            agent = current_labels().get("agent")
+        self.stats["calls"] += 1
+        if self.timeout_prob and self.rng.random() < self.timeout_prob:
+            self.stats["timeouts"] += 1
+            return self.timeout_seconds, True
+
+        sampler = self._samplers.get(call_type, self._samplers["validate"])
+        seconds = sampler() * self.agent_factor(agent)
+        if self.stall_prob and self.rng.random() < self.stall_prob:
+            self.stats["stalls"] += 1
+            seconds += self._stall_sampler()
+        return seconds, False
+
+    def delay(self, call_type: str, agent: Optional[str] = None):
+        """按模型等待（虚拟时钟下只推进时间），超时时抛出LLMTimeout"""
+        started = self.clock.now()
+        seconds, timed_out = self.sample(call_type, agent)
+        self.clock.sleep_until(started + seconds)
+        if timed_out:
+            raise LLMTimeout(f"mock LLM {call_type} timed out after {seconds:.1f}s")
+
+    async def adelay(self, call_type: str, agent: Optional[str] = None):
+        started = self.clock.now()
+        seconds, timed_out = self.sample(call_type, agent)
+        if isinstance(self.clock, VirtualClock):
+            self.clock.sleep_until(started + seconds)
+            await asyncio.sleep(0)
+        else:
+            await asyncio.sleep(seconds)
+        if timed_out:
+            raise LLMTimeout(f"mock LLM {call_type} timed out after {seconds:.1f}s")
+
+    # === 拟合 ===
+
+    @classmethod
+    def fit(cls, records: Iterable[Dict], stall_multiplier: float = 10.0, **kwargs) -> "LatencyModel":
+        """
+        由遥测记录（CallRecord字典）拟合
+
+        - 每类调用的主体按对数正态拟合（对数均值/标准差）
+        - 超过中位数stall_multiplier倍的样本视为卡顿，单独统计概率与分布
+        - 错误类名含Timeout的记录计为超时
+        - Agent系数为该Agent样本对数残差均值的指数
+
+        Args:
+            records: 可迭代的记录字典（含call_type、latency_ms、agent、error、cache_hit）
+            stall_multiplier: 卡顿判定倍数
+            kwargs: 传给构造函数的其他参数（如seed、clock）
+        """
+        samples: Dict[str, List[Tuple[Optional[str], float]]] = {"generate": [], "validate": []}
+        timeouts = total = 0
+        for record in records:
+            if record.get("cache_hit"):
+                continue
+            kind = "generate" if record.get("call_type") == "generate" else "validate"
+            total += 1
+            error = record.get("error") or ""
+            if "Timeout" in error or "Deadline" in error:
+                timeouts += 1
+                continue
+            if error or not record.get("latency_ms"):
+                continue
+            samples[kind].append((record.get("agent"), float(record["latency_ms"])))
+
+        params = {}
+        stalls: List[float] = []
+        residuals: Dict[str, List[float]] = {}
+        body_count = 0
+        for kind, values in samples.items():
+            if not values:
+                continue
+            median = statistics.median(v for _, v in values)
+            body = [(agent, v) for agent, v in values if v <= median * stall_multiplier]
+            stalls.extend(v - median for _, v in values if v > median * stall_multiplier)
+            logs = [math.log(v) for _, v in body]
+            mu = statistics.fmean(logs)
+            sigma = statistics.pstdev(logs) if len(logs) > 1 else 0.0
+            params[kind] = {"dist": "lognormal", "median_ms": math.exp(mu), "sigma": sigma}
+            body_count += len(body)
+            for agent, v in body:
+                if agent is not None:
+                    residuals.setdefault(agent, []).append(math.log(v) - mu)
+
+        if stalls:
+            params["stall_prob"] = len(stalls) / (body_count + len(stalls))
+            params["stall"] = {"dist": "empirical", "samples_ms": sorted(stalls)}
+        if total:
+            params["timeout_prob"] = timeouts / total
+        agent_factors = {agent: math.exp(statistics.fmean(r)) for agent, r in residuals.items()}
+        if agent_factors:
+            params["agent_factors"] = agent_factors
+        return cls(**{**params, **kwargs})
+
+    def to_config(self) -> Dict:
+        """导出为可写入配置的字典（不含时钟与种子）"""
+        config = {
+            "generate": self.distributions["generate"],
+            "validate": self.distributions["validate"],
+            "agent_spread": self.agent_spread,
+            "stall_prob": self.stall_prob,
+            "stall": self.stall,
+            "timeout_prob": self.timeout_prob,
+            "timeout_seconds": self.timeout_seconds,
+        }
+        if self.agent_factors:
+            config["agent_factors"] = dict(self.agent_factors)
+        return config
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
+
+
+def load_trace(path: str) -> List[Dict]:
+    """读取LLMTelemetry写出的JSONL调用记录"""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
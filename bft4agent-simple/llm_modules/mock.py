@@ -1,16 +1,84 @@
 """Mock LLM - 用于测试"""
 import random
-import time
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
+
+import arith
+from answers import to_number
+
 from .base import BaseLLM
+from .latency import LatencyModel, LLMTimeout
 
 
 class MockLLM(BaseLLM):
-    def __init__(self, accuracy: float = 0.85):
+    def __init__(self, accuracy: float = 0.85, latency=None):
+        """
+        Args:
+            accuracy: 生成正确答案的概率
+            latency: 延迟模型配置或LatencyModel（见latency.LatencyModel.from_config），
+                     None时沿用原有的均匀分布延迟
+        """
         self.accuracy = accuracy
+        self.latency_model = LatencyModel.from_config(latency)
+
+    def _timed_out(self, error: LLMTimeout):
+        if self.raise_errors:
+            raise error
+        print(f"[ERROR] MockLLM: {error}")
 
     def generate(self, question: str) -> Tuple[list, str]:
-        time.sleep(random.uniform(0.1, 0.5))
+        try:
+            self.latency_model.delay("generate")
+        except LLMTimeout as e:
+            self._timed_out(e)
+            return ["API调用失败"], "Error"
+        return self._generate_result(question)
+
+    def validate(self, proposal: Dict) -> str:
+        try:
+            self.latency_model.delay("validate")
+        except LLMTimeout as e:
+            self._timed_out(e)
+            return "N"
+        decision = self._judge(proposal)
+        self._report_usage(prompt=str(proposal), completion=decision)
+        return decision
+
+    def validate_batch(self, proposals: List[Dict]) -> List[str]:
+        # 一次请求的固定延迟由整批分摊
+        try:
+            self.latency_model.delay("validate")
+        except LLMTimeout as e:
+            self._timed_out(e)
+            return ["N"] * len(proposals)
+        return [self._judge(proposal) for proposal in proposals]
+
+    async def _agenerate(self, question: str) -> Tuple[list, str]:
+        try:
+            await self.latency_model.adelay("generate")
+        except LLMTimeout as e:
+            self._timed_out(e)
+            return ["API调用失败"], "Error"
+        return self._generate_result(question)
+
+    async def _avalidate(self, proposal: Dict) -> str:
+        try:
+            await self.latency_model.adelay("validate")
+        except LLMTimeout as e:
+            self._timed_out(e)
+            return "N"
+        decision = self._judge(proposal)
+        self._report_usage(prompt=str(proposal), completion=decision)
+        return decision
+
+    async def _avalidate_batch(self, proposals: List[Dict]) -> List[str]:
+        try:
+            await self.latency_model.adelay("validate")
+        except LLMTimeout as e:
+            self._timed_out(e)
+            return ["N"] * len(proposals)
+        return [self._judge(proposal) for proposal in proposals]
+
+    def _generate_result(self, question: str) -> Tuple[list, str]:
         reasoning, answer = self._solve_math(question)
 
         # 调试输出
@@ -27,16 +95,16 @@ class MockLLM(BaseLLM):
             f"步骤2: {reasoning}",
             f"步骤3: 得出答案 {answer}",
         ]
+        # 模拟的token用量（按字符数估算）
+        self._report_usage(prompt=question, completion="".join(reasoning_steps) + answer)
         return reasoning_steps, answer
 
-    def validate(self, proposal: Dict) -> str:
+    def _judge(self, proposal: Dict) -> str:
         """
         Mock验证逻辑：模拟从幻觉、逻辑、意识形态角度验证
 
         关键修改：好节点会实际验证数学问题的答案是否正确
         """
-        time.sleep(random.uniform(0.05, 0.2))
-
         answer = proposal.get("answer", "")
         reasoning = proposal.get("reasoning", [])
         task_content = proposal.get("task_content", "")  # 使用task_content而不是task_id
@@ -70,44 +138,17 @@ class MockLLM(BaseLLM):
         1. 纯数学表达式："2 + 2 = ?"
         2. 带system prompt的格式："你是一位数学专家...\n\n问题: 2 + 2 = ?"
         """
+        solved = arith.solve(question)
+        if solved is None:
+            print(f"[MockLLM._solve_math] 解析失败: question={repr(question)}")
+            return "无法解析问题", "0"
+        math_expr, result = solved
         try:
-            # 提取数学表达式
-            math_expr = None
-
-            # 方法1：查找 "问题:" 或 "Question:" 后面的内容
-            if "问题:" in question or "Question:" in question:
-                # 分割字符串，取最后一部分（实际的问题）
-                parts = question.split("问题:" if "问题:" in question else "Question:")
-                if len(parts) > 1:
-                    actual_question = parts[-1].strip()
-                    # 提取等号前面的表达式
-                    if "=" in actual_question:
-                        expr = actual_question.split("=")[0].strip()
-                        math_expr = expr
-
-            # 方法2：如果没有标记，尝试直接从整个字符串中提取
-            if math_expr is None and "=" in question:
-                # 取最后一个等号前面的部分
-                parts = question.rsplit("=", 1)
-                if len(parts) > 1:
-                    # 从这部分中提取数学表达式（找最后一个运算符后面的内容）
-                    before_eq = parts[0].strip()
-                    # 尝试从后往前找数字开始的位置
-                    import re
-                    # 匹配数学表达式（数字 运算符 数字）
-                    match = re.search(r'(\d+(?:\.\d+)?\s*[+\-*/]\s*\d+(?:\.\d+)?)', before_eq)
-                    if match:
-                        math_expr = match.group(1)
-
-            # 计算表达式
-            if math_expr:
-                result = eval(math_expr)
-                return f"计算 {math_expr} = {result}", str(result)
-
-        except Exception as e:
-            print(f"[MockLLM._solve_math] 解析失败: {e}, question={repr(question)}")
-
-        return "无法解析问题", "0"
+            result_text = str(result)
+        except ValueError:
+            print(f"[MockLLM._solve_math] 结果无法转换: question={repr(question)}")
+            return "无法解析问题", "0"
+        return f"计算 {math_expr} = {result_text}", result_text
 
     def _extract_and_validate_answer(self, task_id: str, proposed_answer: str) -> bool:
         """
@@ -120,51 +161,23 @@ class MockLLM(BaseLLM):
         Returns:
             True if answer is correct, False otherwise
         """
-        try:
-            # 尝试从task_id中提取数学表达式（格式如 "2 + 2 = ?"）
-            import re
-
-            # 匹配数学表达式（支持 +, -, *, /）
-            math_pattern = r'(\d+(?:\.\d+)?)\s*([+\-*/])\s*(\d+(?:\.\d+)?)'
-            match = re.search(math_pattern, task_id)
-
-            if match:
-                # 提取操作数和运算符
-                num1 = float(match.group(1))
-                operator = match.group(2)
-                num2 = float(match.group(3))
-
-                # 计算正确答案
-                if operator == '+':
-                    correct_result = num1 + num2
-                elif operator == '-':
-                    correct_result = num1 - num2
-                elif operator == '*':
-                    correct_result = num1 * num2
-                elif operator == '/':
-                    correct_result = num1 / num2 if num2 != 0 else 0
-                else:
-                    return True  # 无法验证，默认通过
-
-                # 比较答案（处理浮点数精度问题）
-                try:
-                    proposed_num = float(proposed_answer)
-                    # 允许小的浮点数误差
-                    is_correct = abs(proposed_num - correct_result) < 0.001
-
-                    if not is_correct:
-                        print(f"[验证] 答案错误: 预期 {correct_result}, 实际 {proposed_answer}")
-
-                    return is_correct
-                except ValueError:
-                    # 无法转换为数字，答案格式错误
-                    print(f"[验证] 答案格式错误: {proposed_answer}")
-                    return False
-
+        # 与生成共用同一求值缓存，同一任务只解析计算一次
+        solved = arith.solve(task_id)
+        if solved is None:
             # 无法提取数学问题，默认通过
             return True
-
-        except Exception as e:
-            # 验证过程出错，保守策略：默认通过
-            print(f"[验证] 验证过程出错: {e}")
-            return True
\ No newline at end of file
+        correct_result = solved[1]
+
+        # 比较答案（处理浮点数精度问题）
+        # "4.0"、"答案是4"等写法按规范化后的数值比较
+        proposed_num = to_number(proposed_answer)
+        if proposed_num is None:
+            # 无法转换为数字，答案格式错误
+            print(f"[验证] 答案格式错误: {proposed_answer}")
+            return False
+
+        # 允许小的浮点数误差
+        is_correct = abs(proposed_num - correct_result) < 0.001
+        if not is_correct:
+            print(f"[验证] 答案错误: 预期 {correct_result}, 实际 {proposed_answer}")
+        return is_correct
@@ -1,69 +1,175 @@
 """OpenAI GPT模型"""
 from typing import Dict, Tuple
 from .base import BaseLLM
+from .parser import JSON_DECISION_FORMAT, JSON_GENERATION_FORMAT, parse_decision, parse_generation
+from .ratelimit import estimate_tokens
+from .streaming import AnswerStreamParser, DecisionStreamParser, aconsume_stream, consume_stream
+from .clients import get_openai_client, get_async_openai_client
 
 
 class OpenAILLM(BaseLLM):
+    # 共享客户端的后端标识与错误日志前缀（OpenAI兼容的子类覆盖）
+    client_backend = "openai"
+    log_name = "OpenAI API"
+
     def __init__(self, api_key: str, base_url: str = None, model: str = "gpt-3.5-turbo"):
         try:
-            import openai
-            self.client = openai.OpenAI(api_key=api_key, base_url=base_url)
-            self.model = model
+            import openai  # noqa: F401
         except ImportError:
             raise ImportError("pip install openai")
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        # 相同端点和密钥的实例共享同一个客户端及其连接池
+        self.client = get_openai_client(api_key, base_url, backend=self.client_backend)
 
-    def generate(self, question: str) -> Tuple[list, str]:
-        prompt = f"""请解决以下问题，展示推理过程:
+    @property
+    def async_client(self):
+        """当前事件循环上共享的异步客户端"""
+        return get_async_openai_client(self.api_key, self.base_url, backend=self.client_backend)
+
+    def _generation_prompt(self, question: str) -> str:
+        if self.json_mode:
+            return f"请解决以下问题，展示推理过程:\n问题: {question}\n{JSON_GENERATION_FORMAT}\n"
+        return f"""请解决以下问题，展示推理过程:
 问题: {question}
 请按格式回答:
 推理步骤1: ...
 推理步骤2: ...
 最终答案: ...
 """
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=500
-            )
-            content = response.choices[0].message.content
-
-            reasoning, answer = [], ""
-            for line in content.split("\n"):
-                line = line.strip()
-                if "推理步骤" in line or "步骤" in line:
-                    reasoning.append(line)
-                elif "最终答案" in line or "答案" in line:
-                    answer = line.split(":")[-1].strip() if ":" in line else line
-
-            if not reasoning:
-                reasoning = [content]
-            return reasoning, answer
-        except Exception as e:
-            print(f"[ERROR] OpenAI API: {e}")
-            return ["API调用失败"], "Error"
 
-    def validate(self, proposal: Dict) -> str:
-        prompt = f"""从是否存在幻觉、是否符合逻辑、是否有意识形态错误角度来简洁快速验证提案:
+    def _validation_prompt(self, proposal: Dict) -> str:
+        instruction = JSON_DECISION_FORMAT if self.json_mode else "请只回答: Y 或 N"
+        return f"""从是否存在幻觉、是否符合逻辑、是否有意识形态错误角度来简洁快速验证提案:
 问题: {proposal.get('task_id', '未知')}
 推理: {proposal.get('reasoning', [])}
 答案: {proposal.get('answer', '无')}
-请只回答: Y 或 N
+{instruction}
 """
-        try:
-            response = self.client.chat.completions.create(
+
+    def _parse_generation(self, content: str) -> Tuple[list, str]:
+        return parse_generation(content)
+
+    def _parse_decision(self, content: str) -> str:
+        # 无法识别时默认N
+        return parse_decision(content)
+
+    def _chat(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        """限速并带重试地发送一次对话请求，返回回复文本"""
+        response = self._request(
+            lambda: self.client.chat.completions.create(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=10
-            )
-            content = response.choices[0].message.content.strip().upper()
-            # 只返回Y或N，如果格式错误则默认N
-            return "Y" if "Y" in content else "N" if "N" in content else "N"
-        except:
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **self._response_format()
+            ),
+            estimate_tokens(prompt, max_tokens),
+        )
+        content = response.choices[0].message.content
+        self._report_usage(response, prompt, content or "")
+        return content
+
+    async def _achat(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        response = await self._arequest(
+            lambda: self.async_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **self._response_format()
+            ),
+            estimate_tokens(prompt, max_tokens),
+        )
+        content = response.choices[0].message.content
+        self._report_usage(response, prompt, content or "")
+        return content
+
+    def _chat_stream(self, prompt: str, temperature: float, max_tokens: int, parser):
+        """流式请求：解析器得出结果后立即关闭流，剩余生成不再等待"""
+        stream = self._request(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                **self._response_format()
+            ),
+            estimate_tokens(prompt, max_tokens),
+        )
+        consume_stream(stream, parser)
+        self._report_usage(None, prompt, parser.content)
+        return parser.result()
+
+    async def _achat_stream(self, prompt: str, temperature: float, max_tokens: int, parser):
+        stream = await self._arequest(
+            lambda: self.async_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                **self._response_format()
+            ),
+            estimate_tokens(prompt, max_tokens),
+        )
+        await aconsume_stream(stream, parser)
+        self._report_usage(None, prompt, parser.content)
+        return parser.result()
+
+    def generate(self, question: str) -> Tuple[list, str]:
+        try:
+            prompt = self._generation_prompt(question)
+            if self.streaming and not self.json_mode:
+                return self._chat_stream(prompt, self.generate_temperature, 500, AnswerStreamParser())
+            return self._parse_generation(self._chat(prompt, self.generate_temperature, 500))
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            print(f"[ERROR] {self.log_name}: {e}")
+            return ["API调用失败"], "Error"
+
+    def validate(self, proposal: Dict) -> str:
+        try:
+            prompt = self._validation_prompt(proposal)
+            if self.streaming:
+                return self._chat_stream(prompt, self.validate_temperature, 10, DecisionStreamParser())
+            return self._parse_decision(self._chat(prompt, self.validate_temperature, 10))
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            print(f"[ERROR] {self.log_name} validation: {e}")
             return "N"
 
+    async def _agenerate(self, question: str) -> Tuple[list, str]:
+        try:
+            prompt = self._generation_prompt(question)
+            if self.streaming and not self.json_mode:
+                return await self._achat_stream(prompt, self.generate_temperature, 500, AnswerStreamParser())
+            return self._parse_generation(await self._achat(prompt, self.generate_temperature, 500))
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            print(f"[ERROR] {self.log_name}: {e}")
+            return ["API调用失败"], "Error"
+
+    async def _avalidate(self, proposal: Dict) -> str:
+        try:
+            prompt = self._validation_prompt(proposal)
+            if self.streaming:
+                return await self._achat_stream(prompt, self.validate_temperature, 10, DecisionStreamParser())
+            return self._parse_decision(await self._achat(prompt, self.validate_temperature, 10))
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            print(f"[ERROR] {self.log_name} validation: {e}")
+            return "N"
+
+    def _request_batch_validation(self, prompt: str, count: int) -> str:
+        return self._chat(prompt, self.validate_temperature, 10 + 6 * count)
+
     def health_check(self) -> bool:
         try:
             self.client.chat.completions.create(
@@ -73,4 +179,4 @@ class OpenAILLM(BaseLLM):
             )
             return True
         except:
-            return False
\ No newline at end of file
+            return False
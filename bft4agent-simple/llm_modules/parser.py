@@ -0,0 +1,219 @@
+"""
+LLM回复解析（各后端共用）
+
+- parse_generation: 推理步骤 + 最终答案；格式规范的回复走正则快速路径，否则逐行扫描
+- parse_decision: 提取单个Y/N结论，按独立的词匹配（"NO"为N，"YES, NOT..."为Y），
+  不再用子串判断
+- parse_batch_decisions: 批量验证的JSON数组或逐行编号结论
+- 以上均支持服务商的结构化JSON输出（json_mode）
+
+解析失败默认为N，会导致无谓的拒绝与viewchange，因此尽量宽松地识别合法回复
+"""
+
+import json
+import re
+from typing import List, Optional, Tuple
+
+# === 预编译模式 ===
+
+# 格式规范的最终答案行（行首，允许markdown加粗与全角冒号）
+_FINAL_ANSWER_LINE = re.compile(r"^[ \t*#>-]*最终答案[ \t*]*[:：][ \t]*(.*?)[ \t]*$", re.M)
+# 推理步骤行
+_STEP_LINE = re.compile(r"^[ \t]*([^\n]*步骤[^\n]*?)[ \t]*$", re.M)
+# 逐行扫描时的标签（行首，允许markdown与列表序号）："推理步骤1: ..."、"Step 2: ..."、"最终答案: ..."、"Final answer: ..."
+# 只认标签形式，"The answer depends on..."这类正文不会被当作答案或步骤
+_LABEL_PREFIX = r"^[ \t*#>\-]*(?:\d+[.、)][ \t]*)?"
+_STEP_MARKER = re.compile(_LABEL_PREFIX + r"(?:(?:推理)?步骤|(?:reasoning|step)[ \t]*\d*[ \t*]*:)", re.I)
+_ANSWER_MARKER = re.compile(_LABEL_PREFIX + r"(?:(?:最终)?答案[ \t*]*(?:[:：]|是|为)|(?:final[ \t]+)?answer[ \t*]*:)", re.I)
+_COLON = re.compile(r"[:：]")
+# 独立的Y/N词（前后不是字母）
+_DECISION_TOKEN = re.compile(r"(?<![A-Za-z])(YES|NO|Y|N)(?![A-Za-z])", re.I)
+_JSON_ARRAY = re.compile(r"\[[^\[\]]*\]", re.S)
+_NUMBERED_DECISION = re.compile(r"^\s*(?:提案)?\s*(\d+)\s*[.:：、)\]]?\s*([YN])\b", re.M | re.I)
+
+# 整个回复即为结论时接受的中文写法
+_WHOLE_REPLY_DECISIONS = {
+    "Y": "Y", "YES": "Y", "是": "Y", "通过": "Y", "正确": "Y", "TRUE": "Y",
+    "N": "N", "NO": "N", "否": "N", "不通过": "N", "错误": "N", "FALSE": "N",
+}
+_JSON_DECISION_KEYS = ("decision", "verdict", "result", "answer")
+
+# json_mode下附加在提示末尾的输出格式说明
+JSON_GENERATION_FORMAT = (
+    '请只输出一个JSON对象，格式为: {"reasoning": ["推理步骤1: ...", "推理步骤2: ..."], "answer": "最终答案"}'
+)
+JSON_DECISION_FORMAT = '请只输出一个JSON对象，格式为: {"decision": "Y"} 或 {"decision": "N"}'
+
+
+def clean_answer(value: str) -> str:
+    """去掉答案两侧的空白、markdown标记与句末句号"""
+    return value.strip().strip("*`").strip().rstrip("。")
+
+
+def _answer_from_line(line: str) -> str:
+    # 与原有规则一致：取最后一个冒号之后的内容，没有冒号时为整行
+    parts = _COLON.split(line)
+    return clean_answer(parts[-1]) if len(parts) > 1 else line
+
+
+def classify_line(line: str) -> Tuple[Optional[str], str]:
+    """
+    对单行分类
+
+    Returns:
+        ("step", 行内容) | ("answer", 答案) | (None, 行内容)
+    """
+    line = line.strip()
+    if _STEP_MARKER.search(line):
+        return "step", line
+    if _ANSWER_MARKER.search(line):
+        return "answer", _answer_from_line(line)
+    return None, line
+
+
+def _load_json_object(content: str) -> Optional[dict]:
+    text = content.strip()
+    if text.startswith("```"):
+        text = text.strip("`").lstrip()
+        if text.lower().startswith("json"):
+            text = text[4:]
+    if not text.startswith("{"):
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def parse_generation(content: str, answer_fallback: bool = False) -> Tuple[list, str]:
+    """
+    解析生成结果
+
+    Args:
+        content: 回复文本（可为JSON对象: {"reasoning": [...], "answer": ...}）
+        answer_fallback: 找不到答案时以全文作为答案
+
+    Returns:
+        (推理过程列表, 最终答案)，无推理步骤时以全文作为推理
+    """
+    content = content or ""
+    data = _load_json_object(content)
+    if data is not None and "answer" in data:
+        reasoning = data.get("reasoning") or []
+        if isinstance(reasoning, str):
+            reasoning = [reasoning]
+        return [str(step) for step in reasoning] or [content], clean_answer(str(data["answer"]))
+
+    # 快速路径：有规范的"最终答案:"行
+    match = _FINAL_ANSWER_LINE.search(content)
+    if match and match.group(1):
+        reasoning = _STEP_LINE.findall(content[:match.start()])
+        return reasoning or [content], clean_answer(match.group(1))
+
+    reasoning, answer = [], ""
+    for line in content.split("\n"):
+        kind, value = classify_line(line)
+        if kind == "step":
+            reasoning.append(value)
+        elif kind == "answer":
+            answer = value
+
+    if not answer and answer_fallback:
+        answer = content
+    return reasoning or [content], answer
+
+
+def _normalize_decision(value) -> Optional[str]:
+    if isinstance(value, bool):
+        return "Y" if value else "N"
+    if not isinstance(value, str):
+        return None
+    text = value.strip().strip("\"'`*。.!").upper()
+    decision = _WHOLE_REPLY_DECISIONS.get(text)
+    if decision is not None:
+        return decision
+    match = _DECISION_TOKEN.search(text)
+    return match.group(1)[0] if match else None
+
+
+def parse_decision(content: Optional[str], default: str = "N") -> str:
+    """
+    从验证回复中提取Y/N
+
+    依次尝试: 整个回复即为结论（快速路径）-> JSON对象中的decision字段 -> 第一个独立的Y/N/YES/NO词
+
+    Returns:
+        "Y"/"N"，无法识别时返回default
+    """
+    if not content:
+        return default
+    text = content.strip()
+    decision = _WHOLE_REPLY_DECISIONS.get(text.upper())
+    if decision is not None:
+        return decision
+
+    data = _load_json_object(text)
+    if data is not None:
+        for key in _JSON_DECISION_KEYS:
+            if key in data:
+                decision = _normalize_decision(data[key])
+                if decision is not None:
+                    return decision
+
+    decision = _normalize_decision(text)
+    return decision if decision is not None else default
+
+
+def first_decision_token(text: str, final: bool = False) -> Optional[str]:
+    """
+    流式文本中的第一个Y/N结论
+
+    词须看到其后一个字符（或流已结束，final=True）才能确认是独立的词，
+    否则"No"可能是"Not..."、"N"可能是"Nice..."的开头
+    """
+    for match in _DECISION_TOKEN.finditer(text):
+        if final or match.end() < len(text):
+            return match.group(1)[0].upper()
+    return None
+
+
+def _item_decision(item) -> Optional[str]:
+    # 数组元素须整体是一个结论（"Y"、"N"、"是"、true等）
+    if isinstance(item, bool):
+        return "Y" if item else "N"
+    if isinstance(item, str):
+        return _WHOLE_REPLY_DECISIONS.get(item.strip().upper())
+    return None
+
+
+def parse_batch_decisions(content: Optional[str], count: int) -> Optional[List[str]]:
+    """
+    解析批量验证结果：优先JSON数组（可嵌在JSON对象中），其次"1: Y"形式的逐行结论
+
+    Returns:
+        长度为count的Y/N列表，无法解析或数量不符时返回None
+    """
+    if not content:
+        return None
+    for match in _JSON_ARRAY.finditer(content):
+        try:
+            items = json.loads(match.group(0))
+        except ValueError:
+            continue
+        decisions = []
+        for item in items:
+            decision = _item_decision(item)
+            if decision is None:
+                break
+            decisions.append(decision)
+        else:
+            if len(decisions) == count:
+                return decisions
+
+    numbered = {}
+    for index, decision in _NUMBERED_DECISION.findall(content):
+        numbered.setdefault(int(index), decision.upper())
+    if sorted(numbered) == list(range(1, count + 1)):
+        return [numbered[i] for i in range(1, count + 1)]
+    return None
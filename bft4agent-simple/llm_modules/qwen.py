@@ -2,6 +2,8 @@
 import os
 from typing import Dict, Tuple
 from .base import BaseLLM
+from .parser import parse_decision, parse_generation
+from .ratelimit import RETRYABLE_STATUS, RetryableError, estimate_tokens
 
 
 class QwenLLM(BaseLLM):
@@ -31,6 +33,22 @@ class QwenLLM(BaseLLM):
 
         self.enable_thinking = enable_thinking
 
+    def _call_application(self, **kwargs):
+        """
+        限速并带重试地调用百炼应用
+
+        dashscope以状态码而非异常报告限流/服务端错误，这里转为RetryableError交给重试逻辑
+        """
+        def call():
+            response = self.dashscope.Application.call(**kwargs)
+            if response.status_code in RETRYABLE_STATUS:
+                raise RetryableError(f"Qwen API: {response.message}", status_code=response.status_code)
+            output = getattr(response, "output", None)
+            self._report_usage(response, kwargs.get("prompt", ""), getattr(output, "text", None) or "")
+            return response
+
+        return self._request(call, estimate_tokens(kwargs.get("prompt", "")))
+
     def generate(self, question: str) -> Tuple[list, str]:
         """
         生成推理过程和答案
@@ -69,10 +87,12 @@ class QwenLLM(BaseLLM):
                 }
 
             # 调用千问API
-            response = self.dashscope.Application.call(**kwargs)
+            response = self._call_application(**kwargs)
 
             # 检查响应状态
             if response.status_code != HTTPStatus.OK:
+                if self.raise_errors:
+                    raise RuntimeError(f"Qwen API: {response.message}")
                 print(f"[ERROR] Qwen API: {response.message}")
                 print(f"请求ID: {response.request_id}")
                 print(f"错误码: {response.code}")
@@ -81,36 +101,18 @@ class QwenLLM(BaseLLM):
             # 获取回复内容
             content = response.output.text
 
+            # 解析推理过程和答案（没有找到答案时以整个内容作为答案）
+            reasoning, answer = parse_generation(content, answer_fallback=True)
+
             # 如果启用思考模式且有思考过程，优先使用思考过程
             if self.enable_thinking and response.output.thoughts:
                 reasoning = [thought.get("content", "") for thought in response.output.thoughts]
-            else:
-                # 解析推理过程和答案
-                reasoning = []
-                for line in content.split("\n"):
-                    line = line.strip()
-                    if "推理步骤" in line or "步骤" in line or "Reasoning" in line.lower():
-                        reasoning.append(line)
-
-            # 提取最终答案
-            answer = ""
-            for line in content.split("\n"):
-                line = line.strip()
-                if "最终答案" in line or "答案" in line or "Answer" in line.lower():
-                    answer = line.split(":")[-1].strip() if ":" in line else line
-                    break
-
-            # 如果没有找到答案，使用整个内容作为答案
-            if not answer:
-                answer = content
-
-            # 如果没有推理过程，使用整个内容作为推理
-            if not reasoning:
-                reasoning = [content]
 
             return reasoning, answer
 
         except Exception as e:
+            if self.raise_errors:
+                raise
             print(f"[ERROR] Qwen API: {e}")
             return ["API调用失败"], "Error"
 
@@ -136,29 +138,40 @@ class QwenLLM(BaseLLM):
         try:
             from http import HTTPStatus
 
-            response = self.dashscope.Application.call(
+            response = self._call_application(
                 api_key=self.api_key,
                 app_id=self.app_id,
                 prompt=prompt
             )
 
             if response.status_code != HTTPStatus.OK:
+                if self.raise_errors:
+                    raise RuntimeError(f"Qwen API validation: {response.message}")
+                print(f"[ERROR] Qwen API validation: {response.message}")
                 return "N"
 
-            content = response.output.text.strip().upper()
-
             # 只返回Y或N，如果格式错误则默认N
-            if "Y" in content:
-                return "Y"
-            elif "N" in content:
-                return "N"
-            else:
-                return "N"
+            return parse_decision(response.output.text)
 
         except Exception as e:
+            if self.raise_errors:
+                raise
             print(f"[ERROR] Qwen API validation: {e}")
             return "N"
 
+    def _request_batch_validation(self, prompt: str, count: int) -> str:
+        """批量验证请求，返回原始回复文本"""
+        from http import HTTPStatus
+
+        response = self._call_application(
+            api_key=self.api_key,
+            app_id=self.app_id,
+            prompt=prompt
+        )
+        if response.status_code != HTTPStatus.OK:
+            raise RuntimeError(f"Qwen API: {response.message}")
+        return response.output.text
+
     def health_check(self) -> bool:
         """
         健康检查，测试API是否可用
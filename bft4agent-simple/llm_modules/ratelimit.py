@@ -0,0 +1,313 @@
+"""
+LLM请求限速与重试
+
+- TokenBucket: 令牌桶，按请求数/秒、token数/分钟对请求节流
+- RetryPolicy: 指数退避 + full jitter，优先采用服务端Retry-After
+- call_with_retry: 限速 -> 调用 -> 可重试错误则退避重试，全程受共识阶段截止时间约束
+
+目标是在接近服务商限额时平滑排队，而不是把一串429变成"N"票和多余的viewchange
+"""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .context import record_retry, remaining_time
+
+# 可重试的HTTP状态码
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class DeadlineExceeded(TimeoutError):
+    """截止时间内无法完成（含排队与退避等待）"""
+
+
+class RetryableError(Exception):
+    """后端主动抛出的可重试错误（用于不以异常报告HTTP状态的SDK，如dashscope）"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """令牌桶（线程安全）"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发量），默认等于rate
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """
+        预约amount个令牌，返回需要等待的秒数（令牌可透支，后续请求顺延）
+
+        超过桶容量的请求按容量计，避免永远无法满足
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def refund(self, amount: float = 1.0):
+        """归还预约但未使用的令牌"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class RateLimiter:
+    """按请求数/秒与token数/分钟双重限速"""
+
+    def __init__(
+        self,
+        requests_per_second: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        burst: Optional[float] = None,
+    ):
+        """
+        Args:
+            requests_per_second: 每秒请求数上限，None表示不限
+            tokens_per_minute: 每分钟token数上限，None表示不限
+            burst: 请求突发量，默认等于requests_per_second
+        """
+        self.request_bucket = TokenBucket(requests_per_second, burst) if requests_per_second else None
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute / 60.0, tokens_per_minute) if tokens_per_minute else None
+        )
+        self._lock = threading.Lock()
+        self.stats = {"acquired": 0, "throttled": 0, "wait_seconds": 0.0, "rejected": 0}
+
+    @classmethod
+    def from_config(cls, spec: Optional[Dict]) -> Optional["RateLimiter"]:
+        """由配置创建，未配置任何上限时返回None"""
+        if not spec or not (spec.get("requests_per_second") or spec.get("tokens_per_minute")):
+            return None
+        return cls(
+            requests_per_second=spec.get("requests_per_second"),
+            tokens_per_minute=spec.get("tokens_per_minute"),
+            burst=spec.get("burst"),
+        )
+
+    def _reserve(self, tokens: float, budget: Optional[float]) -> Optional[float]:
+        """预约并返回等待秒数；超出预算时撤销预约并返回None"""
+        wait = 0.0
+        reserved = []
+        for bucket, amount in ((self.request_bucket, 1.0), (self.token_bucket, tokens)):
+            if bucket is not None:
+                wait = max(wait, bucket.reserve(amount))
+                reserved.append((bucket, amount))
+
+        if budget is not None and wait > budget:
+            for bucket, amount in reserved:
+                bucket.refund(amount)
+            with self._lock:
+                self.stats["rejected"] += 1
+            return None
+
+        with self._lock:
+            self.stats["acquired"] += 1
+            if wait > 0:
+                self.stats["throttled"] += 1
+                self.stats["wait_seconds"] += wait
+        return wait
+
+    def acquire(self, tokens: float = 0.0, budget: Optional[float] = None) -> bool:
+        """阻塞直到允许发出请求；在budget秒内无法获得时返回False"""
+        wait = self._reserve(tokens, budget)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    async def aacquire(self, tokens: float = 0.0, budget: Optional[float] = None) -> bool:
+        wait = self._reserve(tokens, budget)
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+class RetryPolicy:
+    """指数退避 + full jitter"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0, seed: Optional[int] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_config(cls, spec: Optional[Dict]) -> "RetryPolicy":
+        spec = spec or {}
+        return cls(
+            max_retries=spec.get("max_retries", 3),
+            base_delay=spec.get("base_delay", 0.5),
+            max_delay=spec.get("max_delay", 8.0),
+        )
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        第attempt次重试（从0开始）前的等待秒数
+
+        服务端给出Retry-After时以其为下限，再叠加少量抖动避免所有Agent同时重试
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = self.rng.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = retry_after + self.rng.uniform(0, self.base_delay)
+        return delay
+
+
+def _parse_retry_after(value) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def classify_error(exc: BaseException):
+    """
+    判断异常是否可重试
+
+    Returns:
+        (是否可重试, Retry-After秒数或None)
+    """
+    if isinstance(exc, RetryableError):
+        return True, exc.retry_after
+
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None) or {}
+
+    retry_after = None
+    if headers:
+        if headers.get("retry-after-ms") is not None:
+            retry_after = _parse_retry_after(headers.get("retry-after-ms"))
+            retry_after = retry_after / 1000.0 if retry_after is not None else None
+        else:
+            retry_after = _parse_retry_after(headers.get("retry-after"))
+
+    if status is not None:
+        return int(status) in RETRYABLE_STATUS, retry_after
+
+    # 无状态码：连接错误与超时可重试（按类名判断，避免依赖具体SDK）
+    name = type(exc).__name__
+    if isinstance(exc, (ConnectionError, TimeoutError)) or any(
+        marker in name for marker in ("Timeout", "Connection", "RateLimit")
+    ):
+        return True, retry_after
+    return False, None
+
+
+def _budget() -> Optional[float]:
+    remaining = remaining_time()
+    return None if remaining is None else max(0.0, remaining)
+
+
+def call_with_retry(
+    fn: Callable[[], Any],
+    limiter: Optional[RateLimiter] = None,
+    policy: Optional[RetryPolicy] = None,
+    tokens: float = 0.0,
+) -> Any:
+    """
+    限速并带重试地执行fn
+
+    Raises:
+        DeadlineExceeded: 截止时间内无法获得令牌或完成重试
+        其他异常: 不可重试的错误，或重试次数用尽后的最后一个错误
+    """
+    policy = policy or RetryPolicy(max_retries=0)
+    attempt = 0
+    while True:
+        budget = _budget()
+        if budget is not None and budget <= 0:
+            raise DeadlineExceeded("LLM call deadline exceeded")
+        if limiter is not None and not limiter.acquire(tokens, budget):
+            raise DeadlineExceeded("Rate limit wait exceeds deadline")
+        try:
+            return fn()
+        except Exception as e:
+            retryable, retry_after = classify_error(e)
+            if not retryable or attempt >= policy.max_retries:
+                raise
+            delay = policy.backoff(attempt, retry_after)
+            budget = _budget()
+            if budget is not None and delay >= budget:
+                raise DeadlineExceeded(f"Retry backoff exceeds deadline: {e}") from e
+            record_retry()
+            time.sleep(delay)
+            attempt += 1
+
+
+async def acall_with_retry(
+    fn: Callable[[], Awaitable[Any]],
+    limiter: Optional[RateLimiter] = None,
+    policy: Optional[RetryPolicy] = None,
+    tokens: float = 0.0,
+) -> Any:
+    """call_with_retry的异步版本"""
+    policy = policy or RetryPolicy(max_retries=0)
+    attempt = 0
+    while True:
+        budget = _budget()
+        if budget is not None and budget <= 0:
+            raise DeadlineExceeded("LLM call deadline exceeded")
+        if limiter is not None and not await limiter.aacquire(tokens, budget):
+            raise DeadlineExceeded("Rate limit wait exceeds deadline")
+        try:
+            return await fn()
+        except Exception as e:
+            retryable, retry_after = classify_error(e)
+            if not retryable or attempt >= policy.max_retries:
+                raise
+            delay = policy.backoff(attempt, retry_after)
+            budget = _budget()
+            if budget is not None and delay >= budget:
+                raise DeadlineExceeded(f"Retry backoff exceeds deadline: {e}") from e
+            record_retry()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def estimate_tokens(prompt: str, max_tokens: int = 0) -> int:
+    """粗略估算一次请求消耗的token数（中文约1字1token，偏保守）"""
+    return len(prompt) + max_tokens
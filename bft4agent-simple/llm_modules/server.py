@@ -0,0 +1,350 @@
+"""
+本地OpenAI兼容LLM服务（压测用）
+
+MockLLM在进程内运行，不经过HTTP栈，测不出连接池、序列化和并发上限的影响。
+这里用标准库起一个说chat-completions协议的HTTP服务，背后是MockLLM的解题/验证逻辑，
+可配置延迟分布、错误与429注入、服务端限速以及SSE流式输出，
+让OpenAILLM/CustomLLM的真实客户端路径可以在离线环境端到端压测。
+
+用法:
+    python -m llm_modules.server --port 8000 --latency lognormal:300:0.5 --rate-limit-rate 0.05
+    # 然后将custom后端的base_url设为 http://127.0.0.1:8000/v1
+"""
+
+import argparse
+import ast
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from .base import BaseLLM
+from .latency import make_latency_sampler
+from .mock import MockLLM
+from .ratelimit import TokenBucket
+
+_FIELD = re.compile(r"^(问题|推理|答案):\s*(.*)$", re.M)
+_PROPOSAL_BLOCK = re.compile(r"\[提案(\d+)\]\n(.*?)(?=\n\[提案\d+\]|\n\n请只输出|\Z)", re.S)
+
+
+def _parse_proposal(text: str) -> Dict:
+    """从验证提示中还原提案字段（格式见各后端的_validation_prompt）"""
+    fields = {name: value.strip() for name, value in _FIELD.findall(text)}
+    try:
+        reasoning = ast.literal_eval(fields.get("推理", "[]"))
+        if not isinstance(reasoning, list):
+            reasoning = [str(reasoning)]
+    except (ValueError, SyntaxError):
+        reasoning = [fields.get("推理", "")]
+    return {
+        "task_content": fields.get("问题", ""),
+        "reasoning": reasoning,
+        "answer": fields.get("答案", ""),
+    }
+
+
+class MockLLMServer:
+    """OpenAI chat-completions协议的本地模拟服务"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        accuracy: float = 1.0,
+        latency=None,
+        token_delay_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        requests_per_second: Optional[float] = None,
+        trailing_text: bool = True,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            host, port: 监听地址（port=0表示随机可用端口）
+            accuracy: 生成答案的正确率（同MockLLM）
+            latency: 首字节前延迟分布，见latency.parse_distribution
+            token_delay_ms: 流式输出时每个分片之间的延迟
+            error_rate: 随机返回500的概率
+            rate_limit_rate: 随机返回429的概率
+            retry_after: 429响应中的Retry-After（秒）
+            requests_per_second: 服务端令牌桶限速，超出时返回429
+            trailing_text: 生成结果在最终答案后附带一段说明文字（用于验证流式提前结束）
+            seed: 随机种子
+        """
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.mock = MockLLM(accuracy=accuracy)
+        self.latency = make_latency_sampler(latency, self.rng)
+        self.token_delay = token_delay_ms / 1000.0
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.bucket = TokenBucket(requests_per_second) if requests_per_second else None
+        self.trailing_text = trailing_text
+
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "by_status": {},
+            "streams": 0,
+            "cancelled_streams": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+        }
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    # === 生命周期 ===
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    @property
+    def url(self) -> str:
+        """OpenAI SDK使用的base_url"""
+        return f"http://{self._httpd.server_address[0]}:{self.port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # === 应答逻辑 ===
+
+    def _random(self) -> float:
+        with self._rng_lock:
+            return self.rng.random()
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _count_status(self, status: int):
+        with self._stats_lock:
+            self.stats["by_status"][status] = self.stats["by_status"].get(status, 0) + 1
+
+    def _injected_error(self):
+        """返回 (状态码, 附加响应头) 或None"""
+        if self.bucket is not None:
+            wait = self.bucket.reserve()
+            if wait > 0:
+                self.bucket.refund()
+                return 429, {"Retry-After": f"{wait:.3f}"}
+        roll = self._random()
+        if roll < self.rate_limit_rate:
+            return 429, {"Retry-After": f"{self.retry_after:g}"}
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500, {}
+        return None
+
+    def complete(self, prompt: str, json_mode: bool = False) -> str:
+        """
+        按提示类型（批量验证/验证/生成）给出回复文本
+
+        json_mode对应请求中的response_format={"type": "json_object"}，回复为JSON对象
+        """
+        if "[提案1]" in prompt:
+            decisions = [self.mock._judge(_parse_proposal(block)) for _, block in _PROPOSAL_BLOCK.findall(prompt)]
+            return json.dumps({"decisions": decisions} if json_mode else decisions)
+        if "验证提案" in prompt:
+            decision = self.mock._judge(_parse_proposal(prompt))
+            return json.dumps({"decision": decision}) if json_mode else decision
+        if prompt.strip() == "健康检查":
+            return "OK"
+
+        reasoning, answer = self.mock._generate_result(prompt)
+        if json_mode:
+            return json.dumps({"reasoning": [f"推理{step}" for step in reasoning], "answer": answer}, ensure_ascii=False)
+        lines = [f"推理{step}" for step in reasoning] + [f"最终答案: {answer}"]
+        if self.trailing_text:
+            lines.append("说明: 以上为逐步推导过程，结果已核对，无需进一步补充。" * 3)
+        return "\n".join(lines) + "\n"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: Dict, headers: Optional[Dict] = None):
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                server._count_status(status)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+                elif self.path.rstrip("/").endswith("/health"):
+                    self._send_json(200, {"status": "ok"})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send_json(400, {"error": {"message": "invalid JSON"}})
+                    return
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                server._count("requests")
+
+                injected = server._injected_error()
+                if injected is not None:
+                    status, headers = injected
+                    kind = "rate_limit_exceeded" if status == 429 else "server_error"
+                    self._send_json(status, {"error": {"message": kind, "type": kind}}, headers)
+                    return
+
+                messages: List[Dict] = request.get("messages") or []
+                prompt = messages[-1].get("content", "") if messages else ""
+                json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+                content = server.complete(prompt, json_mode)
+                model = request.get("model", "mock")
+
+                time.sleep(server.latency())
+                server._count("prompt_tokens", len(prompt))
+                if request.get("stream"):
+                    self._stream(content, model)
+                    return
+
+                server._count("completion_tokens", len(content))
+                self._send_json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": len(prompt),
+                        "completion_tokens": len(content),
+                        "total_tokens": len(prompt) + len(content),
+                    },
+                })
+
+            def _stream(self, content: str, model: str):
+                """SSE流式输出，按4字符一片发送；客户端提前断开时停止"""
+                server._count("streams")
+                server._count_status(200)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+                sent = 0
+                try:
+                    for index, piece in enumerate(pieces):
+                        event = {
+                            "id": chunk_id,
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": model,
+                            "choices": [{
+                                "index": 0,
+                                "delta": {"role": "assistant", "content": piece} if index == 0 else {"content": piece},
+                                "finish_reason": None,
+                            }],
+                        }
+                        self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                        sent += len(piece)
+                        if server.token_delay:
+                            time.sleep(server.token_delay)
+                    done = {"id": chunk_id, "object": "chat.completion.chunk", "model": model,
+                            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                    self.wfile.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    server._count("cancelled_streams")
+                finally:
+                    server._count("completion_tokens", sent)
+
+        return Handler
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+            stats["by_status"] = dict(self.stats["by_status"])
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地OpenAI兼容LLM模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--accuracy", type=float, default=1.0)
+    parser.add_argument("--latency", default="lognormal:300:0.5",
+                        help="fixed:ms | uniform:min:max | lognormal:median:sigma（毫秒）")
+    parser.add_argument("--token-delay-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--rps", type=float, default=None, help="服务端限速（请求/秒）")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = MockLLMServer(
+        host=args.host,
+        port=args.port,
+        accuracy=args.accuracy,
+        latency=args.latency,
+        token_delay_ms=args.token_delay_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        requests_per_second=args.rps,
+        seed=args.seed,
+    )
+    print(f"[server] 监听 {server.url}（Ctrl+C退出）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n[server] stats: {server.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Single-flight请求合并
+
+相同键的并发调用只发出一次实际请求，其余调用等待并共享该结果（包括异常）。
+同步调用按线程合并，异步调用按事件循环合并
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Flight:
+    """一次进行中的同步调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """相同键的进行中请求去重（线程安全）"""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "calls": 0,  # 实际执行的调用数
+            "coalesced": 0,  # 共享了他人结果的调用数
+        }
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """执行fn，若相同key已有进行中的调用则等待其结果"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.stats["calls"] += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """do的异步版本（在同一事件循环内合并）"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flights = self._async_flights.setdefault(loop, {})
+            future = flights.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                future = loop.create_future()
+                flights[key] = future
+                self.stats["calls"] += 1
+                leader = True
+
+        if not leader:
+            # shield：某个等待者被取消不影响其他等待者
+            return await asyncio.shield(future)
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 无其他等待者时避免"exception was never retrieved"警告
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                flights.pop(key, None)
+
+    def in_flight(self) -> int:
+        """进行中的同步调用数"""
+        return len(self._flights)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
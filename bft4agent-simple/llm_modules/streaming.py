@@ -0,0 +1,155 @@
+"""
+流式输出的增量解析
+
+- AnswerStreamParser: 逐行解析推理步骤，读到完整的"最终答案"行即可结束，
+  不必等模型输出后续的解释文字
+- DecisionStreamParser: 读到第一个独立的Y/N词即得出验证结论
+
+consume_stream / aconsume_stream 在解析器完成后立即关闭流（取消剩余生成）
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+from .parser import classify_line, first_decision_token
+
+FINAL_ANSWER_MARKER = "最终答案"
+
+
+class AnswerStreamParser:
+    """生成结果的增量解析器"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._content: List[str] = []
+        self.reasoning: List[str] = []
+        self.answer = ""
+        self.done = False
+
+    def feed(self, text: str) -> bool:
+        """
+        输入一段增量文本
+
+        Returns:
+            是否已读到完整的最终答案行（可以停止读取）
+        """
+        if self.done or not text:
+            return self.done
+        self._content.append(text)
+        self._buffer += text
+        while "\n" in self._buffer and not self.done:
+            line, self._buffer = self._buffer.split("\n", 1)
+            self._consume_line(line)
+        return self.done
+
+    def _consume_line(self, line: str):
+        # 行分类规则与整段解析（llm_modules.parser）一致
+        kind, value = classify_line(line)
+        if kind == "step":
+            self.reasoning.append(value)
+        elif kind == "answer":
+            self.answer = value
+            # "最终答案:"后为空时答案在下一行，继续读取
+            if FINAL_ANSWER_MARKER in line and self.answer:
+                self.done = True
+
+    def close(self):
+        """流结束：处理最后一个不以换行结尾的行"""
+        if not self.done and self._buffer:
+            self._consume_line(self._buffer)
+        self._buffer = ""
+
+    @property
+    def content(self) -> str:
+        """已读取的原始文本"""
+        return "".join(self._content)
+
+    def result(self) -> Tuple[list, str]:
+        """(推理过程列表, 最终答案)，无推理步骤时以全文作为推理"""
+        self.close()
+        return (self.reasoning or [self.content]), self.answer
+
+
+class DecisionStreamParser:
+    """验证结论的增量解析器：第一个独立的Y/N（YES/NO）词即为结论"""
+
+    def __init__(self):
+        self._content: List[str] = []
+        self.decision: Optional[str] = None
+        self.done = False
+
+    def feed(self, text: str) -> bool:
+        if self.done or not text:
+            return self.done
+        self._content.append(text)
+        self.decision = first_decision_token(self.content)
+        self.done = self.decision is not None
+        return self.done
+
+    def close(self):
+        # 流结束：末尾的词也可确认
+        if not self.done:
+            self.decision = first_decision_token(self.content, final=True)
+
+    @property
+    def content(self) -> str:
+        return "".join(self._content)
+
+    def result(self) -> str:
+        # 格式错误时默认N
+        return self.decision or "N"
+
+
+def _delta_text(chunk) -> str:
+    """OpenAI兼容流式chunk中的增量文本"""
+    choices = getattr(chunk, "choices", None)
+    if not choices:
+        return ""
+    delta = getattr(choices[0], "delta", None)
+    return getattr(delta, "content", None) or ""
+
+
+def _close(stream):
+    close = getattr(stream, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
+
+
+def consume_stream(stream: Iterable, parser) -> bool:
+    """
+    读取OpenAI兼容的流式响应直到解析器完成或流结束
+
+    Returns:
+        是否提前结束（剩余生成被取消）
+    """
+    early = False
+    try:
+        for chunk in stream:
+            if parser.feed(_delta_text(chunk)):
+                early = True
+                break
+    finally:
+        _close(stream)
+    parser.close()
+    return early
+
+
+async def aconsume_stream(stream, parser) -> bool:
+    """consume_stream的异步版本"""
+    early = False
+    try:
+        async for chunk in stream:
+            if parser.feed(_delta_text(chunk)):
+                early = True
+                break
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            try:
+                await close()
+            except Exception:
+                pass
+    parser.close()
+    return early
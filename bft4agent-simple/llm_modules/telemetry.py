@@ -0,0 +1,139 @@
+"""
+LLM调用遥测
+
+每次后端调用（含缓存命中）生成一条CallRecord，按后端汇总延迟直方图、
+token用量、估算费用、重试与错误分类；可选写入JSONL文件供离线分析
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from metrics import LatencyHistogram
+
+
+@dataclass
+class CallRecord:
+    """一次LLM调用的记录"""
+    backend: str
+    model: str
+    call_type: str  # generate | validate | validate_batch
+    agent: Optional[str] = None
+    phase: Optional[str] = None
+    latency_ms: float = 0.0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cost: float = 0.0
+    cache_hit: bool = False
+    retries: int = 0
+    error: Optional[str] = None  # 异常类名，成功为None
+    timestamp: float = field(default_factory=time.time)
+
+
+class _BackendAggregate:
+    def __init__(self):
+        self.calls = 0
+        self.errors: Dict[str, int] = {}
+        self.cache_hits = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latency = LatencyHistogram()
+        self.latency_by_phase: Dict[str, LatencyHistogram] = {}
+
+    def add(self, record: CallRecord):
+        self.calls += 1
+        self.retries += record.retries
+        self.prompt_tokens += record.prompt_tokens or 0
+        self.completion_tokens += record.completion_tokens or 0
+        self.cost += record.cost
+        if record.cache_hit:
+            self.cache_hits += 1
+            return
+        if record.error:
+            self.errors[record.error] = self.errors.get(record.error, 0) + 1
+            return
+        # 延迟分布只统计实际成功的后端调用
+        self.latency.record(record.latency_ms)
+        phase = record.phase or "unknown"
+        if phase not in self.latency_by_phase:
+            self.latency_by_phase[phase] = LatencyHistogram()
+        self.latency_by_phase[phase].record(record.latency_ms)
+
+    def snapshot(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "errors": dict(self.errors),
+            "error_rate": sum(self.errors.values()) / self.calls if self.calls else 0.0,
+            "cache_hits": self.cache_hits,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost": self.cost,
+            "latency_ms": self.latency.snapshot(),
+            "latency_ms_by_phase": {k: v.snapshot() for k, v in self.latency_by_phase.items()},
+        }
+
+
+class LLMTelemetry:
+    """调用记录的收集与按后端汇总（线程安全）"""
+
+    def __init__(self, pricing: Optional[Dict] = None, path: Optional[str] = None, keep: int = 10000):
+        """
+        Args:
+            pricing: 每千token价格，{model: {"prompt": 0.0005, "completion": 0.0015}}
+            path: JSONL输出文件，None表示不写文件
+            keep: 内存中保留的最近记录数
+        """
+        self.pricing = pricing or {}
+        self.path = path
+        self.records = deque(maxlen=keep)
+        self._backends: Dict[str, _BackendAggregate] = {}
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    def estimate_cost(self, record: CallRecord) -> float:
+        price = self.pricing.get(record.model) or self.pricing.get(record.backend)
+        if not price:
+            return 0.0
+        return (
+            (record.prompt_tokens or 0) / 1000.0 * price.get("prompt", 0.0)
+            + (record.completion_tokens or 0) / 1000.0 * price.get("completion", 0.0)
+        )
+
+    def record(self, record: CallRecord):
+        if not record.cache_hit:
+            record.cost = self.estimate_cost(record)
+        with self._lock:
+            self.records.append(record)
+            if record.backend not in self._backends:
+                self._backends[record.backend] = _BackendAggregate()
+            self._backends[record.backend].add(record)
+            if self._file is not None:
+                self._file.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+                self._file.flush()
+
+    def recent(self, limit: Optional[int] = None) -> List[CallRecord]:
+        with self._lock:
+            records = list(self.records)
+        return records[-limit:] if limit else records
+
+    def snapshot(self) -> Dict:
+        """按后端汇总的统计"""
+        with self._lock:
+            return {backend: agg.snapshot() for backend, agg in self._backends.items()}
+
+    def reset(self):
+        with self._lock:
+            self.records.clear()
+            self._backends.clear()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -2,17 +2,51 @@
 import os
 from typing import Dict, Tuple
 from .base import BaseLLM
+from .clients import get_zhipu_client
+from .parser import parse_decision, parse_generation
+from .ratelimit import estimate_tokens
+from .streaming import AnswerStreamParser, DecisionStreamParser, consume_stream
 
 
 class ZhipuLLM(BaseLLM):
     def __init__(self, api_key: str, model: str = "glm-4.7"):
         try:
-            from zai import ZhipuAiClient
-            self.client = ZhipuAiClient(api_key=api_key)
+            self.client = get_zhipu_client(api_key)
             self.model = model
         except ImportError:
             raise ImportError("pip install zai")
 
+    def _chat(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        """限速并带重试地发送一次对话请求，返回回复文本"""
+        response = self._request(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens
+            ),
+            estimate_tokens(prompt, max_tokens),
+        )
+        content = response.choices[0].message.content
+        self._report_usage(response, prompt, content or "")
+        return content
+
+    def _chat_stream(self, prompt: str, temperature: float, max_tokens: int, parser):
+        """流式请求：解析器得出结果后立即关闭流，剩余生成不再等待"""
+        stream = self._request(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            ),
+            estimate_tokens(prompt, max_tokens),
+        )
+        consume_stream(stream, parser)
+        self._report_usage(None, prompt, parser.content)
+        return parser.result()
+
     def generate(self, question: str) -> Tuple[list, str]:
         prompt = f"""请解决以下问题，并展示简明的推理过程:
 问题: {question}
@@ -23,26 +57,12 @@ class ZhipuLLM(BaseLLM):
 最终答案: ...
 """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=500
-            )
-            content = response.choices[0].message.content
-
-            reasoning, answer = [], ""
-            for line in content.split("\n"):
-                line = line.strip()
-                if "推理步骤" in line or "步骤" in line:
-                    reasoning.append(line)
-                elif "最终答案" in line or "答案" in line:
-                    answer = line.split(":")[-1].strip() if ":" in line else line
-
-            if not reasoning:
-                reasoning = [content]
-            return reasoning, answer
+            if self.streaming:
+                return self._chat_stream(prompt, self.generate_temperature, 500, AnswerStreamParser())
+            return parse_generation(self._chat(prompt, self.generate_temperature, 500))
         except Exception as e:
+            if self.raise_errors:
+                raise
             print(f"[ERROR] Zhipu API: {e}")
             return ["API调用失败"], "Error"
 
@@ -54,18 +74,19 @@ class ZhipuLLM(BaseLLM):
 请只回答: Y 或 N
 """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=10
-            )
-            content = response.choices[0].message.content.strip().upper()
-            # 只返回Y或N，如果格式错误则默认N
-            return "Y" if "Y" in content else "N" if "N" in content else "N"
-        except:
+            if self.streaming:
+                return self._chat_stream(prompt, self.validate_temperature, 10, DecisionStreamParser())
+            # 无法识别时默认N
+            return parse_decision(self._chat(prompt, self.validate_temperature, 10))
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            print(f"[ERROR] Zhipu API validation: {e}")
             return "N"
 
+    def _request_batch_validation(self, prompt: str, count: int) -> str:
+        return self._chat(prompt, self.validate_temperature, 10 + 6 * count)
+
     def health_check(self) -> bool:
         try:
             self.client.chat.completions.create(
@@ -1,18 +1,135 @@
 """LLM统一调用接口"""
-from typing import Dict, Tuple
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from llm_modules import MockLLM, ZhipuLLM, OpenAILLM, QwenLLM, CustomLLM
+from llm_modules.breaker import ABSTAIN, BackendUnavailable, CircuitBreaker, HealthMonitor
+from llm_modules.cache import CALL_GENERATE, CALL_VALIDATE, ResponseCache, make_cache_key
+from llm_modules.clients import warm_up
+from llm_modules.context import current_labels, record_scope
+from llm_modules.hedging import HedgePolicy
+from llm_modules.ratelimit import RateLimiter, RetryPolicy
+from llm_modules.singleflight import SingleFlight
+from llm_modules.telemetry import CallRecord, LLMTelemetry
+
+# 验证提示实际用到的提案字段（task_id已含验证者指令）；timestamp、leader_id等
+# 随视图变化的字段不进入请求键，视图切换或重跑后相同的提案仍能命中缓存
+VALIDATE_KEY_FIELDS = ("task_id", "task_content", "reasoning", "answer")
+
+
+class BackendError(RuntimeError):
+    """后端以失败结果（而非异常）报告的错误"""
 
 
 class LLMCaller:
     def __init__(self, backend: str = "mock", **kwargs):
         self.backend = backend.lower()
-        self.llm = self._create_llm(backend, **kwargs)
+        # 显示名（遥测中的后端标签），后端池中同类后端的不同实例以此区分
+        self.name = kwargs.get("name") or self.backend
+        self.llm = self._configure(self._create_llm(backend, **kwargs), self.name, kwargs)
+
+        # 故障转移后端（按顺序），每项为 {"backend": ..., 其余同LLMCaller参数}
+        self.fallbacks = []
+        for spec in kwargs.get("fallbacks") or []:
+            spec = dict(spec)
+            fallback_backend = spec.pop("backend")
+            for inherited in (
+                "max_concurrency", "generate_temperature", "validate_temperature", "retry", "warm_up", "streaming",
+                "circuit_breaker", "json_mode",
+            ):
+                spec.setdefault(inherited, kwargs.get(inherited))
+            self.fallbacks.append(
+                self._configure(self._create_llm(fallback_backend, **spec), fallback_backend.lower(), spec)
+            )
+
+        # 熔断后端的后台健康探测（配置了probe_interval时启动）
+        self.health_monitor = None
+        breaker_spec = kwargs.get("circuit_breaker") or {}
+        targets = [(llm.breaker, llm) for llm in self.backends if llm.breaker is not None]
+        if targets and breaker_spec.get("probe_interval"):
+            self.health_monitor = HealthMonitor(targets, interval=breaker_spec["probe_interval"]).start()
+
+        # 对冲请求：主请求超过p95仍未返回时向下一个后端发副本，取先完成者
+        self.hedge = HedgePolicy.from_config(kwargs.get("hedge"))
+        self._executor = (
+            ThreadPoolExecutor(max_workers=kwargs.get("hedge_workers", 32), thread_name_prefix="llm-hedge")
+            if self.hedge is not None else None
+        )
+        # 响应缓存（按调用类型启用，默认关闭）
+        self.cache, self.cache_calls = self._create_cache(kwargs.get("cache"))
+        # 相同的并发请求只发一次（共享同一llm_caller的Agent常构造出相同的验证提示）
+        self.single_flight = SingleFlight() if kwargs.get("single_flight", True) else None
+        # 每次调用的遥测记录（延迟、token、费用、重试、错误），按后端汇总
+        # 可传入共享的LLMTelemetry（如后端池中所有后端汇总到一处）
+        self.telemetry = kwargs.get("telemetry") or LLMTelemetry(
+            pricing=kwargs.get("pricing"), path=kwargs.get("telemetry_path")
+        )
+
+    @staticmethod
+    def _configure(llm, backend: str, kwargs: Dict):
+        """按参数设置后端实例的并发、温度、限速与重试"""
+        llm.backend_name = backend
+        # 异步调用的最大并发请求数
+        if kwargs.get("max_concurrency"):
+            llm.max_concurrency = kwargs["max_concurrency"]
+        # 采样温度覆盖（如validate_temperature=0使验证结果可缓存）
+        for attr in ("generate_temperature", "validate_temperature"):
+            if kwargs.get(attr) is not None:
+                setattr(llm, attr, kwargs[attr])
+        if kwargs.get("streaming") is not None:
+            llm.streaming = kwargs["streaming"]
+        if kwargs.get("json_mode") is not None:
+            llm.json_mode = kwargs["json_mode"]
+        # 限速与429感知的重试（每个后端实例一个令牌桶）
+        llm.rate_limiter = RateLimiter.from_config(kwargs.get("rate_limit"))
+        llm.retry_policy = RetryPolicy.from_config(kwargs.get("retry"))
+        # 错误交由LLMCaller处理（故障转移后才返回"Error"/"N"）
+        llm.raise_errors = True
+        # 连续失败或超出延迟SLO后熔断，不再向该后端发请求
+        llm.breaker = CircuitBreaker.from_config(kwargs.get("circuit_breaker"))
+        # 预热共享连接池，握手延迟不计入首次调用
+        if kwargs.get("warm_up") and hasattr(llm, "client"):
+            warm_up(llm.client)
+        return llm
+
+    @property
+    def backends(self) -> list:
+        """故障转移顺序：主后端在前"""
+        return [self.llm] + self.fallbacks
+
+    def _create_cache(self, spec) -> Tuple[Optional[ResponseCache], set]:
+        """
+        由配置创建响应缓存
+
+        spec可以是ResponseCache实例，或dict:
+            {"enabled": True, "calls": ["validate"], "memory_size": 1024,
+             "path": "llm_cache.sqlite", "ttl": None, "max_disk_entries": 100000}
+        """
+        if not spec:
+            return None, set()
+        if isinstance(spec, ResponseCache):
+            return spec, {CALL_VALIDATE}
+        if not spec.get("enabled", True):
+            return None, set()
+        cache = ResponseCache(
+            memory_size=spec.get("memory_size", 1024),
+            path=spec.get("path"),
+            ttl=spec.get("ttl"),
+            max_disk_entries=spec.get("max_disk_entries", 100000),
+        )
+        return cache, set(spec.get("calls", [CALL_VALIDATE]))
 
     def _create_llm(self, backend: str, **kwargs):
+        # 直接传入的后端实例（如测试用的假后端）同样经过_configure设置并发、限速、重试与熔断
+        if kwargs.get("llm") is not None:
+            return kwargs["llm"]
         backend = backend.lower()
 
         if backend == "mock":
-            return MockLLM(accuracy=kwargs.get("accuracy", 0.85))
+            return MockLLM(accuracy=kwargs.get("accuracy", 0.85), latency=kwargs.get("latency"))
 
         elif backend == "zhipu":
             api_key = kwargs.get("api_key")
@@ -55,11 +172,421 @@ class LLMCaller:
         else:
             raise ValueError(f"Unknown backend: {backend}")
 
-    def generate(self, question: str) -> Tuple[list, str]:
-        return self.llm.generate(question)
+    def _request_key(self, call_type: str, payload: Any) -> str:
+        """请求键（同时用于响应缓存与single-flight合并）"""
+        model = getattr(self.llm, "model", None) or getattr(self.llm, "app_id", "")
+        temperature = getattr(self.llm, f"{call_type}_temperature", None)
+        if call_type == CALL_VALIDATE and isinstance(payload, dict):
+            payload = {field: payload.get(field) for field in VALIDATE_KEY_FIELDS}
+        return make_cache_key(self.backend, model, call_type, temperature, payload)
+
+    def _lookup(self, key: str, call_type: str):
+        if self.cache is None or call_type not in self.cache_calls:
+            return False, None
+        hit, value = self.cache.get(key)
+        if hit and call_type == CALL_GENERATE:
+            value = tuple(value)
+        return hit, value
+
+    def _store(self, key: str, call_type: str, value, failed: bool = False):
+        # 所有后端均失败时的占位结果（"Error"/"N"/ABSTAIN）不缓存，后端恢复后重新请求
+        if self.cache is None or call_type not in self.cache_calls or failed:
+            return
+        self.cache.put(key, list(value) if call_type == CALL_GENERATE else value)
+
+    def _call(self, call_type: str, payload: Any, independent: bool) -> Tuple[Any, bool]:
+        """
+        同步调用流程: 缓存 -> single-flight合并 -> 后端（对冲/故障转移）
+
+        independent=True时跳过缓存与合并，保证得到独立的一次采样
+
+        Returns:
+            (结果, 是否失败)，失败时结果为_failure_result的占位值
+        """
+        if independent:
+            return self._dispatch(call_type, payload)
+        key = self._request_key(call_type, payload)
+        hit, value = self._lookup(key, call_type)
+        if hit:
+            self._record_cache_hit(call_type)
+            return value, False
+
+        def fetch():
+            result, failed = self._dispatch(call_type, payload)
+            self._store(key, call_type, result, failed)
+            return result, failed
+
+        if self.single_flight is None:
+            return fetch()
+        return self.single_flight.do(key, fetch)
+
+    async def _acall(self, call_type: str, payload: Any, independent: bool) -> Tuple[Any, bool]:
+        """_call的异步版本"""
+        if independent:
+            return await self._adispatch(call_type, payload)
+        key = self._request_key(call_type, payload)
+        hit, value = self._lookup(key, call_type)
+        if hit:
+            self._record_cache_hit(call_type)
+            return value, False
+
+        async def fetch():
+            result, failed = await self._adispatch(call_type, payload)
+            self._store(key, call_type, result, failed)
+            return result, failed
+
+        if self.single_flight is None:
+            return await fetch()
+        return await self.single_flight.ado(key, fetch)
+
+    # === 后端调度：故障转移与对冲 ===
+
+    @staticmethod
+    def _backend_label(llm) -> str:
+        return getattr(llm, "backend_name", "") or type(llm).__name__
+
+    @contextmanager
+    def _track(self, llm, call_type: str):
+        """为一次后端调用生成CallRecord（标签取自llm_modules.context.call_scope）"""
+        labels = current_labels()
+        record = CallRecord(
+            backend=self._backend_label(llm),
+            model=getattr(llm, "model", None) or getattr(llm, "app_id", "") or "",
+            call_type=call_type,
+            agent=labels.get("agent"),
+            phase=labels.get("phase"),
+        )
+        start = time.monotonic()
+        try:
+            with record_scope(record):
+                yield record
+        except Exception as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            record.latency_ms = (time.monotonic() - start) * 1000
+            self.telemetry.record(record)
+
+    def _record_cache_hit(self, call_type: str):
+        labels = current_labels()
+        self.telemetry.record(CallRecord(
+            backend=self._backend_label(self.llm),
+            model=getattr(self.llm, "model", None) or "",
+            call_type=call_type,
+            agent=labels.get("agent"),
+            phase=labels.get("phase"),
+            cache_hit=True,
+        ))
+
+    def _invoke(self, index: int, call_type: str, payload: Any):
+        """调用第index个后端（占用其并发名额），成功时记录延迟；熔断的后端直接跳过"""
+        llm = self.backends[index]
+        with llm.concurrency_slot():
+            self._admit(llm)
+            try:
+                with self._track(llm, call_type) as record:
+                    result = getattr(llm, call_type)(payload)
+                    self._check_result(call_type, result)
+            except Exception:
+                self._settle(llm, None)
+                raise
+        self._settle(llm, record.latency_ms)
+        return result
+
+    async def _ainvoke(self, index: int, call_type: str, payload: Any):
+        llm = self.backends[index]
+        self._admit(llm)
+        try:
+            with self._track(llm, call_type) as record:
+                result = await getattr(llm, f"a{call_type}")(payload)
+                self._check_result(call_type, result)
+        except Exception:
+            self._settle(llm, None)
+            raise
+        self._settle(llm, record.latency_ms)
+        return result
+
+    @staticmethod
+    def _admit(llm):
+        if llm.breaker is not None and not llm.breaker.allow():
+            raise BackendUnavailable(f"backend {LLMCaller._backend_label(llm)} circuit open")
+
+    @staticmethod
+    def _settle(llm, latency_ms: Optional[float]):
+        """向熔断器报告结果（latency_ms为None表示失败），成功时记录延迟"""
+        if latency_ms is not None:
+            llm.latency.record(latency_ms)
+        if llm.breaker is None:
+            return
+        if latency_ms is None:
+            llm.breaker.record_failure()
+        else:
+            llm.breaker.record_success(latency_ms)
+
+    def available(self) -> bool:
+        """是否有未熔断的后端（全部熔断时Agent应直接弃权）"""
+        return any(llm.breaker is None or llm.breaker.available() for llm in self.backends)
 
-    def validate(self, proposal: Dict) -> str:
-        return self.llm.validate(proposal)
+    @staticmethod
+    def _check_result(call_type: str, result):
+        # 未启用raise_errors的后端以"Error"答案表示失败
+        if call_type == CALL_GENERATE and result[1] == "Error":
+            raise BackendError("backend returned error result")
+
+    def _failure_result(self, call_type: str, error: Optional[BaseException]):
+        """所有后端均失败时的返回值（与各后端原有的失败返回一致；验证时后端均已熔断则弃权）"""
+        print(f"[ERROR] LLM {call_type} 失败（已尝试 {len(self.backends)} 个后端）: {error}")
+        if call_type == CALL_GENERATE:
+            return ["API调用失败"], "Error"
+        if isinstance(error, BackendUnavailable):
+            return ABSTAIN
+        return "N"
+
+    def _dispatch(self, call_type: str, payload: Any) -> Tuple[Any, bool]:
+        """
+        按故障转移顺序调用后端
+
+        启用对冲时：主请求在p95延迟内未返回，则（预算允许时）向下一个后端
+        （没有备用后端时为主后端本身）再发一个请求，取先成功者；
+        请求失败且没有其他进行中的请求时转移到下一个后端
+
+        Returns:
+            (结果, 是否失败)；所有后端均失败时结果为_failure_result的占位值，
+            与真实的"N"区分开，调用方据此决定是否缓存
+        """
+        backends = len(self.backends)
+        if self.hedge is None:
+            error = None
+            for index in range(backends):
+                try:
+                    return self._invoke(index, call_type, payload), False
+                except Exception as e:
+                    error = e
+                    if index + 1 < backends:
+                        print(f"[WARN] LLM后端{index}失败，转移到下一个后端: {e}")
+            return self._failure_result(call_type, error), True
+
+        self.hedge.record_call()
+        delay = self.hedge.delay(self.llm.latency)
+        pending = {}
+        launched = 0
+        error = None
+
+        def launch():
+            nonlocal launched
+            # 工作线程中沿用当前上下文（如共识阶段设置的截止时间）
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, self._invoke, launched % backends, call_type, payload)
+            pending[future] = launched
+            launched += 1
+
+        launch()
+        hedged = False
+        while pending:
+            done, _ = wait(pending, timeout=None if hedged else delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # 超过p95仍未返回，最多对冲一次
+                hedged = True
+                if self.hedge.try_acquire():
+                    launch()
+                continue
+            for future in done:
+                attempt = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if attempt > 0 and hedged:
+                    self.hedge.record("hedge_wins")
+                return result, False
+            if not pending and launched < backends:
+                self.hedge.record("failovers")
+                launch()
+        return self._failure_result(call_type, error), True
+
+    async def _adispatch(self, call_type: str, payload: Any):
+        """_dispatch的异步版本（对冲的落败请求会被取消）"""
+        backends = len(self.backends)
+        if self.hedge is None:
+            error = None
+            for index in range(backends):
+                try:
+                    return await self._ainvoke(index, call_type, payload), False
+                except Exception as e:
+                    error = e
+            return self._failure_result(call_type, error), True
+
+        self.hedge.record_call()
+        delay = self.hedge.delay(self.llm.latency)
+        pending = {}
+        launched = 0
+        error = None
+
+        def launch():
+            nonlocal launched
+            task = asyncio.ensure_future(self._ainvoke(launched % backends, call_type, payload))
+            pending[task] = launched
+            launched += 1
+
+        launch()
+        hedged = False
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=None if hedged else delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    if self.hedge.try_acquire():
+                        launch()
+                    continue
+                for task in done:
+                    attempt = pending.pop(task)
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if attempt > 0 and hedged:
+                        self.hedge.record("hedge_wins")
+                    return task.result(), False
+                if not pending and launched < backends:
+                    self.hedge.record("failovers")
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        return self._failure_result(call_type, error), True
+
+    def generate(self, question: str, independent: bool = False) -> Tuple[list, str]:
+        return self._call(CALL_GENERATE, question, independent)[0]
+
+    def validate(self, proposal: Dict, independent: bool = False) -> str:
+        return self._call(CALL_VALIDATE, proposal, independent)[0]
+
+    def validate_with_status(self, proposal: Dict, independent: bool = False) -> Tuple[str, bool]:
+        """
+        验证并返回是否失败
+
+        Returns:
+            (结论, 是否失败)；所有后端均失败时结论为占位的"N"/ABSTAIN，调用方不应把它当作真实结论保存
+        """
+        return self._call(CALL_VALIDATE, proposal, independent)
+
+    async def agenerate(self, question: str, independent: bool = False) -> Tuple[list, str]:
+        return (await self._acall(CALL_GENERATE, question, independent))[0]
+
+    async def avalidate(self, proposal: Dict, independent: bool = False) -> str:
+        return (await self._acall(CALL_VALIDATE, proposal, independent))[0]
+
+    def validate_batch(self, proposals: List[Dict], independent: bool = False) -> List[str]:
+        """批量验证：已缓存的提案直接返回，其余合并为一次后端请求"""
+        return [decision for decision, _ in self.validate_batch_with_status(proposals, independent)]
+
+    def validate_batch_with_status(self, proposals: List[Dict], independent: bool = False) -> List[Tuple[str, bool]]:
+        """validate_batch，逐个返回 (结论, 是否失败)"""
+        decisions, keys, pending = self._batch_lookup(proposals, independent)
+        if pending:
+            try:
+                with self.llm.concurrency_slot():
+                    self._admit(self.llm)
+                    with self._track(self.llm, "validate_batch"):
+                        batch = self.llm.validate_batch([proposals[i] for i in pending])
+                results = [(result, False) for result in batch]
+                self._settle_batch(True)
+            except Exception as e:
+                if not isinstance(e, BackendUnavailable):
+                    self._settle_batch(False)
+                # 主后端批量请求失败：逐个走故障转移
+                results = [self._dispatch(CALL_VALIDATE, proposals[i]) for i in pending]
+            self._batch_fill(decisions, keys, pending, results, independent)
+        return decisions
+
+    async def avalidate_batch(self, proposals: List[Dict], independent: bool = False) -> List[str]:
+        decisions, keys, pending = self._batch_lookup(proposals, independent)
+        if pending:
+            try:
+                self._admit(self.llm)
+                with self._track(self.llm, "validate_batch"):
+                    results = [
+                        (result, False) for result in await self.llm.avalidate_batch([proposals[i] for i in pending])
+                    ]
+                self._settle_batch(True)
+            except Exception as e:
+                if not isinstance(e, BackendUnavailable):
+                    self._settle_batch(False)
+                results = [await self._adispatch(CALL_VALIDATE, proposals[i]) for i in pending]
+            self._batch_fill(decisions, keys, pending, results, independent)
+        return [decision for decision, _ in decisions]
+
+    def _settle_batch(self, ok: bool):
+        # 批量请求的延迟与单次请求不可比，只向熔断器报告成败
+        breaker = self.llm.breaker
+        if breaker is None:
+            return
+        if ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+    def _batch_lookup(self, proposals: List[Dict], independent: bool):
+        """已缓存的提案填入 (结论, False)，返回 (结果列表, 请求键, 待请求的下标)"""
+        decisions: List[Optional[Tuple[str, bool]]] = [None] * len(proposals)
+        keys = [None] * len(proposals)
+        pending = []
+        for i, proposal in enumerate(proposals):
+            if not independent:
+                keys[i] = self._request_key(CALL_VALIDATE, proposal)
+                hit, value = self._lookup(keys[i], CALL_VALIDATE)
+                if hit:
+                    decisions[i] = (value, False)
+                    continue
+            pending.append(i)
+        return decisions, keys, pending
+
+    def _batch_fill(self, decisions, keys, pending, results, independent):
+        """results为 (结论, 是否失败) 列表，失败的占位结论不缓存"""
+        for i, (decision, failed) in zip(pending, results):
+            decisions[i] = (decision, failed)
+            if not independent:
+                self._store(keys[i], CALL_VALIDATE, decision, failed)
+
+    def get_rate_limit_stats(self) -> Optional[Dict]:
+        limiter = self.llm.rate_limiter
+        return limiter.get_stats() if limiter is not None else None
+
+    def get_telemetry(self) -> Dict:
+        """按后端汇总的调用遥测"""
+        return self.telemetry.snapshot()
+
+    def get_hedge_stats(self) -> Optional[Dict]:
+        """对冲/故障转移统计，以及各后端的延迟分位（毫秒）"""
+        if self.hedge is None and not self.fallbacks:
+            return None
+        stats = self.hedge.get_stats() if self.hedge is not None else {}
+        for index, llm in enumerate(self.backends):
+            stats[f"backend{index}_p95_ms"] = llm.latency.percentile(95)
+        return stats
+
+    def get_breaker_stats(self) -> Optional[Dict]:
+        """各后端的熔断状态，未启用熔断时返回None"""
+        stats = {
+            self._backend_label(llm): llm.breaker.get_stats() for llm in self.backends if llm.breaker is not None
+        }
+        return stats or None
+
+    def get_single_flight_stats(self) -> Optional[Dict]:
+        return self.single_flight.get_stats() if self.single_flight is not None else None
+
+    def get_cache_stats(self) -> Optional[Dict]:
+        return self.cache.get_stats() if self.cache is not None else None
 
     def health_check(self) -> bool:
-        return self.llm.health_check()
\ No newline at end of file
+        return self.llm.health_check()
+
+    def close(self):
+        """释放对冲线程池、健康探测线程与遥测文件"""
+        if self.health_monitor is not None:
+            self.health_monitor.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.telemetry.close()
\ No newline at end of file
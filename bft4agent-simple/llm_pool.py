@@ -0,0 +1,217 @@
+"""
+异构LLM后端池
+
+按配置为Agent分配不同的后端/模型（对应论文中的异构LLM设定），每个后端有独立的
+并发上限（后端自身的并发名额）与等待队列：慢的服务商只会让自己的队列变长，不会占满其他后端上Agent的并发名额；
+验证请求分散到多个服务商，可用的限额也随之叠加
+"""
+
+import itertools
+import random
+import threading
+from typing import Dict, List, Optional
+
+from llm_new import LLMCaller
+from llm_modules.base import BaseLLM
+from llm_modules.telemetry import LLMTelemetry
+
+
+class QueueFull(RuntimeError):
+    """后端等待队列已满"""
+
+
+class BackendLane:
+    """
+    单个后端的等待队列
+
+    并发名额就是后端自身的concurrency_semaphore（同步与异步调用共用一个上限），
+    队列只统计排队深度与等待时间，并在排队请求超过max_queue时立即拒绝
+    """
+
+    def __init__(self, name: str, llm: BaseLLM, max_queue: Optional[int] = None):
+        """
+        Args:
+            name: 后端名
+            llm: 该后端的LLM实例，队列挂在其并发名额上
+            max_queue: 等待名额的请求数上限，None表示不限；超出时立即失败
+        """
+        self.name = name
+        self.llm = llm
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.stats = {"calls": 0, "queued": 0, "max_waiting": 0, "wait_seconds": 0.0, "rejected": 0, "timeouts": 0}
+        llm.slot_observer = self
+
+    @property
+    def max_concurrency(self) -> int:
+        return self.llm.max_concurrency
+
+    def enter_queue(self):
+        """开始等待名额；队列已满时抛出QueueFull"""
+        with self._lock:
+            if self.max_queue is not None and self.waiting >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise QueueFull(f"backend {self.name} queue full ({self.waiting} waiting)")
+            self.waiting += 1
+            self.stats["max_waiting"] = max(self.stats["max_waiting"], self.waiting)
+
+    def leave_queue(self, acquired: bool, waited: float):
+        """结束等待（acquired为False表示超过截止时间或被取消）"""
+        with self._lock:
+            self.waiting -= 1
+            if not acquired:
+                self.stats["timeouts"] += 1
+                return
+            self.in_flight += 1
+            self.stats["calls"] += 1
+            if waited > 0.001:
+                self.stats["queued"] += 1
+                self.stats["wait_seconds"] += waited
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def slot(self):
+        """占用该后端的一个并发名额（即llm.concurrency_slot）"""
+        return self.llm.concurrency_slot()
+
+    def aslot(self):
+        """slot的异步版本"""
+        return self.llm._concurrency_slot()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "in_flight": self.in_flight, "waiting": self.waiting}
+
+
+class PooledCaller:
+    """
+    分配给Agent的LLM调用入口：在所属后端的队列中取得名额后由该后端的LLMCaller完成调用
+
+    排队发生在LLMCaller内部的并发名额上，队列已满或等待超过截止时间时按后端失败处理
+    （与LLMCaller所有后端失败时的返回一致）
+    """
+
+    def __init__(self, name: str, caller: LLMCaller, lane: BackendLane):
+        self.name = name
+        self.caller = caller
+        self.lane = lane
+
+    def __getattr__(self, name):
+        # generate/validate及统计、health_check等接口直接转给LLMCaller
+        return getattr(self.caller, name)
+
+
+class BackendPool:
+    """按Agent分配后端的LLM调用池"""
+
+    def __init__(
+        self,
+        backends: Dict[str, Dict],
+        assignment: str = "round_robin",
+        defaults: Optional[Dict] = None,
+        pricing: Optional[Dict] = None,
+        telemetry_path: Optional[str] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            backends: {名称: 配置}，配置为LLMCaller参数加上:
+                backend: 后端类型（默认同名称）
+                max_concurrency: 该后端的并发上限
+                max_queue: 等待队列上限，None表示不限
+                weight: 分配权重（默认1）
+                agents: 固定分配到该后端的Agent ID列表
+            assignment: 未固定分配的Agent的分配方式 round_robin | random（均按weight加权）
+            defaults: 各后端共用的LLMCaller参数（后端配置中的字段优先）
+            pricing, telemetry_path: 共享遥测的价格表与JSONL路径
+            seed: random分配的随机种子
+        """
+        if not backends:
+            raise ValueError("BackendPool requires at least one backend")
+        if assignment not in ("round_robin", "random"):
+            raise ValueError(f"Unknown assignment: {assignment}")
+
+        self.assignment = assignment
+        self.telemetry = LLMTelemetry(pricing=pricing, path=telemetry_path)
+        self.callers: Dict[str, PooledCaller] = {}
+        self._pinned: Dict[str, str] = {}
+        weighted: List[str] = []
+
+        for name, spec in backends.items():
+            spec = {**(defaults or {}), **spec}
+            backend = spec.pop("backend", name)
+            max_queue = spec.pop("max_queue", None)
+            weight = spec.pop("weight", 1)
+            for agent_id in spec.pop("agents", None) or []:
+                self._pinned[agent_id] = name
+            caller = LLMCaller(backend=backend, name=name, telemetry=self.telemetry, **spec)
+            lane = BackendLane(name, caller.llm, max_queue=max_queue)
+            self.callers[name] = PooledCaller(name, caller, lane)
+            weighted.extend([name] * int(weight))
+
+        self._weighted = weighted or list(self.callers)
+        self._cycle = itertools.cycle(self._weighted)
+        self._rng = random.Random(seed)
+        self._assigned: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, spec: Dict, api_config: Optional[Dict] = None, defaults: Optional[Dict] = None, **kwargs):
+        """
+        由配置创建，各后端的凭据取自llm_api_config（池配置中的字段优先）
+
+        spec: {"backends": {...}, "assignment": "round_robin", "seed": None}
+        """
+        backends = {}
+        for name, entry in spec["backends"].items():
+            backend = entry.get("backend", name)
+            backends[name] = {**(api_config or {}).get(backend, {}), **entry}
+        return cls(
+            backends,
+            assignment=spec.get("assignment", "round_robin"),
+            defaults=defaults,
+            seed=spec.get("seed"),
+            **kwargs,
+        )
+
+    def backend_of(self, agent_id: str) -> str:
+        """Agent所分配的后端名（首次查询时分配）"""
+        with self._lock:
+            name = self._assigned.get(agent_id)
+            if name is None:
+                name = self._pinned.get(agent_id)
+                if name is None:
+                    name = next(self._cycle) if self.assignment == "round_robin" else self._rng.choice(self._weighted)
+                self._assigned[agent_id] = name
+            return name
+
+    def caller_for(self, agent_id: str) -> PooledCaller:
+        """Agent使用的LLM调用入口（同一后端的Agent共享）"""
+        return self.callers[self.backend_of(agent_id)]
+
+    def assignments(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._assigned)
+
+    def get_stats(self) -> Dict:
+        """各后端的队列统计与分配到的Agent数"""
+        assigned = self.assignments()
+        stats = {}
+        for name, caller in self.callers.items():
+            stats[name] = {
+                **caller.lane.get_stats(),
+                "agents": sum(1 for backend in assigned.values() if backend == name),
+            }
+        return stats
+
+    def get_telemetry(self) -> Dict:
+        """按后端汇总的调用遥测（所有后端共享一个LLMTelemetry）"""
+        return self.telemetry.snapshot()
+
+    def close(self):
+        for caller in self.callers.values():
+            caller.caller.close()
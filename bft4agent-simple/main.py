@@ -8,10 +8,26 @@ import sys
 import time
 from config import load_config
 from agents import create_agents
+from answers import equivalent
 from network import Network
+from clock import VirtualClock
+from faults import FaultSchedule
 from consensus import BFT4Agent
 from llm_new import LLMCaller
+from llm_pool import BackendPool
+from llm_modules import MockLLM
+from llm_modules.clients import configure_pool
+from llm_modules.server import MockLLMServer
 from tasks import TaskLoader
+from verifiers import VerifierChain
+
+
+def attach_virtual_clock(callers, clock):
+    """让各调用入口（含后端池中每个后端及其故障转移后端）下的MockLLM延迟推进同一虚拟时钟"""
+    for caller in callers:
+        for backend in caller.backends:
+            if isinstance(backend, MockLLM):
+                backend.latency_model.clock = clock
 
 
 def print_header(title: str):
@@ -48,6 +64,7 @@ def main():
 
     if backend == "mock":
         llm_kwargs["accuracy"] = config.get("mock_accuracy", 0.85)
+        llm_kwargs["latency"] = config.get("mock_latency")
     else:
         # 从配置中获取对应后端的API配置
         api_config = config.get("llm_api_config", {}).get(backend, {})
@@ -79,7 +96,57 @@ def main():
                 for key, value in api_config.items():
                     llm_kwargs[key] = value
 
-    llm = LLMCaller(backend=backend, **llm_kwargs)
+    # 本地OpenAI兼容模拟服务：经由真实HTTP客户端路径压测openai/custom后端
+    local_server = None
+    server_config = dict(config.get("llm_local_server") or {})
+    if server_config.pop("enabled", False) and backend in ("openai", "custom"):
+        local_server = MockLLMServer(**server_config).start()
+        llm_kwargs["base_url"] = local_server.url
+        llm_kwargs["api_key"] = llm_kwargs.get("api_key") or "local"
+        print(f"[init] 本地LLM服务: {local_server.url}")
+
+    pool_config = dict(config.get("llm_http_pool", {}))
+    llm_kwargs["warm_up"] = pool_config.pop("warm_up", False)
+    configure_pool(**pool_config)
+    llm_kwargs["max_concurrency"] = config.get("llm_max_concurrency", 8)
+    llm_kwargs["validate_temperature"] = config.get("llm_validate_temperature")
+    llm_kwargs["cache"] = config.get("llm_cache")
+    llm_kwargs["streaming"] = config.get("llm_streaming", False)
+    llm_kwargs["json_mode"] = config.get("llm_json_mode", False)
+    llm_kwargs["single_flight"] = config.get("llm_single_flight", True)
+    llm_kwargs["rate_limit"] = config.get("llm_rate_limit")
+    llm_kwargs["retry"] = config.get("llm_retry")
+    llm_kwargs["circuit_breaker"] = config.get("llm_circuit_breaker")
+    # 故障转移后端：凭据取自llm_api_config，条目中的字段优先
+    fallbacks = []
+    for entry in config.get("llm_fallbacks", []):
+        spec = dict(config.get("llm_api_config", {}).get(entry["backend"], {}))
+        spec.update(entry)
+        fallbacks.append(spec)
+    llm_kwargs["fallbacks"] = fallbacks
+    llm_kwargs["hedge"] = config.get("llm_hedge")
+    llm_kwargs["pricing"] = config.get("llm_pricing")
+    llm_kwargs["telemetry_path"] = config.get("llm_telemetry_path")
+
+    # 异构后端池：按Agent分配不同的后端/模型，每个后端独立的并发上限与队列
+    llm_pool = None
+    pool_spec = config.get("llm_pool") or {}
+    if pool_spec.get("enabled") and pool_spec.get("backends"):
+        shared = (
+            "max_concurrency", "validate_temperature", "cache", "streaming", "json_mode", "single_flight",
+            "rate_limit", "retry", "hedge", "warm_up", "circuit_breaker",
+        )
+        llm_pool = BackendPool.from_config(
+            pool_spec,
+            api_config=config.get("llm_api_config", {}),
+            defaults={key: llm_kwargs[key] for key in shared},
+            pricing=llm_kwargs["pricing"],
+            telemetry_path=llm_kwargs["telemetry_path"],
+        )
+        llm = None
+        print(f"[init] LLM后端池: {', '.join(llm_pool.callers)}")
+    else:
+        llm = LLMCaller(backend=backend, **llm_kwargs)
 
     # 创建Agent
     num_malicious = int(config["num_agents"] * config["malicious_ratio"])
@@ -89,12 +156,20 @@ def main():
     role_configs = config.get("agent_roles", [])
     random_assignment = config.get("assign_roles_randomly", True)
 
+    verifiers = VerifierChain.from_config(config.get("validation_verifiers"))
+
     agents = create_agents(
         num_agents=config["num_agents"],
         malicious_ratio=config["malicious_ratio"],
         llm_caller=llm,
         role_configs=role_configs,
         random_assignment=random_assignment,
+        inbox_capacity=config.get("inbox_capacity", 256),
+        inbox_policy=config.get("inbox_policy", "drop_oldest"),
+        llm_pool=llm_pool,
+        verifiers=verifiers,
+        verdict_cache=config.get("verdict_cache"),
+        self_consistency=config.get("leader_self_consistency"),
     )
 
     # 打印Agent信息
@@ -103,12 +178,24 @@ def main():
         malicious_flag = " [malicious]" if agent.is_malicious else ""
         specialty_name = agent.role_config.get("name", "通用")
         specialty = f"- {specialty_name}" if agent.role_config else ""
-        print(f"  {agent.id}: {specialty}, rep={agent.reputation:.2f}{malicious_flag}")
+        backend_flag = f", llm={llm_pool.backend_of(agent.id)}" if llm_pool is not None else ""
+        print(f"  {agent.id}: {specialty}, rep={agent.reputation:.2f}{backend_flag}{malicious_flag}")
 
     # 创建network
     print(f"\n[init] 创建P2Pnetwork...")
+    fault_schedule = None
+    if config.get("fault_schedule"):
+        fault_schedule = FaultSchedule.from_config(config["fault_schedule"])
+        print(f"[init] 故障注入: {fault_schedule}")
+        # 故障注入使用虚拟时钟时，MockLLM延迟也推进同一时钟
+        if isinstance(fault_schedule.clock, VirtualClock):
+            attach_virtual_clock(llm_pool.callers.values() if llm_pool is not None else [llm], fault_schedule.clock)
+
     network = Network(
-        delay_range=config["network_delay"], packet_loss=config.get("packet_loss", 0.01)
+        delay_range=config["network_delay"],
+        packet_loss=config.get("packet_loss", 0.01),
+        seed=config.get("random_seed"),
+        fault_schedule=fault_schedule,
     )
 
     # registernode
@@ -122,6 +209,8 @@ def main():
         network=network,
         timeout=config["timeout"],
         max_retries=config["max_retries"],
+        proposal_transfer=config.get("proposal_transfer"),
+        presolve=config.get("presolve", False),
     )
 
     # 加载任务
@@ -169,6 +258,12 @@ def main():
     print(f"平均time: {total_time/len(results):.2f}秒")
     print(f"总viewchange: {total_view_changes}次")
 
+    # 有标准答案的任务按答案等价类统计准确率（"12"、"12.0"、"答案是12"视为相同）
+    scored = [(r, task) for r, task in zip(results, tasks) if task.get("ground_truth") is not None]
+    if scored:
+        correct = sum(1 for r, task in scored if r["success"] and equivalent(r.get("answer"), task["ground_truth"]))
+        print(f"准确率: {correct}/{len(scored)} ({correct/len(scored):.1%})")
+
     # BFTstats
     stats = bft.get_stats()
     print(f"\n=== BFT协议stats ===")
@@ -181,6 +276,86 @@ def main():
     for key, value in net_stats.items():
         print(f"{key}: {value}")
 
+    # 按消息类型拆分的network遥测
+    print(f"\n=== network遥测（按消息类型）===")
+    for msg_type, counters in network.snapshot()["by_type"].items():
+        latency = counters["latency_ms"] or {}
+        print(
+            f"{msg_type}: messages={counters['messages']}, bytes={counters['bytes']}, "
+            f"drops={counters['drops']}, p50={latency.get('p50', 0):.1f}ms, "
+            f"p95={latency.get('p95', 0):.1f}ms, p99={latency.get('p99', 0):.1f}ms"
+        )
+
+    if verifiers is not None:
+        print(f"\n=== 确定性验证器 ===")
+        for key, value in verifiers.get_stats().items():
+            print(f"{key}: {value}")
+
+    verdict_caches = [agent.verdict_cache for agent in agents if agent.verdict_cache is not None]
+    if verdict_caches:
+        print(f"\n=== 验证结论缓存（所有Agent合计）===")
+        for key in ("hits", "misses", "stores"):
+            print(f"{key}: {sum(cache.get_stats()[key] for cache in verdict_caches)}")
+
+    # 按后端汇总的LLM调用遥测
+    print(f"\n=== LLM调用遥测（按后端）===")
+    for backend_name, summary in (llm_pool or llm).get_telemetry().items():
+        latency = summary["latency_ms"]
+        print(
+            f"{backend_name}: calls={summary['calls']}, errors={summary['errors']}, "
+            f"cache_hits={summary['cache_hits']}, retries={summary['retries']}, "
+            f"tokens={summary['prompt_tokens']}+{summary['completion_tokens']}, cost={summary['cost']:.4f}, "
+            f"p50={latency['p50']:.0f}ms, p95={latency['p95']:.0f}ms, p99={latency['p99']:.0f}ms"
+        )
+        for phase, phase_latency in summary["latency_ms_by_phase"].items():
+            print(f"  {phase}: count={phase_latency['count']}, p50={phase_latency['p50']:.0f}ms, p95={phase_latency['p95']:.0f}ms")
+
+    if llm_pool is not None:
+        print(f"\n=== LLM后端池 ===")
+        for name, lane_stats in llm_pool.get_stats().items():
+            print(f"{name}: {lane_stats}")
+
+    # 每个后端的缓存/限速/对冲/合并统计（未使用后端池时只有一个）
+    callers = llm_pool.callers if llm_pool is not None else {backend: llm}
+    for name, caller in callers.items():
+        label = f" [{name}]" if llm_pool is not None else ""
+
+        # LLM响应缓存
+        cache_stats = caller.get_cache_stats()
+        if cache_stats is not None:
+            print(f"\n=== LLM响应缓存{label} ===")
+            for key, value in cache_stats.items():
+                print(f"{key}: {value}")
+
+        limit_stats = caller.get_rate_limit_stats()
+        if limit_stats is not None:
+            print(f"\n=== LLM限速{label} ===")
+            for key, value in limit_stats.items():
+                print(f"{key}: {value}")
+
+        hedge_stats = caller.get_hedge_stats()
+        if hedge_stats is not None:
+            print(f"\n=== LLM对冲与故障转移{label} ===")
+            for key, value in hedge_stats.items():
+                print(f"{key}: {value}")
+
+        breaker_stats = caller.get_breaker_stats()
+        if breaker_stats is not None:
+            print(f"\n=== LLM熔断{label} ===")
+            for backend_name, value in breaker_stats.items():
+                print(f"{backend_name}: {value}")
+
+        flight_stats = caller.get_single_flight_stats()
+        if flight_stats is not None:
+            print(f"\n=== LLM请求合并{label} ===")
+            print(f"实际调用: {flight_stats['calls']}, 合并: {flight_stats['coalesced']}")
+
+    if local_server is not None:
+        print(f"\n=== 本地LLM服务 ===")
+        for key, value in local_server.get_stats().items():
+            print(f"{key}: {value}")
+        local_server.stop()
+
     print("\n" + "=" * 60)
     print("  Democomplete!")
     print("=" * 60)
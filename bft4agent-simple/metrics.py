@@ -0,0 +1,118 @@
+"""
+统计指标工具
+
+LatencyHistogram: HDR风格的对数-线性分桶直方图，
+内存占用与样本数无关，分位数相对误差约为 1 / sub_buckets
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, Optional
+
+
+class LatencyHistogram:
+    """HDR风格延迟直方图（单位由调用方决定，网络与LLM统计中均为毫秒）"""
+
+    def __init__(self, sub_buckets: int = 32, lowest: float = 0.001):
+        """
+        init直方图
+
+        Args:
+            sub_buckets: 每个2的幂区间内的线性子桶数（决定精度）
+            lowest: 最小可区分值，更小的值归入第一个桶
+        """
+        self.sub_buckets = sub_buckets
+        self.lowest = lowest
+        self._counts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _bucket_index(self, value: float) -> int:
+        scaled = max(value, self.lowest) / self.lowest
+        exponent = int(math.floor(math.log2(scaled)))
+        fraction = scaled / (2 ** exponent) - 1.0  # [0, 1)
+        sub = min(int(fraction * self.sub_buckets), self.sub_buckets - 1)
+        return exponent * self.sub_buckets + sub
+
+    def _bucket_value(self, index: int) -> float:
+        """桶的中点值"""
+        exponent, sub = divmod(index, self.sub_buckets)
+        low = (2 ** exponent) * (1.0 + sub / self.sub_buckets)
+        high = (2 ** exponent) * (1.0 + (sub + 1) / self.sub_buckets)
+        return (low + high) / 2 * self.lowest
+
+    def record(self, value: float):
+        """记录一个样本"""
+        index = self._bucket_index(value)
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def record_many(self, values: Iterable[float]):
+        for value in values:
+            self.record(value)
+
+    def percentile(self, q: float) -> float:
+        """
+        分位数
+
+        Args:
+            q: 百分位 (0-100)
+        """
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            target = max(1, int(math.ceil(self.count * q / 100.0)))
+            seen = 0
+            for index in sorted(self._counts):
+                seen += self._counts[index]
+                if seen >= target:
+                    # 桶中点不超出实际观测到的范围
+                    return min(max(self._bucket_value(index), self.min), self.max)
+            return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other: "LatencyHistogram"):
+        """合并另一个直方图（需相同精度配置）"""
+        if (other.sub_buckets, other.lowest) != (self.sub_buckets, self.lowest):
+            raise ValueError("Cannot merge histograms with different precision")
+        with self._lock:
+            for index, count in other._counts.items():
+                self._counts[index] = self._counts.get(index, 0) + count
+            self.count += other.count
+            self.total += other.total
+            if other.count:
+                self.min = other.min if self.min is None else min(self.min, other.min)
+                self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self.count = 0
+            self.total = 0.0
+            self.min = None
+            self.max = None
+
+    def snapshot(self) -> Dict:
+        """导出摘要"""
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "min": self.min or 0.0,
+            "max": self.max or 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+    def __repr__(self):
+        return f"LatencyHistogram(count={self.count}, p50={self.percentile(50):.3f}, p99={self.percentile(99):.3f})"
@@ -2,10 +2,105 @@
 简化的P2Pnetwork模拟
 """
 
+import base64
+import dataclasses
+import json
+import threading
 import time
-import random
+from enum import Enum
 from typing import Dict, List, Callable
 
+from clock import WallClock
+from faults import LinkRandom
+from inbox import BLOCK
+from metrics import LatencyHistogram
+
+
+def _encode_default(obj):
+    """JSON序列化兜底：dataclass消息、枚举、二进制等"""
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode("ascii")
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def estimate_message_size(message: Dict) -> int:
+    """估算消息的线上字节数（JSON序列化后的UTF-8长度）"""
+    return len(json.dumps(message, default=_encode_default, ensure_ascii=False).encode("utf-8"))
+
+
+class NetworkTelemetry:
+    """network遥测：按消息类型和链路统计消息数、字节数、丢包和delay"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_type: Dict[str, Dict] = {}
+        self.by_link: Dict[str, Dict] = {}
+        self.latency_by_type: Dict[str, LatencyHistogram] = {}
+        self.latency = LatencyHistogram()
+
+    @staticmethod
+    def _new_counters() -> Dict:
+        return {"messages": 0, "delivered": 0, "bytes": 0, "drops": 0, "drop_reasons": {}}
+
+    def _counters(self, msg_type: str, src: str, dst: str):
+        type_counters = self.by_type.setdefault(msg_type, self._new_counters())
+        link_counters = self.by_link.setdefault(f"{src}->{dst}", self._new_counters())
+        return type_counters, link_counters
+
+    def record_delivery(self, msg_type: str, src: str, dst: str, size: int, latency_ms: float):
+        """记录一次成功deliver"""
+        with self._lock:
+            for counters in self._counters(msg_type, src, dst):
+                counters["messages"] += 1
+                counters["delivered"] += 1
+                counters["bytes"] += size
+            histogram = self.latency_by_type.setdefault(msg_type, LatencyHistogram())
+        histogram.record(latency_ms)
+        self.latency.record(latency_ms)
+
+    def record_drop(self, msg_type: str, src: str, dst: str, size: int, reason: str):
+        """记录一次丢弃（丢包/故障/收件箱溢出），已发出的字节仍计入发送方"""
+        with self._lock:
+            for counters in self._counters(msg_type, src, dst):
+                counters["messages"] += 1
+                counters["bytes"] += size
+                counters["drops"] += 1
+                counters["drop_reasons"][reason] = counters["drop_reasons"].get(reason, 0) + 1
+
+    def snapshot(self) -> Dict:
+        """导出当前统计的快照（深拷贝，可安全序列化）"""
+        with self._lock:
+            by_type = {
+                t: dict(c, drop_reasons=dict(c["drop_reasons"]),
+                        latency_ms=self.latency_by_type[t].snapshot() if t in self.latency_by_type else None)
+                for t, c in self.by_type.items()
+            }
+            by_link = {
+                link: dict(c, drop_reasons=dict(c["drop_reasons"]))
+                for link, c in self.by_link.items()
+            }
+        totals = {
+            "messages": sum(c["messages"] for c in by_type.values()),
+            "delivered": sum(c["delivered"] for c in by_type.values()),
+            "bytes": sum(c["bytes"] for c in by_type.values()),
+            "drops": sum(c["drops"] for c in by_type.values()),
+            "latency_ms": self.latency.snapshot(),
+        }
+        return {"totals": totals, "by_type": by_type, "by_link": by_link}
+
+    def reset(self):
+        with self._lock:
+            self.by_type.clear()
+            self.by_link.clear()
+            self.latency_by_type.clear()
+        self.latency.reset()
+
 
 class Network:
     """简化的P2Pnetwork模拟器"""
@@ -14,6 +109,10 @@ class Network:
         self,
         delay_range: tuple = (10, 100),  # (min, max) in ms
         packet_loss: float = 0.01,
+        backpressure: bool = True,
+        backpressure_timeout: float = 0.5,
+        seed: int = None,
+        fault_schedule=None,
     ):
         """
         initnetwork
@@ -21,14 +120,28 @@ class Network:
         Args:
             delay_range: delay范围（毫秒）
             packet_loss: 丢包率 (0.0-1.0)
+            backpressure: 接收方收件箱（block策略）拥塞时是否让发送方等待
+            backpressure_timeout: 每次背压等待的最长时间（秒）
+            seed: 随机种子（丢包和delay采样，按链路和消息序号派生），None表示不固定
+            fault_schedule: 故障注入调度（FaultSchedule），其时钟同时驱动delay
         """
         self.delay_range = delay_range
         self.packet_loss = packet_loss
+        self.backpressure = backpressure
+        self.backpressure_timeout = backpressure_timeout
+        self.fault_schedule = fault_schedule
+        self.clock = fault_schedule.clock if fault_schedule is not None else WallClock()
+        self.link_rng = LinkRandom(seed, stream="network")
         self.nodes: Dict[str, object] = {}
 
         # stats
-        self.message_count = 0
+        self.message_count = 0  # broadcast/send调用次数
+        self.delivery_count = 0  # 逐接收者的投递尝试次数
         self.drop_count = 0
+        self.telemetry = NetworkTelemetry()
+        self.overflow_count = 0
+        self.backpressure_waits = 0
+        self.backpressure_time = 0.0
 
     def register(self, node):
         """registernode"""
@@ -64,29 +177,75 @@ class Network:
         if target_ids is None:
             target_ids = [nid for nid in self.nodes.keys() if nid != sender_id]
 
+        msg_type = str(message.get("type", "UNKNOWN"))
+        size = estimate_message_size(message)
         results = {}
+        # 故障窗口按发送时刻判断，各接收者的投递时刻 = 发送时刻 + 链路delay（并行发出，不累加）
+        sent_at = self.clock.now()
 
         for node_id in target_ids:
+            self.delivery_count += 1
+
+            # 故障注入（宕机/分区/链路丢包/突发丢包）
+            fault = self.fault_schedule.should_drop(sender_id, node_id, sent_at) if self.fault_schedule is not None else None
+            if fault:
+                self.drop_count += 1
+                self.telemetry.record_drop(msg_type, sender_id, node_id, size, fault)
+                results[node_id] = False
+                continue
+
             # 模拟丢包
-            if random.random() < self.packet_loss:
+            rng = self.link_rng.next(sender_id, node_id)
+            if rng.random() < self.packet_loss:
                 self.drop_count += 1
+                self.telemetry.record_drop(msg_type, sender_id, node_id, size, "loss")
                 results[node_id] = False
                 continue
 
             # 模拟delay
-            delay_ms = random.uniform(*self.delay_range)
-            time.sleep(delay_ms / 1000.0)  # 转换为秒
+            delay_ms = rng.uniform(*self.delay_range)
+            if self.fault_schedule is not None:
+                delay_ms += self.fault_schedule.extra_delay_ms(sender_id, node_id, sent_at)
+            self.clock.sleep_until(sent_at + delay_ms / 1000.0)  # 转换为秒
 
             # deliver消息
             if node_id in self.nodes:
                 node = self.nodes[node_id]
-                node.receive_message(message)
-                results[node_id] = True
+                waited = self._apply_backpressure(node)
+                # receive_message返回False表示被接收方收件箱拒收（溢出）
+                accepted = node.receive_message(message) is not False
+                if accepted:
+                    self.telemetry.record_delivery(msg_type, sender_id, node_id, size, delay_ms + waited * 1000.0)
+                else:
+                    self.overflow_count += 1
+                    self.telemetry.record_drop(msg_type, sender_id, node_id, size, "overflow")
+                results[node_id] = accepted
             else:
+                self.telemetry.record_drop(msg_type, sender_id, node_id, size, "unknown_node")
                 results[node_id] = False
 
         return results
 
+    def _apply_backpressure(self, node) -> float:
+        """
+        接收方收件箱拥塞时阻塞发送方，直到接收方腾出空间或超时
+
+        Returns:
+            等待时间（秒）
+        """
+        inbox = getattr(node, "inbox", None)
+        if not self.backpressure or inbox is None or inbox.policy != BLOCK:
+            return 0.0
+        if not inbox.is_congested():
+            return 0.0
+
+        wait_start = time.time()
+        self.backpressure_waits += 1
+        inbox.wait_for_space(self.backpressure_timeout)
+        waited = time.time() - wait_start
+        self.backpressure_time += waited
+        return waited
+
     def send(self, message: Dict, sender_id: str, receiver_id: str) -> bool:
         """
         单播消息
@@ -102,25 +261,56 @@ class Network:
         results = self.broadcast(message, sender_id, [receiver_id])
         return results.get(receiver_id, False)
 
+    def is_up(self, node_id: str) -> bool:
+        """node是否在线（未被故障调度置为宕机）"""
+        if self.fault_schedule is None:
+            return True
+        return not self.fault_schedule.is_crashed(node_id)
+
     def get_stats(self) -> Dict:
         """获取networkstats信息"""
-        total_sent = self.message_count
+        total_sent = self.delivery_count
         total_dropped = self.drop_count
         success_rate = (
             (total_sent - total_dropped) / total_sent if total_sent > 0 else 1.0
         )
+        latency = self.telemetry.latency
 
-        return {
+        stats = {
+            "broadcast_calls": self.message_count,
             "total_sent": total_sent,
             "total_dropped": total_dropped,
             "success_rate": success_rate,
-            "avg_delay_ms": sum(self.delay_range) / 2,
+            "total_bytes": self.telemetry.snapshot()["totals"]["bytes"],
+            "avg_delay_ms": latency.mean() if latency.count else sum(self.delay_range) / 2,
+            "p99_delay_ms": latency.percentile(99),
+            "inbox_overflow": self.overflow_count,
+            "backpressure_waits": self.backpressure_waits,
+            "backpressure_time": self.backpressure_time,
         }
+        if self.fault_schedule is not None:
+            stats["faults"] = self.fault_schedule.get_stats()
+        return stats
+
+    def snapshot(self) -> Dict:
+        """
+        获取按消息类型/链路拆分的遥测快照
+
+        Returns:
+            {"totals": {...}, "by_type": {type: {...}}, "by_link": {"src->dst": {...}}}
+            其中latency_ms包含count/mean/min/max/p50/p95/p99
+        """
+        return self.telemetry.snapshot()
 
     def reset_stats(self):
         """重置stats"""
         self.message_count = 0
+        self.delivery_count = 0
         self.drop_count = 0
+        self.telemetry.reset()
+        self.overflow_count = 0
+        self.backpressure_waits = 0
+        self.backpressure_time = 0.0
 
     def __repr__(self):
         return f"Network(nodes={len(self.nodes)}, delay={self.delay_range}ms)"
@@ -0,0 +1,123 @@
+"""
+测试共用的假LLM后端与LLMCaller构造
+
+测试文件以 `from conftest import FakeLLM, make_caller` 引用（pytest与直接运行脚本均可）
+"""
+import sys
+import os
+import asyncio
+import json
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from llm_modules.base import BaseLLM
+from llm_modules.context import remaining_time
+from llm_new import LLMCaller
+
+
+class FakeLLM(BaseLLM):
+    """
+    可编排的假后端
+
+    Args:
+        answers: generate依次返回的答案（循环使用；"Error"表示生成失败）
+        decision: validate的结论，或 (proposal) -> "Y"/"N"
+        delay: 每次调用的耗时（秒）；为列表时按调用顺序依次取用，用完后为0
+        name: 模型名
+        batch_reply: 批量验证请求的原始回复，None时按decision逐个给出JSON数组
+
+    down=True时所有调用抛出ConnectionError，healthy控制health_check；
+    generate_calls / validate_calls 记录调用次数，batches记录每次批量请求的提案数，
+    deadlines记录每次validate时的剩余截止时间
+    """
+
+    def __init__(self, answers=("4",), decision="Y", delay=0.0, name="fake", batch_reply=None):
+        self.model = name
+        self.answers = [answers] if isinstance(answers, str) else list(answers)
+        self.decision = decision
+        self.delays = list(delay) if isinstance(delay, (list, tuple)) else None
+        self.delay = 0.0 if self.delays is not None else delay
+        self.batch_reply = batch_reply
+        self.down = False
+        self.healthy = True
+        self.generate_calls = 0
+        self.validate_calls = 0
+        self.batches = []
+        self.deadlines = []
+        self._lock = threading.Lock()
+
+    @property
+    def calls(self) -> int:
+        return self.generate_calls + self.validate_calls
+
+    def _begin(self, counter: str):
+        """计数并取本次调用的耗时与序号"""
+        with self._lock:
+            index = getattr(self, counter)
+            setattr(self, counter, index + 1)
+            if self.delays is None:
+                return self.delay, index
+            return (self.delays.pop(0) if self.delays else 0.0), index
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError(f"{self.model} down")
+
+    def _generation(self, question, index):
+        self._check()
+        answer = self.answers[index % len(self.answers)]
+        if answer == "Error":
+            return ["API调用失败"], "Error"
+        return [f"步骤1: 计算 {question}", f"步骤2: 得出 {answer}"], answer
+
+    def _decide(self, proposal):
+        self._check()
+        return self.decision(proposal) if callable(self.decision) else self.decision
+
+    def generate(self, question):
+        delay, index = self._begin("generate_calls")
+        time.sleep(delay)
+        return self._generation(question, index)
+
+    def validate(self, proposal):
+        delay, _ = self._begin("validate_calls")
+        time.sleep(delay)
+        self.deadlines.append(remaining_time())
+        return self._decide(proposal)
+
+    async def _agenerate(self, question):
+        delay, index = self._begin("generate_calls")
+        await asyncio.sleep(delay)
+        return self._generation(question, index)
+
+    async def _avalidate(self, proposal):
+        delay, _ = self._begin("validate_calls")
+        await asyncio.sleep(delay)
+        return self._decide(proposal)
+
+    def _request_batch_validation(self, prompt, count):
+        with self._lock:
+            self.batches.append(count)
+        self._check()
+        assert f"[提案{count}]" in prompt
+        if self.batch_reply is not None:
+            return self.batch_reply
+        if callable(self.decision):
+            raise NotImplementedError
+        return json.dumps([self.decision] * count)
+
+    def health_check(self):
+        return self.healthy
+
+
+def make_caller(llm, fallbacks=(), **kwargs):
+    """
+    以假后端构造LLMCaller（经过_configure，熔断、重试、限速等配置与真实后端一致）
+
+    默认关闭single-flight，使每次调用都到达后端；fallbacks为备用的假后端实例
+    """
+    kwargs.setdefault("single_flight", False)
+    kwargs["fallbacks"] = [{"backend": fallback.model, "llm": fallback} for fallback in fallbacks]
+    return LLMCaller(backend=kwargs.pop("backend", llm.model), llm=llm, **kwargs)
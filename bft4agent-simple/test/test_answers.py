@@ -0,0 +1,92 @@
+"""
+测试答案规范化与等价类
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import answers
+from agents import create_agents
+from answers import AnswerClasses, answer_class, equivalent, normalize_answer, reset_answer_classes, to_number
+from consensus import BFT4Agent
+from llm_new import LLMCaller
+from network import Network
+from llm_modules.mock import MockLLM
+from verdicts import verdict_key
+
+
+def test_numeric_answers():
+    for answer in ["4", "4.0", "答案是4", "**4**", "最终答案：4。", "The answer is 4.", "４", "4个", "2 + 2 = 4"]:
+        assert normalize_answer(answer) == "4", answer
+    assert normalize_answer("1,081") == "1081"
+    assert normalize_answer("经过计算，23乘以47等于1081。") == "1081"
+    assert normalize_answer("300%") == "300%" and to_number("300%") == 3.0
+    assert to_number("12.50") == 12.5 and to_number("nan") is None and to_number("企鹅") is None
+    # 只有量词被去掉，物理单位区分等价类
+    assert normalize_answer("5个苹果") == "5" and normalize_answer("5 cm") == normalize_answer("5cm") == "5cm"
+    assert len({normalize_answer(a) for a in ["5", "5cm", "5km", "5kg"]}) == 4
+    assert to_number("5kg") is None
+    # 否定不被当作给出的数值
+    assert normalize_answer("不是4") != "4" and normalize_answer("答案并非4") != "4"
+    assert normalize_answer("首先分析题意，然后逐步推导，考虑所有的可能情况之后得出结论，所以不是 14") != "14"
+    print("[OK] 数值答案规范化测试通过")
+
+
+def test_boolean_and_text_answers():
+    assert normalize_answer("是") == normalize_answer("Yes") == "true"
+    assert normalize_answer("不会") == normalize_answer("FALSE") == "false"
+    assert normalize_answer("  小明  大5岁 ") == "小明 大5岁"
+    assert normalize_answer("小明大5岁") != normalize_answer("小刚大5岁")
+    paragraph = "首先分析题意，然后逐步推导，考虑所有的可能情况之后得出结论。最终答案: 第二名"
+    assert normalize_answer(paragraph) == "第二名"
+    assert normalize_answer("先算乘法再算加法，一步一步地计算下去，最后的结果是 14") == "14"
+    print("[OK] 布尔与文本答案规范化测试通过")
+
+
+def test_equivalence_classes():
+    classes = AnswerClasses()
+    assert classes.class_id("12") == classes.class_id("12.0") == classes.class_id("答案是12")
+    assert classes.class_id("13") != classes.class_id("12") and len(classes) == 2
+    assert equivalent("1081", "1,081.00") and not equivalent("1081", "1082")
+    assert isinstance(answer_class("4"), int)
+    classes.clear()
+    assert len(classes) == 0 and classes.class_id("7") == 0
+    print("[OK] 等价类测试通过")
+
+
+def test_classes_reset_per_task():
+    """全局等价类表在每个任务开始时清空，不随运行时间增长"""
+    for i in range(100):
+        answer_class(f"答案{i}")
+    agents = create_agents(num_agents=4, malicious_ratio=0.0, llm_caller=LLMCaller(backend="mock", accuracy=1.0))
+    network = Network(delay_range=(1, 2), packet_loss=0.0, seed=1)
+    for agent in agents:
+        network.register(agent)
+    BFT4Agent(agents=agents, network=network, timeout=5.0).run({"task_id": "t", "content": "2 + 2 = ?", "type": "math"})
+    assert len(answers._classes) < 10
+    reset_answer_classes()
+    assert len(answers._classes) == 0
+    print("[OK] 等价类表按任务清空测试通过")
+
+
+def test_consumers_use_classes():
+    """结论缓存与Mock验证按等价类比较"""
+    proposal = {"task_content": "144 / 12 = ?", "answer": "12", "reasoning": ["a", "b"]}
+    assert verdict_key(proposal) == verdict_key({**proposal, "answer": "答案是12.0"})
+    llm = MockLLM(latency={"generate": 0, "validate": 0})
+    assert llm.validate({**proposal, "answer": "答案是12"}) == "Y"
+    print("[OK] 等价类使用方测试通过")
+
+
+def main():
+    test_numeric_answers()
+    test_boolean_and_text_answers()
+    test_equivalence_classes()
+    test_classes_reset_per_task()
+    test_consumers_use_classes()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
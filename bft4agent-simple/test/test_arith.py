@@ -0,0 +1,96 @@
+"""
+测试安全算术求值（替代eval）及其缓存
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import arith
+from agents import Agent
+from llm_modules.mock import MockLLM
+
+
+def test_evaluate():
+    """支持的运算与Python语义一致"""
+    assert arith.evaluate("2 + 3 * 4") == 14
+    assert arith.evaluate("144 / 12") == 12.0
+    assert arith.evaluate("(1 + 2) ** 3 - -1") == 28
+    assert arith.evaluate("7 // 2 + 7 % 2") == 4
+    assert arith.evaluate("6 × 7") == 42 and arith.evaluate("2^10") == 1024
+    print("[OK] 算术求值测试通过")
+
+
+def test_rejects_code():
+    """任务内容中的代码不会被执行"""
+    for expr in ["__import__('os').system('echo hi')", "a + 1", "[1, 2]", "2 ** 1000000", "True + 1", "1 +"]:
+        try:
+            arith.evaluate(expr)
+            assert False, expr
+        except ValueError:
+            pass
+    try:
+        arith.evaluate("1 / 0")
+        assert False
+    except ZeroDivisionError:
+        pass
+    assert arith.solve("__import__('os').getcwd() = ?") is None
+    print("[OK] 拒绝非算术内容测试通过")
+
+
+def test_bounded_result():
+    """嵌套乘方与连乘在计算前被拒绝，mock回答不会因超大结果出错"""
+    start = time.monotonic()
+    for expr in ["(((10**100)**100)**100)**100", "(10**100)**100", "(2**100)**80 * (2**100)**80"]:
+        try:
+            arith.evaluate(expr)
+            assert False, expr
+        except ValueError:
+            pass
+    assert time.monotonic() - start < 1.0
+    assert arith.evaluate("(2**50)**2") == 2 ** 100
+    assert Agent("agent_1")._mock_answer("(10**100)**100 = ?") == "Mock Answer"
+    llm = MockLLM(accuracy=1.0, latency={"generate": 0, "validate": 0})
+    assert llm.generate("(10**100)**100 = ?")[1] == "0"
+    print("[OK] 结果大小上限测试通过")
+
+
+def test_extract_expression():
+    assert arith.extract_expression("23 * 47 = ?") == "23 * 47"
+    assert arith.extract_expression("你是一位数学专家，请计算。\n\n问题: (2 + 3) * 4 = ?") == "(2 + 3) * 4"
+    assert arith.extract_expression("如果你有3个苹果，你拿走了2个，你现在有几个苹果？") is None
+    assert arith.solve("小明有 5 + 6 个苹果") == ("5 + 6", 11)
+    print("[OK] 表达式提取测试通过")
+
+
+def test_shared_cache():
+    """生成与验证共用规范化表达式的缓存"""
+    arith.clear_cache()
+    llm = MockLLM(accuracy=1.0, latency={"generate": 0, "validate": 0})
+    reasoning, answer = llm.generate("你是一位数学专家。\n\n问题: 23 * 47 = ?")
+    assert answer == "1081"
+    proposal = {"task_content": "23*47 = ?", "reasoning": reasoning, "answer": answer}
+    for _ in range(5):
+        assert llm.validate(proposal) == "Y"
+    assert llm.validate({**proposal, "answer": "1082"}) == "N"
+    info = arith.cache_info()
+    assert info["expressions"].misses == 1 and info["expressions"].hits >= 1
+    assert info["texts"].hits >= 4
+
+    assert Agent("agent_1")._mock_answer("144 / 12 = ?") == "12.0"
+    assert Agent("agent_1")._mock_answer("请说明理由。") == "Mock Answer"
+    print("[OK] 共享缓存测试通过")
+
+
+def main():
+    test_evaluate()
+    test_rejects_code()
+    test_bounded_result()
+    test_extract_expression()
+    test_shared_cache()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+测试异步LLM调用
+
+验证agenerate/avalidate结果与同步接口一致，且并发数受max_concurrency限制
+"""
+
+import asyncio
+import threading
+import time
+
+from llm_new import LLMCaller
+
+
+def test_async_matches_sync():
+    """异步接口与同步接口给出相同结果"""
+    llm = LLMCaller(backend="mock", accuracy=1.0)
+    proposal = {
+        "task_content": "23 * 47 = ?",
+        "reasoning": ["步骤1: 分析问题", "步骤2: 计算"],
+        "answer": "1081",
+    }
+
+    async def run():
+        return await llm.agenerate("23 * 47 = ?"), await llm.avalidate(proposal)
+
+    (reasoning, answer), decision = asyncio.run(run())
+    assert answer == llm.generate("23 * 47 = ?")[1] == "1081"
+    assert decision == llm.validate(proposal) == "Y"
+    print("[OK] 异步接口结果与同步一致")
+
+
+def test_concurrency_is_bounded():
+    """同一事件循环上的并发请求数不超过max_concurrency"""
+    llm = LLMCaller(backend="mock", accuracy=1.0, max_concurrency=3)
+    in_flight = {"now": 0, "peak": 0}
+
+    async def fake_validate(proposal):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.02)
+        in_flight["now"] -= 1
+        return "Y"
+
+    llm.llm._avalidate = fake_validate
+
+    async def run():
+        return await asyncio.gather(*(llm.avalidate({"task_id": i}) for i in range(12)))
+
+    start = time.time()
+    results = asyncio.run(run())
+    elapsed = time.time() - start
+
+    assert results == ["Y"] * 12
+    assert in_flight["peak"] == 3
+    assert elapsed >= 0.08  # 12个请求 / 3并发 * 0.02秒
+    print(f"[OK] 并发上限: 峰值 {in_flight['peak']}, 耗时 {elapsed:.2f}s")
+
+
+def test_cap_shared_by_threads_and_loops():
+    """同步调用线程与多个事件循环共用同一后端的并发名额"""
+    llm = LLMCaller(backend="mock", accuracy=1.0, max_concurrency=2, single_flight=False)
+    lock = threading.Lock()
+    in_flight = {"now": 0, "peak": 0}
+
+    results = []
+
+    def enter():
+        with lock:
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+
+    def leave():
+        with lock:
+            in_flight["now"] -= 1
+        return "Y"
+
+    def tracked_validate(proposal):
+        enter()
+        time.sleep(0.02)
+        return leave()
+
+    async def tracked_avalidate(proposal):
+        enter()
+        await asyncio.sleep(0.02)
+        return leave()
+
+    llm.llm.validate = tracked_validate
+    llm.llm._avalidate = tracked_avalidate
+
+    def sync_worker():
+        results.extend(llm.validate({"task_id": f"sync-{i}"}) for i in range(3))
+
+    def loop_worker():
+        async def run():
+            return await asyncio.gather(*(llm.avalidate({"task_id": f"async-{i}"}) for i in range(4)))
+        results.extend(asyncio.run(run()))
+
+    threads = [threading.Thread(target=sync_worker) for _ in range(3)]
+    threads += [threading.Thread(target=loop_worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["Y"] * 17
+    assert in_flight["peak"] == 2
+    print(f"[OK] 线程与事件循环共用并发上限: 峰值 {in_flight['peak']}")
+
+
+def test_async_waiter_wakes_on_release():
+    """名额释放后等待中的协程立即恢复；被取消的等待者不占用名额也不吞掉唤醒"""
+    llm = LLMCaller(backend="mock", accuracy=1.0, max_concurrency=1).llm
+    holding = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with llm.concurrency_slot():
+            holding.set()
+            release.wait()
+
+    async def run():
+        holder = threading.Thread(target=hold)
+        holder.start()
+        holding.wait()
+
+        async def wait_slot():
+            async with llm._concurrency_slot():
+                return time.monotonic()
+
+        cancelled = asyncio.ensure_future(wait_slot())
+        waiter = asyncio.ensure_future(wait_slot())
+        await asyncio.sleep(0.13)
+        cancelled.cancel()
+        released_at = time.monotonic()
+        release.set()
+        acquired_at = await waiter
+        holder.join()
+        return acquired_at - released_at
+
+    lag = asyncio.run(run())
+    # 轮询实现（2~50ms退避）在0.13秒时的唤醒滞后约30ms
+    assert lag < 0.02, lag
+    assert llm.concurrency_semaphore.acquire(blocking=False)
+    llm.concurrency_semaphore.release()
+    assert not llm._slot_waiters
+    print(f"[OK] 名额释放后唤醒滞后 {lag * 1000:.1f}ms")
+
+
+def test_one_loop_drives_many_calls():
+    """单个事件循环并发驱动大量验证，总耗时接近单次调用"""
+    llm = LLMCaller(backend="mock", accuracy=1.0, max_concurrency=100)
+    proposal = {"task_content": "2 + 2 = ?", "reasoning": ["a", "b"], "answer": "4"}
+
+    async def run():
+        return await asyncio.gather(*(llm.avalidate(proposal) for _ in range(100)))
+
+    start = time.time()
+    results = asyncio.run(run())
+    elapsed = time.time() - start
+
+    assert results == ["Y"] * 100
+    assert elapsed < 2.0  # 串行需要 100 * (0.05~0.2) 秒
+    print(f"[OK] 100个并发验证耗时 {elapsed:.2f}s")
+
+
+def main():
+    """运行所有测试"""
+    test_async_matches_sync()
+    test_concurrency_is_bounded()
+    test_cap_shared_by_threads_and_loops()
+    test_async_waiter_wakes_on_release()
+    test_one_loop_drives_many_calls()
+    print("\n[OK] 所有异步LLM测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+测试批量验证
+"""
+import sys
+import os
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from agents import Agent
+from conftest import FakeLLM, make_caller
+from llm_modules.base import BaseLLM
+from llm_new import LLMCaller
+
+
+def scripted(reply):
+    """按脚本回复批量请求，逐个验证时答案为4才投Y"""
+    return FakeLLM(decision=lambda proposal: "Y" if proposal.get("answer") == "4" else "N", batch_reply=reply)
+
+
+PROPOSALS = [
+    {"task_id": "t1", "answer": "4", "reasoning": ["2+2=4"]},
+    {"task_id": "t2", "answer": "5", "reasoning": ["2+2=5"]},
+    {"task_id": "t3", "answer": "4", "reasoning": ["1+3=4"]},
+]
+
+
+def test_parse_batch_decisions():
+    """测试批量结果解析"""
+    parse = BaseLLM._parse_batch_decisions
+    assert parse('["Y", "N", "Y"]', 3) == ["Y", "N", "Y"]
+    assert parse('结论如下:\n```json\n["y","n"]\n```', 2) == ["Y", "N"]
+    assert parse("[true, false]", 2) == ["Y", "N"]
+    assert parse("1. Y\n2: N\n提案3：Y", 3) == ["Y", "N", "Y"]
+    assert parse('["Y", "N"]', 3) is None
+    assert parse("都正确", 2) is None
+    print("[OK] 批量结果解析测试通过")
+
+
+def test_single_request():
+    """测试多个提案合并为一次请求"""
+    llm = scripted('["Y", "N", "Y"]')
+    assert llm.validate_batch(PROPOSALS) == ["Y", "N", "Y"]
+    assert len(llm.batches) == 1 and llm.validate_calls == 0
+    print("[OK] 单次批量请求测试通过")
+
+
+def test_fallback_on_bad_reply():
+    """测试回复无法解析或数量不符时逐个验证"""
+    llm = scripted('["Y"]')
+    assert llm.validate_batch(PROPOSALS) == ["Y", "N", "Y"]
+    assert len(llm.batches) == 1 and llm.validate_calls == 3
+    print("[OK] 解析失败回退测试通过")
+
+
+def test_caller_batch_uses_cache():
+    """测试LLMCaller批量验证只请求未缓存的提案"""
+    caller = make_caller(scripted('["Y", "N"]'), cache={"calls": ["validate"]})
+    caller.validate(PROPOSALS[0])
+    assert caller.llm.validate_calls == 1
+
+    assert caller.validate_batch(PROPOSALS) == ["Y", "Y", "N"]
+    assert len(caller.llm.batches) == 1
+    # 批量结果写回缓存
+    assert caller.validate(PROPOSALS[2]) == "N"
+    assert caller.llm.validate_calls == 1
+    assert asyncio.run(caller.avalidate_batch(PROPOSALS)) == ["Y", "Y", "N"]
+    assert len(caller.llm.batches) == 1
+    print("[OK] 批量验证缓存测试通过")
+
+
+def test_agent_validate_batch():
+    """测试Agent批量投票（Mock后端）"""
+    llm = LLMCaller(backend="mock", accuracy=1.0)
+    agent = Agent("agent_0", llm_caller=llm)
+    proposals = [
+        {"task_id": "t1", "task_content": "2 + 2 = ?", "answer": "4", "reasoning": ["a", "b"],
+         "leader_id": "agent_1", "timestamp": 1.0},
+        {"task_id": "t2", "task_content": "3 * 3 = ?", "answer": "8", "reasoning": ["a", "b"],
+         "leader_id": "agent_1", "timestamp": 1.0},
+    ]
+    votes = agent.validate_batch(proposals)
+    assert [v["decision"] for v in votes] == [agent.validate(p)["decision"] for p in proposals]
+    assert all(v["voter_id"] == "agent_0" for v in votes)
+    assert votes[0]["proposal_hash"] == agent._hash_proposal(proposals[0])
+    print("[OK] Agent批量投票测试通过")
+
+
+def main():
+    test_parse_batch_decisions()
+    test_single_request()
+    test_fallback_on_bad_reply()
+    test_caller_batch_uses_cache()
+    test_agent_validate_batch()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+测试LLM后端熔断、后台健康探测与熔断后弃权
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from agents import Agent
+from conftest import FakeLLM, make_caller
+from llm_modules.breaker import ABSTAIN, CLOSED, HALF_OPEN, OPEN, CircuitBreaker, HealthMonitor
+
+
+def make_breaker_caller(llm, fallbacks=(), **breaker):
+    spec = {"failure_threshold": 2, "reset_timeout": 0.1, **breaker}
+    return make_caller(llm, fallbacks, circuit_breaker=spec)
+
+
+def test_breaker_states():
+    """连续失败熔断，冷却后半开只放行一个试探请求"""
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.1)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED  # 中间的成功清零计数
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow() and not breaker.available()
+
+    time.sleep(0.12)
+    assert breaker.available()
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # 试探请求进行中
+    breaker.record_failure()
+    assert breaker.state == OPEN  # 试探失败重新熔断
+
+    time.sleep(0.12)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    stats = breaker.get_stats()
+    assert stats["opened"] == 2 and stats["recovered"] == 1 and stats["rejected"] == 2
+    assert CircuitBreaker.from_config({"enabled": False}) is None
+    print("[OK] 熔断状态机测试通过")
+
+
+def test_latency_slo():
+    """成功但连续超出延迟SLO也会熔断"""
+    breaker = CircuitBreaker(failure_threshold=2, latency_slo_ms=100)
+    breaker.record_success(50)
+    breaker.record_success(500)
+    assert breaker.state == CLOSED
+    breaker.record_success(800)
+    assert breaker.state == OPEN and breaker.get_stats()["slo_breaches"] == 2
+    print("[OK] 延迟SLO测试通过")
+
+
+def test_caller_short_circuits():
+    """熔断后不再调用后端，验证直接得到ABSTAIN，生成得到失败结果"""
+    llm = FakeLLM(name="flaky")
+    caller = make_breaker_caller(llm)
+    llm.down = True
+    assert caller.validate({"task_id": "t"}) == "N"
+    assert caller.validate({"task_id": "t"}) == "N"
+    assert llm.breaker.state == OPEN and not caller.available()
+
+    calls = llm.calls
+    start = time.monotonic()
+    assert caller.validate({"task_id": "t"}) == ABSTAIN
+    assert caller.generate("2 + 2 = ?")[1] == "Error"
+    assert llm.calls == calls and time.monotonic() - start < 0.05
+
+    assert caller.get_breaker_stats()["flaky"]["state"] == OPEN
+    print("[OK] 熔断短路测试通过")
+
+
+def test_fallback_keeps_available():
+    """主后端熔断时转移到备用后端，Agent仍可投票"""
+    primary, backup = FakeLLM(name="primary"), FakeLLM(name="backup")
+    caller = make_breaker_caller(primary, [backup])
+    primary.down = True
+    for _ in range(3):
+        assert caller.validate({"task_id": "t"}) == "Y"
+    assert primary.breaker.state == OPEN and caller.available()
+    assert primary.calls == 2  # 熔断后不再调用主后端
+    print("[OK] 熔断与故障转移测试通过")
+
+
+def test_health_monitor_recovers():
+    """后台探测在后端恢复后关闭熔断"""
+    llm = FakeLLM(name="flaky")
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    monitor = HealthMonitor([(breaker, llm)], interval=0.02)
+
+    llm.healthy = False
+    breaker.record_failure()
+    assert monitor.check_once() == 0  # 冷却期内不探测
+    time.sleep(0.06)
+    assert monitor.check_once() == 1 and breaker.state == OPEN
+
+    llm.healthy = True
+    monitor.start()
+    deadline = time.monotonic() + 2
+    while breaker.state != CLOSED and time.monotonic() < deadline:
+        time.sleep(0.02)
+    monitor.stop()
+    assert breaker.state == CLOSED and breaker.get_stats()["probes"] >= 2
+    print("[OK] 后台健康探测测试通过")
+
+
+def test_agent_abstains():
+    """后端全部熔断的Agent立即弃权"""
+    llm = FakeLLM(name="flaky")
+    caller = make_breaker_caller(llm)
+    agent = Agent("agent_2", llm_caller=caller)
+    proposal = {"task_id": "t", "leader_id": "agent_1", "timestamp": 0, "answer": "4", "reasoning": ["a", "b"]}
+    assert agent.validate(proposal)["decision"] == "Y"
+
+    llm.down = True
+    agent.validate(proposal)
+    agent.validate(proposal)
+    calls = llm.calls
+    assert agent.validate(proposal)["decision"] == ABSTAIN
+    assert [vote["decision"] for vote in agent.validate_batch([proposal, proposal])] == [ABSTAIN, ABSTAIN]
+    assert llm.calls == calls
+    print("[OK] 熔断弃权测试通过")
+
+
+def main():
+    test_breaker_states()
+    test_latency_slo()
+    test_caller_short_circuits()
+    test_fallback_keeps_available()
+    test_health_monitor_recovers()
+    test_agent_abstains()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
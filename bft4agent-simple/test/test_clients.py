@@ -0,0 +1,185 @@
+"""
+测试共享HTTP客户端注册表
+"""
+import sys
+import os
+import asyncio
+import logging
+import threading
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from llm_modules import clients
+
+
+def test_configure_pool():
+    """测试连接池参数配置"""
+    original = dict(clients.POOL_SETTINGS)
+    try:
+        clients.configure_pool(max_connections=10, keepalive_expiry=None)
+        assert clients.POOL_SETTINGS["max_connections"] == 10
+        assert clients.POOL_SETTINGS["keepalive_expiry"] == original["keepalive_expiry"]
+
+        try:
+            clients.configure_pool(pool_size=5)
+            assert False, "未知参数应报错"
+        except ValueError:
+            pass
+    finally:
+        clients.POOL_SETTINGS.clear()
+        clients.POOL_SETTINGS.update(original)
+    print("[OK] 连接池配置测试通过")
+
+
+def test_warm_up():
+    """测试预热：成功返回True，失败不抛异常"""
+    class Models:
+        def __init__(self, fail):
+            self.fail = fail
+            self.calls = 0
+
+        def list(self):
+            self.calls += 1
+            if self.fail:
+                raise RuntimeError("404")
+            return []
+
+    class Client:
+        def __init__(self, fail=False):
+            self.models = Models(fail)
+
+    class Records(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.messages = []
+
+        def emit(self, record):
+            self.messages.append(record.getMessage())
+
+    ok = Client()
+    assert clients.warm_up(ok) is True
+    assert ok.models.calls == 1
+
+    handler = Records()
+    clients.logger.addHandler(handler)
+    try:
+        assert clients.warm_up(Client(fail=True)) is False
+    finally:
+        clients.logger.removeHandler(handler)
+    assert len(handler.messages) == 1 and "404" in handler.messages[0]
+    print("[OK] 连接预热测试通过")
+
+
+class AsyncClient:
+    """记录在哪个事件循环上被关闭的异步客户端"""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.closed_on = None
+
+    async def aclose(self):
+        self.closed_on = asyncio.get_running_loop()
+
+
+def register_async(loop, client):
+    with clients._lock:
+        clients._async_clients.setdefault(loop, {})[("custom", None, id(client))] = client
+
+
+def test_close_async_clients():
+    """close_all在异步客户端所属的事件循环上关闭它们"""
+    # 事件循环在其他线程中运行
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    running = AsyncClient()
+    register_async(loop, running)
+
+    # 事件循环未运行
+    idle_loop = asyncio.new_event_loop()
+    idle = AsyncClient()
+    register_async(idle_loop, idle)
+
+    clients.close_all()
+    assert running.closed_on is loop and idle.closed_on is idle_loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+    idle_loop.close()
+
+    # 在该事件循环自身的协程中调用
+    async def close_from_loop():
+        client = AsyncClient()
+        register_async(asyncio.get_running_loop(), client)
+        clients.close_all()
+        await asyncio.sleep(0)
+        return client.closed_on is asyncio.get_running_loop()
+
+    assert asyncio.run(close_from_loop())
+    assert len(clients._async_clients) == 0
+    print("[OK] 异步客户端关闭测试通过")
+
+
+def test_sdk_retries_disabled():
+    """SDK客户端不自行重试，重试只由RetryPolicy负责"""
+    created = []
+
+    class FakeClient:
+        def __init__(self, **kwargs):
+            created.append(kwargs)
+
+    fake_httpx = types.SimpleNamespace(Limits=dict, Client=dict, AsyncClient=dict)
+    fake_openai = types.SimpleNamespace(OpenAI=FakeClient, AsyncOpenAI=AsyncClient)
+    saved = {name: sys.modules.get(name) for name in ("httpx", "openai")}
+    sys.modules.update(httpx=fake_httpx, openai=fake_openai)
+    try:
+        clients.close_all()
+        clients.get_openai_client("sk-test", "http://127.0.0.1:1/v1", backend="custom")
+
+        async def get_async():
+            return clients.get_async_openai_client("sk-test", "http://127.0.0.1:1/v1", backend="custom")
+
+        created.append(asyncio.run(get_async()).kwargs)
+    finally:
+        clients.close_all()
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+    assert [kwargs["max_retries"] for kwargs in created] == [0, 0]
+    print("[OK] SDK重试关闭测试通过")
+
+
+def test_shared_openai_client():
+    """测试相同端点与密钥共享同一客户端（需要openai）"""
+    try:
+        import openai  # noqa: F401
+    except ImportError:
+        print("[SKIP] 未安装openai")
+        return
+
+    clients.close_all()
+    a = clients.get_openai_client("sk-test", "http://127.0.0.1:1/v1", backend="custom")
+    b = clients.get_openai_client("sk-test", "http://127.0.0.1:1/v1", backend="custom")
+    c = clients.get_openai_client("sk-other", "http://127.0.0.1:1/v1", backend="custom")
+    assert a is b
+    assert a is not c
+    assert clients.registered_clients() == 2
+    clients.close_all()
+    assert clients.registered_clients() == 0
+    print("[OK] 共享客户端测试通过")
+
+
+def main():
+    test_configure_pool()
+    test_warm_up()
+    test_close_async_clients()
+    test_sdk_retries_disabled()
+    test_shared_openai_client()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+测试确定性故障注入
+
+验证同一种子下故障序列可复现，以及分区、宕机重启、突发丢包、延迟尖峰
+"""
+
+import threading
+
+from agents import Agent
+from clock import VirtualClock
+from faults import FaultSchedule
+from network import Network
+
+
+def _build_network(schedule, num_nodes=4, seed=7):
+    net = Network(delay_range=(10, 20), packet_loss=0.05, seed=seed, fault_schedule=schedule)
+    for i in range(num_nodes):
+        net.register(Agent(f"agent_{i+1}"))
+    return net
+
+
+def _run_traffic(net, rounds=30):
+    outcomes = []
+    for r in range(rounds):
+        results = net.broadcast({"type": "TEST", "round": r}, sender_id="agent_1")
+        outcomes.append(tuple(sorted(results.items())))
+    return outcomes
+
+
+def test_same_seed_same_faults():
+    """同一种子+同一调度 => 完全相同的投递结果"""
+    def make_schedule():
+        return (
+            FaultSchedule(seed=42, clock=VirtualClock())
+            .bursty_loss(p_good_to_bad=0.2, p_bad_to_good=0.3, loss_bad=0.9)
+            .link_loss("agent_1", "agent_3", loss=0.5)
+        )
+
+    first = _run_traffic(_build_network(make_schedule()))
+    second = _run_traffic(_build_network(make_schedule()))
+
+    assert first == second
+    print("[OK] 相同种子得到相同故障序列")
+
+
+def test_same_seed_independent_of_thread_interleaving():
+    """多个发送线程并发时，每条链路的丢包结果只由种子和链路上的消息序号决定"""
+    senders = ["agent_1", "agent_2", "agent_3"]
+
+    def run(concurrent):
+        schedule = FaultSchedule(seed=11, clock=VirtualClock()).bursty_loss(p_good_to_bad=0.2, p_bad_to_good=0.3)
+        net = _build_network(schedule)
+        net.packet_loss = 0.3
+        outcomes = {sender: [] for sender in senders}
+
+        def send_all(sender):
+            for r in range(40):
+                outcomes[sender].append(tuple(sorted(net.broadcast({"type": "TEST", "round": r}, sender).items())))
+
+        if concurrent:
+            threads = [threading.Thread(target=send_all, args=(sender,)) for sender in senders]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        else:
+            for sender in reversed(senders):
+                send_all(sender)
+        return outcomes
+
+    serial = run(concurrent=False)
+    assert run(concurrent=True) == serial
+    assert any(not ok for rounds in serial.values() for result in rounds for _, ok in result)
+    print("[OK] 并发发送不影响按链路派生的随机序列")
+
+
+def test_fault_window_independent_of_thread_interleaving():
+    """并发发送时虚拟时间取各消息投递时刻的最大值，生效的故障窗口不随线程交错变化"""
+    senders = ["agent_1", "agent_2", "agent_3", "agent_4"]
+
+    def run(concurrent):
+        clock = VirtualClock()
+        schedule = FaultSchedule(seed=5, clock=clock).partition([["agent_1"], ["agent_4"]], end=0.08)
+        net = Network(delay_range=(10, 20), packet_loss=0.0, seed=5, fault_schedule=schedule)
+        for sender in senders:
+            net.register(Agent(sender))
+        outcomes = {}
+
+        def send(sender):
+            outcomes[sender] = net.broadcast({"type": "TEST"}, sender)
+
+        if concurrent:
+            threads = [threading.Thread(target=send, args=(sender,)) for sender in senders]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        else:
+            for sender in senders:
+                send(sender)
+        return outcomes, schedule.get_stats()["fault_drops"]["partition"], clock.now()
+
+    serial, drops, elapsed = run(concurrent=False)
+    # 累加10次10~20ms的delay（>=0.1s）会越过分区窗口；按投递时刻取最大值则所有消息都在窗口内发出
+    assert drops == 2 and elapsed <= 0.08
+    for _ in range(3):
+        assert run(concurrent=True)[:2] == (serial, drops)
+    print(f"[OK] 并发发送下故障窗口可复现: 虚拟时间 {elapsed:.3f}s")
+
+
+def test_partition_and_crash_restart():
+    """分区期间跨组消息丢弃；宕机节点在restart_at之后恢复"""
+    clock = VirtualClock()
+    schedule = (
+        FaultSchedule(seed=1, clock=clock)
+        .partition([["agent_1", "agent_2"], ["agent_3", "agent_4"]], start=0.0, end=1.0)
+        .crash("agent_2", at=0.0, restart_at=2.0)
+    )
+    net = Network(delay_range=(0, 0), packet_loss=0.0, fault_schedule=schedule)
+    for i in range(4):
+        net.register(Agent(f"agent_{i+1}"))
+
+    results = net.broadcast({"type": "TEST"}, sender_id="agent_1")
+    assert results == {"agent_2": False, "agent_3": False, "agent_4": False}
+    assert not net.is_up("agent_2")
+
+    clock.advance(1.5)  # 分区结束，agent_2仍宕机
+    results = net.broadcast({"type": "TEST"}, sender_id="agent_1")
+    assert results == {"agent_2": False, "agent_3": True, "agent_4": True}
+
+    clock.advance(1.0)  # agent_2重启
+    assert net.is_up("agent_2")
+    assert net.send({"type": "TEST"}, "agent_1", "agent_2")
+
+    drops = schedule.get_stats()["fault_drops"]
+    assert drops["partition"] == 2 and drops["crash"] == 2
+    print(f"[OK] 分区与宕机重启: {drops}")
+
+
+def test_bursty_loss_is_bursty():
+    """Gilbert-Elliott丢包应成串出现"""
+    schedule = FaultSchedule(seed=3, clock=VirtualClock()).bursty_loss(
+        p_good_to_bad=0.05, p_bad_to_good=0.2, loss_good=0.0, loss_bad=1.0
+    )
+    drops = [schedule.should_drop("a", "b") is not None for _ in range(2000)]
+
+    losses = sum(drops)
+    bursts = sum(1 for i, d in enumerate(drops) if d and (i == 0 or not drops[i - 1]))
+    assert losses > 0
+    # 平均突发长度约为 1 / p_bad_to_good = 5
+    assert losses / bursts > 2
+    print(f"[OK] 突发丢包: {losses}次丢包, 平均突发长度 {losses / bursts:.1f}")
+
+
+def test_delay_spike_advances_virtual_clock():
+    """延迟尖峰计入虚拟时钟，不真实sleep"""
+    clock = VirtualClock()
+    schedule = FaultSchedule(seed=0, clock=clock).delay_spike(extra_ms=1000, nodes=["agent_2"])
+    net = Network(delay_range=(10, 10), packet_loss=0.0, fault_schedule=schedule)
+    for i in range(3):
+        net.register(Agent(f"agent_{i+1}"))
+
+    net.broadcast({"type": "TEST"}, sender_id="agent_1")
+    # 各接收者并行投递：虚拟时间取最晚的投递时刻，而非delay之和
+    assert abs(clock.now() - 1.010) < 1e-6
+    print(f"[OK] 延迟尖峰: 虚拟时间 {clock.now():.3f}s")
+
+
+def test_from_config():
+    """从配置字典构建调度"""
+    schedule = FaultSchedule.from_config({
+        "seed": 5,
+        "clock": "virtual",
+        "events": [
+            {"type": "crash", "node": "agent_1", "at": 0, "restart_at": 10},
+            {"type": "link_loss", "src": "agent_2", "dst": "agent_3", "loss": 1.0},
+        ],
+    })
+    assert schedule.is_crashed("agent_1")
+    assert schedule.should_drop("agent_3", "agent_2") == "link_loss"
+    print(f"[OK] 配置构建: {schedule}")
+
+
+def main():
+    """运行所有测试"""
+    test_same_seed_same_faults()
+    test_same_seed_independent_of_thread_interleaving()
+    test_fault_window_independent_of_thread_interleaving()
+    test_partition_and_crash_restart()
+    test_bursty_loss_is_bursty()
+    test_delay_spike_advances_virtual_clock()
+    test_from_config()
+    print("\n[OK] 所有故障注入测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+测试对冲请求与故障转移
+"""
+import sys
+import os
+import asyncio
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from conftest import FakeLLM, make_caller
+from llm_modules.context import deadline_scope
+from llm_modules.hedging import HedgePolicy
+from metrics import LatencyHistogram
+
+
+def scripted(name, delays=None, fail=False):
+    """按脚本给出延迟、以后端名作答的假后端"""
+    llm = FakeLLM(answers=name, delay=list(delays or []), name=name)
+    llm.down = fail
+    return llm
+
+
+def test_hedge_delay_from_histogram():
+    """测试按后端延迟分位确定对冲时机"""
+    policy = HedgePolicy(quantile=95, min_samples=10, min_delay=0.05)
+    histogram = LatencyHistogram()
+    assert policy.delay(histogram) is None  # 样本不足
+    histogram.record_many([100.0] * 19 + [400.0])
+    assert 0.09 <= policy.delay(histogram) <= 0.11
+    histogram.reset()
+    histogram.record_many([1.0] * 20)
+    assert policy.delay(histogram) == 0.05
+    print("[OK] 对冲时机测试通过")
+
+
+def test_hedge_budget():
+    """测试对冲预算"""
+    policy = HedgePolicy(budget=0.25)
+    for _ in range(4):
+        policy.record_call()
+    assert policy.try_acquire()
+    assert not policy.try_acquire()
+    assert policy.get_stats()["budget_exhausted"] == 1
+    print("[OK] 对冲预算测试通过")
+
+
+def test_failover_order():
+    """测试主后端失败时按顺序转移"""
+    primary = scripted("primary", fail=True)
+    second = scripted("second", fail=True)
+    third = scripted("third")
+    caller = make_caller(primary, [second, third])
+    assert caller.generate("q")[1] == "third"
+    assert (primary.calls, second.calls, third.calls) == (1, 1, 1)
+
+    # 全部失败时返回与原后端一致的失败结果
+    third.down = True
+    assert caller.validate({"task_id": "t"}) == "N"
+    assert caller.generate("q")[1] == "Error"
+    print("[OK] 故障转移测试通过")
+
+
+def test_hedge_cuts_tail():
+    """测试主请求超过p95时对冲到备用后端并取先完成者"""
+    primary = scripted("primary", delays=[0.5])
+    alternate = scripted("alternate", delays=[0.01])
+    caller = make_caller(primary, [alternate], hedge={"min_samples": 20, "budget": 1.0})
+    primary.latency.record_many([20.0] * 20)
+
+    start = time.monotonic()
+    assert caller.generate("q")[1] == "alternate"
+    elapsed = time.monotonic() - start
+    assert elapsed < 0.3, elapsed
+    stats = caller.get_hedge_stats()
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    print(f"[OK] 对冲测试通过（耗时 {elapsed:.3f}s）")
+
+
+def test_hedge_skipped_when_fast_or_no_budget():
+    """测试快速返回或预算耗尽时不对冲"""
+    primary = scripted("primary", delays=[0.0, 0.3])
+    alternate = scripted("alternate")
+    caller = make_caller(primary, [alternate], hedge={"min_samples": 20, "budget": 0.0})
+    primary.latency.record_many([20.0] * 20)
+    caller.validate({"task_id": "a"})
+    caller.validate({"task_id": "b"})
+    assert alternate.calls == 0
+    assert caller.get_hedge_stats()["budget_exhausted"] == 1
+    print("[OK] 不对冲测试通过")
+
+
+def test_hedge_propagates_deadline():
+    """测试对冲工作线程沿用调用方的截止时间"""
+    primary = scripted("primary")
+    caller = make_caller(primary, hedge={"initial_delay": 1.0})
+    with deadline_scope(5.0):
+        caller.validate({"task_id": "t"})
+    assert primary.deadlines[0] is not None and primary.deadlines[0] <= 5.0
+    caller.close()
+    print("[OK] 截止时间传递测试通过")
+
+
+def test_async_hedge():
+    """测试异步对冲并取消落败请求"""
+    primary = scripted("primary", delays=[0.5])
+    alternate = scripted("alternate", delays=[0.01])
+    caller = make_caller(primary, [alternate], hedge={"initial_delay": 0.05, "min_samples": 1000, "budget": 1.0})
+
+    start = time.monotonic()
+    assert asyncio.run(caller.avalidate({"task_id": "t"})) == "Y"
+    assert time.monotonic() - start < 0.3
+    assert alternate.calls == 1
+    print("[OK] 异步对冲测试通过")
+
+
+def main():
+    test_hedge_delay_from_histogram()
+    test_hedge_budget()
+    test_failover_order()
+    test_hedge_cuts_tail()
+    test_hedge_skipped_when_fast_or_no_budget()
+    test_hedge_propagates_deadline()
+    test_async_hedge()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
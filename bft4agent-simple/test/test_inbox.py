@@ -0,0 +1,123 @@
+"""
+测试Agent收件箱
+
+验证有界容量、溢出策略、按类型分发和network背压
+"""
+
+import threading
+import time
+
+from agents import Agent
+from inbox import Inbox
+from network import Network
+
+
+def test_drop_oldest_is_bounded():
+    """drop_oldest策略：容量固定，最旧消息被覆盖"""
+    inbox = Inbox(capacity=3, policy="drop_oldest")
+    for i in range(10):
+        assert inbox.put({"type": "TEST", "seq": i})
+
+    assert len(inbox) == 3
+    assert [m["seq"] for m in inbox.drain()] == [7, 8, 9]
+    assert inbox.get_stats()["dropped_oldest"] == 7
+    print("[OK] drop_oldest: 收件箱有界，溢出计数正确")
+
+
+def test_drop_newest_rejects():
+    """drop_newest策略：满时拒收新消息"""
+    inbox = Inbox(capacity=2, policy="drop_newest")
+    results = [inbox.put({"type": "TEST", "seq": i}) for i in range(4)]
+
+    assert results == [True, True, False, False]
+    assert [m["seq"] for m in inbox.drain()] == [0, 1]
+    assert inbox.get_stats()["overflow"] == 2
+    print("[OK] drop_newest: 满时拒收")
+
+
+def test_typed_dispatch():
+    """注册了handler的消息类型直接分发，不入队"""
+    inbox = Inbox(capacity=4)
+    handled = []
+    inbox.register_handler("PREPARE", handled.append)
+
+    inbox.put({"type": "PREPARE", "seq": 1})
+    inbox.put({"type": "COMMIT", "seq": 2})
+
+    assert [m["seq"] for m in handled] == [1]
+    assert [m["seq"] for m in inbox.drain("COMMIT")] == [2]
+    assert inbox.get_stats()["dispatched"] == 1
+    print("[OK] 按消息类型分发")
+
+
+def test_block_policy_waits_for_consumer():
+    """block策略：满时等待消费者腾出空间"""
+    inbox = Inbox(capacity=1, policy="block", block_timeout=1.0)
+    inbox.register_consumer("TEST")
+    inbox.put({"type": "TEST", "seq": 0})
+
+    consumer = threading.Timer(0.1, inbox.get)
+    consumer.start()
+    start = time.time()
+    assert inbox.put({"type": "TEST", "seq": 1})
+    assert time.time() - start >= 0.05
+    consumer.join()
+
+    # 无消费者时超时后丢弃
+    full = Inbox(capacity=1, policy="block", block_timeout=0.05)
+    full.register_consumer("A")
+    full.put({"type": "A"})
+    assert not full.put({"type": "A"})
+    print("[OK] block: 等待空位，超时后丢弃")
+
+
+def test_block_policy_drops_unconsumed():
+    """block策略：没有handler也没有消费者的类型直接丢弃计数，不占用容量、不阻塞"""
+    inbox = Inbox(capacity=1, policy="block", block_timeout=1.0)
+    inbox.register_consumer("TEST")
+    start = time.time()
+    assert [inbox.put({"type": "VIEW-CHANGE"}) for _ in range(5)] == [False] * 5
+    assert time.time() - start < 0.5
+    assert inbox.put({"type": "TEST"}) and len(inbox) == 1
+    stats = inbox.get_stats()
+    assert stats["dropped_unconsumed"] == 5 and stats["blocked_waits"] == 0
+
+    # handler失败的消息同样受此约束
+    inbox.register_handler("PREPARE", lambda message: 1 / 0)
+    assert not inbox.put({"type": "PREPARE"})
+    assert inbox.get_stats()["handler_errors"] == 1
+    print("[OK] block: 无人消费的类型直接丢弃")
+
+
+def test_network_backpressure():
+    """network对拥塞的block收件箱施加背压并统计溢出"""
+    net = Network(delay_range=(0, 0), packet_loss=0.0, backpressure_timeout=0.02)
+    sender = Agent("agent_1")
+    receiver = Agent("agent_2", inbox_capacity=2, inbox_policy="block")
+    receiver.inbox.block_timeout = 0.02
+    receiver.inbox.register_consumer("TEST")
+    net.register(sender)
+    net.register(receiver)
+
+    results = [net.send({"type": "TEST"}, "agent_1", "agent_2") for _ in range(4)]
+
+    assert results == [True, True, False, False]
+    stats = net.get_stats()
+    assert stats["inbox_overflow"] == 2
+    assert stats["backpressure_waits"] >= 2
+    print(f"[OK] network背压: {stats['backpressure_waits']}次等待, {stats['inbox_overflow']}条溢出")
+
+
+def main():
+    """运行所有测试"""
+    test_drop_oldest_is_bounded()
+    test_drop_newest_rejects()
+    test_typed_dispatch()
+    test_block_policy_waits_for_consumer()
+    test_block_policy_drops_unconsumed()
+    test_network_backpressure()
+    print("\n[OK] 所有收件箱测试通过")
+
+
+if __name__ == "__main__":
+    main()
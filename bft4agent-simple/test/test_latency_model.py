@@ -0,0 +1,155 @@
+"""
+测试MockLLM延迟模型（重尾分布、Agent速度系数、卡顿/超时、由遥测记录拟合、虚拟时钟）
+"""
+import sys
+import os
+import json
+import asyncio
+import math
+import random
+import statistics
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from clock import VirtualClock
+from llm_modules.context import call_scope
+from llm_modules.latency import LatencyModel, LLMTimeout, make_latency_sampler, parse_distribution
+from llm_modules.mock import MockLLM
+
+
+def test_distributions():
+    """各分布的解析与采样"""
+    assert parse_distribution("pareto:100:1.2") == {"dist": "pareto", "scale_ms": 100.0, "alpha": 1.2}
+    assert parse_distribution(0) is None
+    rng = random.Random(0)
+    assert make_latency_sampler(250, rng)() == 0.25
+    samples = [make_latency_sampler("pareto:100:1.5", rng)() for _ in range(2000)]
+    assert min(samples) >= 0.1 and max(samples) > 1.0  # 重尾：少数样本远超最小值
+    samples = [make_latency_sampler("lognormal:200:0.5", rng)() for _ in range(2000)]
+    assert abs(statistics.median(samples) - 0.2) < 0.02
+    assert make_latency_sampler({"dist": "empirical", "samples_ms": [7]}, rng)() == 0.007
+    try:
+        parse_distribution("gamma:1:2")
+        assert False
+    except ValueError:
+        pass
+    print("[OK] 延迟分布测试通过")
+
+
+def test_agent_factors():
+    """Agent系数由种子与ID决定，显式系数优先"""
+    model = LatencyModel(generate="fixed:100", agent_spread=0.5, agent_factors={"agent_9": 3.0}, seed=1)
+    other = LatencyModel(generate="fixed:100", agent_spread=0.5, seed=1)
+    assert model.agent_factor("agent_1") == other.agent_factor("agent_1") != 1.0
+    assert math.isclose(model.sample("generate", "agent_9")[0], 0.3)
+    # 未显式传入agent时取调用上下文中的标签
+    with call_scope(agent="agent_9"):
+        assert math.isclose(model.sample("generate")[0], 0.3)
+    assert LatencyModel(generate="fixed:100").agent_factor("agent_1") == 1.0
+    print("[OK] Agent速度系数测试通过")
+
+
+def test_stalls_and_timeouts():
+    """卡顿叠加额外延迟，超时在等待后抛出LLMTimeout"""
+    clock = VirtualClock()
+    model = LatencyModel(validate="fixed:100", stall_prob=1.0, stall="fixed:5000", clock=clock)
+    assert math.isclose(model.sample("validate")[0], 5.1)
+
+    model = LatencyModel(timeout_prob=1.0, timeout_seconds=30, clock=clock)
+    try:
+        model.delay("generate")
+        assert False
+    except LLMTimeout:
+        pass
+    assert clock.now() == 30 and model.get_stats()["timeouts"] == 1
+
+    llm = MockLLM(latency=model)
+    assert llm.generate("2 + 3 = ?")[1] == "Error"
+    assert llm.validate_batch([{}, {}]) == ["N", "N"]
+    llm.raise_errors = True
+    try:
+        llm.validate({"answer": "5"})
+        assert False
+    except LLMTimeout:
+        pass
+    print("[OK] 卡顿与超时测试通过")
+
+
+def test_virtual_clock():
+    """虚拟时钟下不真正阻塞，只推进时间"""
+    clock = VirtualClock()
+    llm = MockLLM(accuracy=1.0, latency={"generate": "fixed:2000", "validate": "fixed:500"})
+    llm.latency_model.clock = clock
+    start = time.monotonic()
+    assert llm.generate("2 + 3 = ?")[1] == "5"
+    asyncio.run(llm._avalidate({"answer": "5", "reasoning": ["a", "b"], "task_content": "2 + 3 = ?"}))
+    assert time.monotonic() - start < 0.5
+    assert math.isclose(clock.now(), 2.5)
+    assert isinstance(LatencyModel.from_config({"clock": "virtual"}).clock, VirtualClock)
+    print("[OK] 虚拟时钟测试通过")
+
+
+def test_virtual_clock_attached_to_pool():
+    """后端池中的MockLLM（含故障转移后端）与网络共用同一虚拟时钟"""
+    from llm_pool import BackendPool
+    from main import attach_virtual_clock
+
+    pool = BackendPool({
+        "fast": {"backend": "mock", "latency": {"generate": "fixed:100"}, "fallbacks": [{"backend": "mock"}]},
+        "slow": {"backend": "mock", "accuracy": 1.0, "latency": {"generate": "fixed:2000"}},
+    })
+    clock = VirtualClock()
+    attach_virtual_clock(pool.callers.values(), clock)
+    backends = [backend for caller in pool.callers.values() for backend in caller.backends]
+    assert len(backends) == 3 and all(backend.latency_model.clock is clock for backend in backends)
+
+    start = time.monotonic()
+    assert pool.callers["slow"].generate("2 + 3 = ?")[1] == "5"
+    assert time.monotonic() - start < 0.5
+    assert math.isclose(clock.now(), 2.0)
+    print("[OK] 后端池虚拟时钟测试通过")
+
+
+def test_fit_from_trace():
+    """由遥测JSONL拟合对数正态主体、卡顿、超时与Agent系数"""
+    rng = random.Random(3)
+    records = []
+    for i in range(2000):
+        agent = f"agent_{i % 2}"
+        factor = 2.0 if agent == "agent_1" else 1.0
+        records.append({"call_type": "validate", "agent": agent,
+                        "latency_ms": rng.lognormvariate(math.log(100), 0.4) * factor})
+    records += [{"call_type": "validate", "agent": "agent_0", "latency_ms": 20000.0}] * 20
+    records += [{"call_type": "validate", "agent": "agent_0", "latency_ms": 0, "error": "APITimeoutError"}] * 10
+    records += [{"call_type": "validate", "latency_ms": 1, "cache_hit": True}] * 50
+
+    path = os.path.join(tempfile.mkdtemp(), "trace.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+    model = LatencyModel.from_config({"trace": path, "seed": 0, "clock": "virtual"})
+    validate = model.distributions["validate"]
+    assert validate["dist"] == "lognormal" and 120 < validate["median_ms"] < 160
+    assert 0.005 < model.stall_prob < 0.015 and 0.003 < model.timeout_prob < 0.007
+    assert 1.8 < model.agent_factor("agent_1") / model.agent_factor("agent_0") < 2.2
+    assert model.distributions["generate"] == parse_distribution(LatencyModel.DEFAULTS["generate"])
+    # 配置中的字段覆盖拟合结果
+    assert LatencyModel.from_config({"trace": path, "timeout_prob": 0}).timeout_prob == 0
+    print("[OK] 遥测拟合测试通过")
+
+
+def main():
+    test_distributions()
+    test_agent_factors()
+    test_stalls_and_timeouts()
+    test_virtual_clock()
+    test_virtual_clock_attached_to_pool()
+    test_fit_from_trace()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
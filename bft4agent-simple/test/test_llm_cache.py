@@ -0,0 +1,160 @@
+"""
+测试LLM响应缓存
+"""
+import sys
+import os
+import asyncio
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from llm_modules.cache import ResponseCache, make_cache_key
+from conftest import FakeLLM, make_caller
+from llm_new import LLMCaller
+
+
+def make_cache_caller(cache_spec):
+    return make_caller(FakeLLM(), single_flight=True, cache=cache_spec)
+
+
+def test_cache_key():
+    """测试缓存键区分后端/模型/温度/输入，且与dict键顺序无关"""
+    base = make_cache_key("openai", "gpt", "validate", 0.0, {"a": 1, "b": 2})
+    assert base == make_cache_key("openai", "gpt", "validate", 0.0, {"b": 2, "a": 1})
+    assert base != make_cache_key("openai", "gpt", "validate", 0.3, {"a": 1, "b": 2})
+    assert base != make_cache_key("openai", "gpt-4", "validate", 0.0, {"a": 1, "b": 2})
+    assert base != make_cache_key("zhipu", "gpt", "validate", 0.0, {"a": 1, "b": 2})
+    print("[OK] 缓存键测试通过")
+
+
+def test_memory_lru():
+    """测试内存LRU淘汰"""
+    cache = ResponseCache(memory_size=2)
+    cache.put("a", "Y")
+    cache.put("b", "N")
+    assert cache.get("a") == (True, "Y")  # a变为最近使用
+    cache.put("c", "Y")
+    assert cache.get("b") == (False, None)
+    assert cache.get("a")[0] and cache.get("c")[0]
+    assert cache.get_stats()["evictions"] == 1
+    print("[OK] 内存LRU测试通过")
+
+
+def test_ttl():
+    """测试TTL过期"""
+    cache = ResponseCache(ttl=0.05)
+    cache.put("k", "Y")
+    assert cache.get("k")[0]
+    time.sleep(0.1)
+    assert cache.get("k") == (False, None)
+    assert cache.get_stats()["expired"] == 1
+    print("[OK] TTL测试通过")
+
+
+def test_sqlite_persistence():
+    """测试SQLite层持久化、提升到内存层与按条目数淘汰"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite")
+        cache = ResponseCache(path=path, max_disk_entries=2)
+        cache.put("k1", ["步骤"])
+        cache.put("k2", "Y")
+        cache.put("k3", "N")
+        cache.close()
+
+        reopened = ResponseCache(path=path)
+        assert reopened.get("k1") == (False, None)  # 磁盘只保留2条
+        assert reopened.get("k2") == (True, "Y")
+        assert reopened.get("k2") == (True, "Y")
+        stats = reopened.get_stats()
+        assert stats["disk_hits"] == 1
+        assert stats["memory_hits"] == 1
+        assert stats["disk_entries"] == 2
+        reopened.close()
+    print("[OK] SQLite持久化测试通过")
+
+
+def test_caller_opt_in():
+    """测试LLMCaller按调用类型启用缓存"""
+    caller = make_cache_caller({"calls": ["validate"]})
+    proposal = {"task_id": "t1", "answer": "4", "reasoning": ["2+2=4"]}
+    assert caller.validate(proposal) == "Y"
+    assert caller.validate(dict(proposal)) == "Y"
+    assert caller.llm.validate_calls == 1
+
+    # generate未启用缓存，每次都调用后端
+    caller.generate("2+2")
+    caller.generate("2+2")
+    assert caller.llm.generate_calls == 2
+
+    # 修改温度后不再命中
+    caller.llm.validate_temperature = 0.0
+    caller.validate(proposal)
+    assert caller.llm.validate_calls == 2
+    print("[OK] 按调用类型启用测试通过")
+
+
+def test_failures_not_cached():
+    """所有后端均失败时的"N"不缓存，后端恢复后重新请求"""
+    caller = make_cache_caller({"calls": ["validate"]})
+    proposal = {"task_id": "t1", "answer": "4", "reasoning": ["2+2=4"]}
+    caller.llm.down = True
+    assert caller.validate(proposal) == "N"
+    assert asyncio.run(caller.avalidate(proposal)) == "N"
+    assert caller.validate_batch([proposal]) == ["N"]
+    caller.llm.down = False
+    assert caller.validate(proposal) == "Y"
+    assert caller.llm.validate_calls == 5  # 批量请求失败后逐个重试一次
+    assert caller.get_cache_stats()["memory_hits"] == 0
+    assert caller.validate(proposal) == "Y" and caller.llm.validate_calls == 5
+    print("[OK] 失败结果不缓存测试通过")
+
+
+def test_validate_key_ignores_volatile_fields():
+    """视图切换后（leader与时间戳不同）相同的任务、推理与答案命中缓存"""
+    caller = make_cache_caller({"calls": ["validate"]})
+    proposal = {"task_id": "t1。请严格验证", "task_content": "2 + 2 = ?", "answer": "4", "reasoning": ["2+2=4"]}
+    caller.validate({**proposal, "leader_id": "agent_1", "timestamp": 1.0})
+    caller.validate({**proposal, "leader_id": "agent_2", "timestamp": 2.0, "confidence": 0.9})
+    assert caller.llm.validate_calls == 1
+    # 验证者指令（写在task_id中）或答案不同则不命中
+    caller.validate({**proposal, "task_id": "t1。请宽松验证"})
+    caller.validate({**proposal, "answer": "5"})
+    assert caller.llm.validate_calls == 3
+    print("[OK] 请求键忽略易变字段测试通过")
+
+
+def test_caller_generate_and_async():
+    """测试generate缓存返回元组，异步接口共用缓存"""
+    caller = make_cache_caller({"calls": ["generate", "validate"]})
+    first = caller.generate("1+1")
+    assert caller.generate("1+1") == first
+    assert isinstance(caller.generate("1+1"), tuple)
+    assert asyncio.run(caller.agenerate("1+1")) == first
+    assert caller.llm.generate_calls == 1
+    assert caller.get_cache_stats()["memory_hits"] == 3
+    print("[OK] generate与异步缓存测试通过")
+
+
+def test_caller_disabled():
+    """测试默认关闭缓存"""
+    assert LLMCaller(backend="mock").get_cache_stats() is None
+    assert make_cache_caller({"enabled": False}).cache is None
+    print("[OK] 默认关闭测试通过")
+
+
+def main():
+    test_cache_key()
+    test_memory_lru()
+    test_ttl()
+    test_sqlite_persistence()
+    test_caller_opt_in()
+    test_failures_not_cached()
+    test_validate_key_ignores_volatile_fields()
+    test_caller_generate_and_async()
+    test_caller_disabled()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
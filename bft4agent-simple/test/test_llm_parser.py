@@ -0,0 +1,125 @@
+"""
+测试统一的LLM回复解析（推理步骤/最终答案、Y/N结论、批量结论、JSON模式）
+"""
+import sys
+import os
+import json
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from llm_modules.custom import CustomLLM
+from llm_modules.parser import parse_batch_decisions, parse_decision, parse_generation
+from llm_modules.server import MockLLMServer
+from llm_modules.streaming import DecisionStreamParser
+
+
+def test_parse_generation():
+    """规范格式、markdown、全角冒号与答案后的解释文字"""
+    reasoning, answer = parse_generation("推理步骤1: 2 + 3 = 5\n推理步骤2: 5 * 4 = 20\n最终答案: 20\n")
+    assert reasoning == ["推理步骤1: 2 + 3 = 5", "推理步骤2: 5 * 4 = 20"] and answer == "20"
+
+    assert parse_generation("推理步骤1: 略\n**最终答案**: **42**")[1] == "42"
+    assert parse_generation("推理步骤1: 略\n最终答案：42。")[1] == "42"
+    # 答案行之后的解释中提到"答案"不会覆盖最终答案
+    reasoning, answer = parse_generation("推理步骤1: 略\n最终答案: 20\n解释: 答案来自步骤1")
+    assert answer == "20" and reasoning == ["推理步骤1: 略"]
+
+    # 非规范格式走逐行扫描
+    assert parse_generation("步骤1: 想一想\n答案 是 7")[1] == "答案 是 7"
+    assert parse_generation("Reasoning: add\nAnswer: 9") == (["Reasoning: add"], "9")
+    assert parse_generation("直接给出结论 42") == (["直接给出结论 42"], "")
+    # 只认标签形式，正文中出现answer/reasoning不算
+    assert parse_generation("Step 1: add\nThe answer depends on the units\nFinal answer: 9") == (["Step 1: add"], "9")
+    reasoning, answer = parse_generation("Reasoning about the answer is hard\n1. 答案: 3")
+    assert answer == "3" and reasoning == ["Reasoning about the answer is hard\n1. 答案: 3"]
+    assert parse_generation("直接给出结论 42", answer_fallback=True)[1] == "直接给出结论 42"
+    print("[OK] 生成结果解析测试通过")
+
+
+def test_parse_decision():
+    """按独立的词识别Y/N，而不是子串"""
+    cases = {
+        "Y": "Y", " n\n": "N", "Yes.": "Y", "NO": "N", "否": "N", "通过": "Y",
+        "YES, NOT fully rigorous but correct": "Y",
+        "N, the steps are not very convincing": "N",  # 子串判断会因"VERY"中的Y误判为Y
+        "Answer: Y": "Y",  # 子串判断会因"ANSWER"中的N误判为N
+        "结论: N/A": "N",
+        '{"decision": "Y"}': "Y",
+        '```json\n{"decision": "N"}\n```': "N",
+        '{"verdict": true}': "Y",
+        "无法判断": "N",
+    }
+    for content, expected in cases.items():
+        assert parse_decision(content) == expected, (content, parse_decision(content))
+    assert parse_decision("无法判断", default="Y") == "Y"
+    assert parse_decision(None) == "N"
+    print("[OK] Y/N结论解析测试通过")
+
+
+def test_stream_decision_tokens():
+    """流式解析同样按独立的词判断，词尾未到时不下结论"""
+    parser = DecisionStreamParser()
+    for char in "Answer: Y":
+        parser.feed(char)
+    assert not parser.done  # 末尾的Y之后可能还有字母
+    parser.close()
+    assert parser.result() == "Y"
+
+    # 开头的N/No也要等到词边界："Not..."、"Nice..."不是结论
+    for chunks, expected in ((["No", "t sure, but Y", "ES."], "Y"), (["N", "ice. ", "Y "], "Y"), (["No", "."], "N")):
+        parser = DecisionStreamParser()
+        results = [parser.feed(chunk) for chunk in chunks]
+        assert results == [False] * (len(chunks) - 1) + [True], (chunks, results)
+        assert parser.result() == expected
+    print("[OK] 流式结论解析测试通过")
+
+
+def test_parse_batch_decisions():
+    assert parse_batch_decisions('{"decisions": ["Y", "N"]}', 2) == ["Y", "N"]
+    assert parse_batch_decisions('["是", "否", true]', 3) == ["Y", "N", "Y"]
+    assert parse_batch_decisions('["Y", "maybe"]', 2) is None
+    assert parse_batch_decisions("1: Y\n2: N", 2) == ["Y", "N"]
+    print("[OK] 批量结论解析测试通过")
+
+
+def test_json_mode():
+    """json_mode下请求带response_format，回复为JSON对象"""
+    server = MockLLMServer(seed=0)
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        prompt = kwargs["messages"][-1]["content"]
+        content = server.complete(prompt, json_mode="response_format" in kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    llm = CustomLLM.__new__(CustomLLM)
+    llm.model = "fake"
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    llm.json_mode = True
+    llm.streaming = True  # 生成时json_mode优先，不走流式
+
+    reasoning, answer = llm.generate("2 + 3 = ?")
+    assert answer == "5" and len(reasoning) == 3
+    assert "JSON" in calls[-1]["messages"][-1]["content"]
+    assert calls[-1]["response_format"] == {"type": "json_object"} and "stream" not in calls[-1]
+
+    llm.streaming = False
+    assert llm.validate({"task_id": "2 + 3 = ?", "reasoning": reasoning, "answer": answer}) == "Y"
+    assert json.loads(server.complete(calls[-1]["messages"][-1]["content"], json_mode=True)) == {"decision": "Y"}
+    server.stop()
+    print("[OK] JSON模式测试通过")
+
+
+def main():
+    test_parse_generation()
+    test_parse_decision()
+    test_stream_decision_tokens()
+    test_parse_batch_decisions()
+    test_json_mode()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
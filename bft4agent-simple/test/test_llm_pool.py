@@ -0,0 +1,193 @@
+"""
+测试异构LLM后端池：按Agent分配后端与各后端独立的并发队列
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from agents import create_agents
+from conftest import FakeLLM
+from llm_modules.context import deadline_scope
+from llm_pool import BackendLane, BackendPool, QueueFull
+
+
+def make_pool(**kwargs):
+    backends = {
+        "fast": {"backend": "mock", "accuracy": 1.0, "max_concurrency": 4},
+        "slow": {"backend": "mock", "accuracy": 1.0, "max_concurrency": 1, "max_queue": 2},
+    }
+    return BackendPool(backends, **kwargs)
+
+
+def slow_validate(proposal):
+    time.sleep(0.3)
+    return "Y"
+
+
+def test_assignment():
+    """按顺序轮流分配，固定分配优先，同一Agent始终得到同一后端"""
+    pool = BackendPool({
+        "a": {"backend": "mock", "weight": 2},
+        "b": {"backend": "mock", "agents": ["agent_9"]},
+    })
+    assert [pool.backend_of(f"agent_{i}") for i in range(1, 5)] == ["a", "a", "b", "a"]
+    assert pool.backend_of("agent_9") == "b"
+    assert pool.backend_of("agent_1") == "a"
+    assert pool.caller_for("agent_2") is pool.callers["a"]
+
+    agents = create_agents(num_agents=4, malicious_ratio=0.0, llm_pool=make_pool())
+    assert [agent.llm_caller.name for agent in agents] == ["fast", "slow", "fast", "slow"]
+    print("[OK] 后端分配测试通过")
+
+
+def test_lane_queue_limit():
+    """名额占满后排队，队列满时立即拒绝，等待受截止时间约束"""
+    llm = FakeLLM()
+    llm.max_concurrency = 1
+    lane = BackendLane("x", llm, max_queue=1)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with lane.slot():
+            entered.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    entered.wait()
+
+    with deadline_scope(0.1):
+        start = time.monotonic()
+        try:
+            with lane.slot():
+                assert False, "slot should not be acquired"
+        except TimeoutError:
+            assert time.monotonic() - start < 0.5
+
+    def wait_for_slot():
+        with lane.slot():
+            pass
+
+    waiter = threading.Thread(target=wait_for_slot)
+    waiter.start()
+    while lane.get_stats()["waiting"] == 0:
+        time.sleep(0.01)
+    try:
+        with lane.slot():
+            assert False, "queue should be full"
+    except QueueFull:
+        pass
+
+    time.sleep(0.05)
+    release.set()
+    holder.join()
+    waiter.join()
+    stats = lane.get_stats()
+    assert stats["rejected"] == 1 and stats["timeouts"] == 1
+    assert stats["calls"] == 2 and stats["queued"] == 1 and stats["in_flight"] == 0
+    print("[OK] 队列上限测试通过")
+
+
+def test_lane_shares_backend_cap():
+    """队列不另设名额：同步线程与事件循环共用后端自身的并发上限"""
+    pool = make_pool()
+    caller = pool.callers["slow"]
+    assert caller.lane.max_concurrency == 1 and caller.llm.slot_observer is caller.lane
+    lock = threading.Lock()
+    in_flight = {"now": 0, "peak": 0}
+
+    def enter():
+        with lock:
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+
+    def leave():
+        with lock:
+            in_flight["now"] -= 1
+        return "Y"
+
+    def tracked_validate(proposal):
+        enter()
+        time.sleep(0.05)
+        return leave()
+
+    async def tracked_avalidate(proposal):
+        enter()
+        await asyncio.sleep(0.05)
+        return leave()
+
+    caller.llm.validate = tracked_validate
+    caller.llm._avalidate = tracked_avalidate
+    proposal = {"task_id": "t", "answer": "4", "reasoning": ["a", "b"]}
+    results = []
+    sync_thread = threading.Thread(target=lambda: results.append(caller.validate(proposal, independent=True)))
+    sync_thread.start()
+    results.append(asyncio.run(caller.avalidate(proposal, independent=True)))
+    sync_thread.join()
+    assert results == ["Y", "Y"] and in_flight["peak"] == 1
+    assert caller.lane.get_stats()["calls"] == 2
+    print("[OK] 同步与异步共用后端并发上限测试通过")
+
+
+def test_slow_backend_isolated():
+    """慢后端排满时，其他后端的Agent不受影响"""
+    pool = make_pool()
+    pool.callers["slow"].caller.llm.validate = slow_validate
+    proposal = {"task_id": "t", "answer": "4", "reasoning": ["a", "b"]}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(pool.callers["slow"].validate(proposal, independent=True)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+
+    start = time.monotonic()
+    reasoning, answer = pool.callers["fast"].generate("问题: 2 + 2 = ?")
+    assert answer == "4"
+    assert time.monotonic() - start < 0.3 + 0.5  # 只含MockLLM自身延迟，不等慢后端
+
+    for thread in threads:
+        thread.join()
+    # 1个执行 + 2个排队，第4个被拒绝（失败结果为N）
+    assert sorted(results) == ["N", "Y", "Y", "Y"]
+    stats = pool.get_stats()
+    assert stats["slow"]["rejected"] == 1 and stats["slow"]["max_waiting"] == 2
+
+    telemetry = pool.get_telemetry()
+    assert set(telemetry) == {"fast", "slow"}
+    pool.close()
+    print("[OK] 后端隔离测试通过")
+
+
+def test_async_slot():
+    pool = make_pool()
+    caller = pool.callers["slow"]
+
+    async def run():
+        return await asyncio.gather(*[caller.avalidate({"task_id": "t", "answer": "4", "reasoning": ["a", "b"]},
+                                                       independent=True) for _ in range(3)])
+
+    assert asyncio.run(run()) == ["Y", "Y", "Y"]
+    assert caller.lane.get_stats()["calls"] == 3
+    print("[OK] 异步队列测试通过")
+
+
+def main():
+    test_assignment()
+    test_lane_queue_limit()
+    test_lane_shares_backend_cap()
+    test_slow_backend_isolated()
+    test_async_slot()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+测试本地OpenAI兼容LLM模拟服务
+"""
+import sys
+import os
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from llm_modules.base import BaseLLM
+from llm_modules.custom import CustomLLM
+from llm_modules.server import MockLLMServer, make_latency_sampler
+from llm_modules.streaming import AnswerStreamParser
+
+
+def post(server, body, path="/chat/completions"):
+    request = urllib.request.Request(
+        server.url + path,
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    return urllib.request.urlopen(request, timeout=10)
+
+
+def chat(server, prompt, **extra):
+    body = {"model": "mock", "messages": [{"role": "user", "content": prompt}], **extra}
+    with post(server, body) as response:
+        return json.loads(response.read())
+
+
+def prompt_builder():
+    """只用于构造提示与解析回复的后端实例（不创建客户端）"""
+    return CustomLLM.__new__(CustomLLM)
+
+
+def test_generation_and_validation():
+    """生成结果可被后端的解析逻辑读取，验证结论沿用MockLLM规则"""
+    with MockLLMServer(seed=0) as server:
+        llm = prompt_builder()
+        reply = chat(server, llm._generation_prompt("2 + 3 = ?"))
+        content = reply["choices"][0]["message"]["content"]
+        reasoning, answer = llm._parse_generation(content)
+        assert answer == "5" and len(reasoning) == 3
+        assert reply["usage"]["completion_tokens"] == len(content)
+
+        proposal = {"task_id": "2 + 3 = ?", "reasoning": reasoning, "answer": answer}
+        decision = chat(server, llm._validation_prompt(proposal))["choices"][0]["message"]["content"]
+        assert decision == "Y"
+        bad = chat(server, llm._validation_prompt({**proposal, "reasoning": []}))
+        assert bad["choices"][0]["message"]["content"] == "N"
+
+        batch = chat(server, BaseLLM._batch_validation_prompt(llm, [proposal, {**proposal, "answer": "无"}]))
+        assert BaseLLM._parse_batch_decisions(batch["choices"][0]["message"]["content"], 2) == ["Y", "N"]
+    print("[OK] 生成与验证测试通过")
+
+
+def test_streaming():
+    """SSE分片拼接后与非流式内容一致，以[DONE]结束"""
+    with MockLLMServer(seed=0) as server:
+        body = {"model": "mock", "stream": True, "messages": [{"role": "user", "content": "问题: 6 * 7 = ?"}]}
+        pieces, done = [], False
+        with post(server, body) as response:
+            assert response.headers["Content-Type"] == "text/event-stream"
+            for raw in response:
+                line = raw.decode("utf-8").strip()
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    done = True
+                    break
+                pieces.append(json.loads(data)["choices"][0]["delta"].get("content") or "")
+        assert done and len(pieces) > 1
+        stream_parser = AnswerStreamParser()
+        for piece in pieces:
+            stream_parser.feed(piece)
+        assert stream_parser.result()[1] == "42"
+        assert server.get_stats()["streams"] == 1
+    print("[OK] 流式输出测试通过")
+
+
+def test_error_injection():
+    """429带Retry-After，500按比例注入"""
+    with MockLLMServer(rate_limit_rate=1.0, retry_after=2, seed=0) as server:
+        try:
+            chat(server, "问题: 1 + 1 = ?")
+            assert False, "expected 429"
+        except urllib.error.HTTPError as e:
+            assert e.code == 429
+            assert float(e.headers["Retry-After"]) == 2.0
+
+    with MockLLMServer(error_rate=1.0, seed=0) as server:
+        try:
+            chat(server, "问题: 1 + 1 = ?")
+            assert False, "expected 500"
+        except urllib.error.HTTPError as e:
+            assert e.code == 500
+        assert server.get_stats()["by_status"] == {500: 1}
+    print("[OK] 错误注入测试通过")
+
+
+def test_server_side_rate_limit():
+    """超出服务端令牌桶的请求得到429"""
+    with MockLLMServer(requests_per_second=1, seed=0) as server:
+        chat(server, "问题: 1 + 1 = ?")
+        try:
+            chat(server, "问题: 1 + 1 = ?")
+            assert False, "expected 429"
+        except urllib.error.HTTPError as e:
+            assert e.code == 429 and float(e.headers["Retry-After"]) > 0
+    print("[OK] 服务端限速测试通过")
+
+
+def test_latency_and_models():
+    rng = random.Random(0)
+    assert make_latency_sampler(None, rng)() == 0.0
+    assert make_latency_sampler(50, rng)() == 0.05
+    samples = [make_latency_sampler("uniform:10:20", rng)() for _ in range(50)]
+    assert all(0.01 <= s <= 0.02 for s in samples)
+    lognormal = make_latency_sampler({"dist": "lognormal", "median_ms": 100, "sigma": 0.3}, rng)
+    assert all(s > 0 for s in (lognormal() for _ in range(50)))
+
+    with MockLLMServer(latency=100, seed=0) as server:
+        start = time.monotonic()
+        chat(server, "问题: 1 + 1 = ?")
+        assert time.monotonic() - start >= 0.1
+        with urllib.request.urlopen(server.url + "/models", timeout=10) as response:
+            assert json.loads(response.read())["data"][0]["id"] == "mock"
+    print("[OK] 延迟分布与模型列表测试通过")
+
+
+def main():
+    test_generation_and_validation()
+    test_streaming()
+    test_error_injection()
+    test_server_side_rate_limit()
+    test_latency_and_models()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
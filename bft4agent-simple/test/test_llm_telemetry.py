@@ -0,0 +1,149 @@
+"""
+测试LLM调用遥测
+"""
+import sys
+import os
+import json
+import tempfile
+import threading
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from conftest import FakeLLM, make_caller
+from llm_modules.context import call_scope
+from llm_modules.telemetry import CallRecord, LLMTelemetry
+from llm_new import LLMCaller
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class ReportingLLM(FakeLLM):
+    """通过_request发请求并报告usage的后端"""
+
+    def __init__(self, failures=0, fatal=False):
+        super().__init__(answers="42", name="gpt-3.5-turbo")
+        self.failures = failures
+        self.fatal = fatal
+
+    def _api(self):
+        if self.fatal:
+            raise ValueError("bad request")
+        if self.failures:
+            self.failures -= 1
+            raise FakeAPIError(429)
+        return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=2000))
+
+    def generate(self, question):
+        response = self._request(self._api)
+        self._report_usage(response)
+        return ["步骤1"], "42"
+
+    def validate(self, proposal):
+        response = self._request(self._api)
+        self._report_usage(response)
+        return "Y"
+
+
+def make_reporting_caller(llm, **kwargs):
+    return make_caller(
+        llm,
+        backend="openai",
+        pricing={"gpt-3.5-turbo": {"prompt": 0.5, "completion": 1.5}},
+        retry={"max_retries": 3, "base_delay": 0.001},
+        **kwargs,
+    )
+
+
+def test_record_fields():
+    """测试记录中的标签、token、费用与重试次数"""
+    caller = make_reporting_caller(ReportingLLM(failures=2))
+    with call_scope(agent="agent_2", phase="prepare"):
+        assert caller.validate({"task_id": "t"}) == "Y"
+
+    record = caller.telemetry.recent()[-1]
+    assert record.backend == "openai" and record.model == "gpt-3.5-turbo"
+    assert record.call_type == "validate"
+    assert record.agent == "agent_2" and record.phase == "prepare"
+    assert record.prompt_tokens == 1000 and record.completion_tokens == 2000
+    assert abs(record.cost - (0.5 + 3.0)) < 1e-9
+    assert record.retries == 2
+    assert record.error is None and record.latency_ms > 0
+    print("[OK] 调用记录字段测试通过")
+
+
+def test_errors_and_cache_hits():
+    """测试错误分类与缓存命中记录"""
+    caller = make_reporting_caller(ReportingLLM(fatal=True), cache={"calls": ["validate"]})
+    assert caller.generate("q")[1] == "Error"
+    assert caller.telemetry.recent()[-1].error == "ValueError"
+
+    caller.llm.fatal = False
+    caller.validate({"task_id": "t"})
+    caller.validate({"task_id": "t"})
+    assert caller.telemetry.recent()[-1].cache_hit
+
+    summary = caller.get_telemetry()["openai"]
+    assert summary["calls"] == 3
+    assert summary["errors"] == {"ValueError": 1}
+    assert summary["cache_hits"] == 1
+    assert summary["latency_ms"]["count"] == 1  # 只统计成功的后端调用
+    print("[OK] 错误与缓存命中测试通过")
+
+
+def test_labels_follow_threads():
+    """测试并发线程各自的agent/phase标签"""
+    caller = make_reporting_caller(ReportingLLM())
+
+    def run(agent_id):
+        with call_scope(agent=agent_id, phase="prepare"):
+            caller.validate({"task_id": agent_id})
+
+    threads = [threading.Thread(target=run, args=(f"agent_{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    agents = sorted(r.agent for r in caller.telemetry.recent())
+    assert agents == ["agent_0", "agent_1", "agent_2", "agent_3"]
+    assert caller.get_telemetry()["openai"]["latency_ms_by_phase"]["prepare"]["count"] == 4
+    print("[OK] 线程标签测试通过")
+
+
+def test_jsonl_output():
+    """测试JSONL输出"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "calls.jsonl")
+        telemetry = LLMTelemetry(path=path)
+        telemetry.record(CallRecord(backend="mock", model="", call_type="generate", latency_ms=12.5))
+        telemetry.close()
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+    assert rows[0]["backend"] == "mock" and rows[0]["latency_ms"] == 12.5
+    print("[OK] JSONL输出测试通过")
+
+
+def test_mock_backend_usage():
+    """测试Mock后端报告估算的token用量"""
+    caller = LLMCaller(backend="mock", accuracy=1.0)
+    caller.generate("2 + 3 = ?")
+    record = caller.telemetry.recent()[-1]
+    assert record.backend == "mock" and record.prompt_tokens > 0 and record.completion_tokens > 0
+    print("[OK] Mock用量测试通过")
+
+
+def main():
+    test_record_fields()
+    test_errors_and_cache_hits()
+    test_labels_follow_threads()
+    test_jsonl_output()
+    test_mock_backend_usage()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
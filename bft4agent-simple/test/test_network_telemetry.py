@@ -0,0 +1,85 @@
+"""
+测试network遥测
+
+验证按消息类型/链路的计数、字节数、丢包和延迟分位数
+"""
+
+from agents import Agent
+from metrics import LatencyHistogram
+from network import Network, estimate_message_size
+
+
+def test_histogram_percentiles():
+    """直方图分位数相对误差在精度范围内"""
+    hist = LatencyHistogram()
+    hist.record_many(range(1, 1001))
+
+    for q, expected in ((50, 500), (95, 950), (99, 990)):
+        value = hist.percentile(q)
+        assert abs(value - expected) / expected < 0.05, (q, value)
+    assert hist.min == 1 and hist.max == 1000
+    print(f"[OK] 直方图: {hist}")
+
+
+def test_per_type_and_fanout_accounting():
+    """一次broadcast按接收者数计数，并按消息类型拆分"""
+    net = Network(delay_range=(1, 5), packet_loss=0.0, seed=1)
+    for i in range(4):
+        net.register(Agent(f"agent_{i+1}"))
+
+    net.broadcast({"type": "PRE-PREPARE", "data": "x" * 1000}, sender_id="agent_1")
+    for sender in ("agent_2", "agent_3", "agent_4"):
+        net.broadcast({"type": "PREPARE", "data": "digest"}, sender_id=sender)
+
+    snapshot = net.snapshot()
+    by_type = snapshot["by_type"]
+    assert by_type["PRE-PREPARE"]["messages"] == 3
+    assert by_type["PREPARE"]["messages"] == 9  # n*(n-1)中的3个发送方
+    assert by_type["PRE-PREPARE"]["bytes"] > by_type["PREPARE"]["bytes"]
+    assert snapshot["by_link"]["agent_1->agent_2"]["messages"] == 1
+    assert 1 <= by_type["PREPARE"]["latency_ms"]["p99"] <= 5
+
+    stats = net.get_stats()
+    assert stats["broadcast_calls"] == 4
+    assert stats["total_sent"] == 12
+    assert stats["success_rate"] == 1.0
+    print(f"[OK] 按类型统计: PRE-PREPARE={by_type['PRE-PREPARE']['bytes']}B, PREPARE={by_type['PREPARE']['bytes']}B")
+
+
+def test_drops_by_reason():
+    """丢包按原因计入类型和链路"""
+    net = Network(delay_range=(0, 0), packet_loss=1.0, seed=1)
+    net.register(Agent("agent_1"))
+    net.register(Agent("agent_2"))
+
+    net.send({"type": "COMMIT"}, "agent_1", "agent_2")
+    net.send({"type": "COMMIT"}, "agent_1", "agent_3")  # 未注册
+
+    commit = net.snapshot()["by_type"]["COMMIT"]
+    assert commit["drops"] == 2
+    assert commit["drop_reasons"] == {"loss": 2}
+    assert net.get_stats()["success_rate"] == 0.0
+    print(f"[OK] 丢包原因: {commit['drop_reasons']}")
+
+
+def test_message_size_handles_dataclasses():
+    """PBFT消息dataclass可估算大小"""
+    from consensus import PrepareMessage
+
+    msg = PrepareMessage(view=0, sequence_number=1, sender_id="agent_2", timestamp=0.0, decision="Y")
+    size = estimate_message_size({"type": msg.message_type, "data": msg})
+    assert 50 < size < 500
+    print(f"[OK] PREPARE消息大小: {size}B")
+
+
+def main():
+    """运行所有测试"""
+    test_histogram_percentiles()
+    test_per_type_and_fanout_accounting()
+    test_drops_by_reason()
+    test_message_size_handles_dataclasses()
+    print("\n[OK] 所有network遥测测试通过")
+
+
+if __name__ == "__main__":
+    main()
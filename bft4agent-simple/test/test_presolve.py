@@ -0,0 +1,123 @@
+"""
+测试presolve模式（backup与leader并发独立解题，答案一致时免去LLM验证）
+"""
+import sys
+import os
+import time
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import agents as agents_module
+from agents import Agent, create_agents
+from conftest import FakeLLM, make_caller
+from consensus import BFT4Agent
+from llm_modules.context import deadline_scope
+from llm_new import LLMCaller
+from network import Network
+
+
+def make_backup(llm):
+    return Agent("agent_2", llm_caller=make_caller(llm))
+
+
+def make_proposal(answer):
+    return {"task_id": "math_002", "task_content": "23 * 47 = ?", "leader_id": "agent_1",
+            "timestamp": 0, "answer": answer, "reasoning": ["a", "b"]}
+
+
+def test_vote_by_comparison():
+    """答案等价时直接投Y；不一致时回退到完整LLM验证"""
+    llm = FakeLLM(answers="1081", decision="N")
+    agent = make_backup(llm)
+    future = Future()
+    future.set_result(agent.presolve({"content": "23 * 47 = ?"}))
+    agent.expect_presolved("23 * 47 = ?", future)
+    assert agent.has_presolved("23 * 47 = ?") and llm.generate_calls == 1
+
+    assert agent.validate(make_proposal("1081.0"))["decision"] == "Y"
+    assert llm.validate_calls == 0
+    assert agent.validate(make_proposal("1082"))["decision"] == "N"
+    assert llm.validate_calls == 1
+    # 其他任务的提案不与之比对
+    assert agent.validate({**make_proposal("1081"), "task_content": "2 + 2 = ?"})["decision"] == "N"
+    assert agent.presolve_stats == {"matches": 1, "mismatches": 1, "timeouts": 0}
+
+    failed = Future()
+    failed.set_exception(RuntimeError("presolve failed"))
+    agent.expect_presolved("23 * 47 = ?", failed)
+    assert agent.validate(make_proposal("1081"))["decision"] == "N" and llm.validate_calls == 3
+    agent.clear_presolved()
+    assert not agent.has_presolved("23 * 47 = ?")
+    print("[OK] 答案比对投票测试通过")
+
+
+def test_stuck_presolve_does_not_hang():
+    """没有截止时间时按默认上限等待，超时后回退到完整验证"""
+    llm = FakeLLM(answers="1081", decision="N")
+    agent = make_backup(llm)
+    agent.expect_presolved("23 * 47 = ?", Future())  # 永不完成
+    original_wait = agents_module.PRESOLVE_WAIT_SECONDS
+    agents_module.PRESOLVE_WAIT_SECONDS = 0.1
+    try:
+        start = time.monotonic()
+        assert agent.validate(make_proposal("1081"))["decision"] == "N"
+        assert agent.validate_batch([make_proposal("1081")])[0]["decision"] == "N"
+        assert time.monotonic() - start < 1.0
+    finally:
+        agents_module.PRESOLVE_WAIT_SECONDS = original_wait
+    assert agent.presolve_stats["timeouts"] == 2 and llm.validate_calls == 2
+    print("[OK] presolve超时回退测试通过")
+
+
+def test_slow_presolve_leaves_budget_for_validation():
+    """presolve慢于等待上限时只等待剩余时间的一小部分，完整验证仍在截止时间内完成"""
+    llm = FakeLLM(answers="1081", decision="Y", delay=0.2)
+    agent = make_backup(llm)
+    agent.expect_presolved("23 * 47 = ?", Future())  # 慢于等待上限
+    start = time.monotonic()
+    with deadline_scope(1.0):
+        vote = agent.validate(make_proposal("1081"))
+    elapsed = time.monotonic() - start
+    # 等待约0.25秒（剩余时间的PRESOLVE_WAIT_RATIO）+ 验证0.2秒
+    assert vote["decision"] == "Y" and llm.validate_calls == 1
+    assert 0.4 <= elapsed < 0.7, elapsed
+    assert agent.presolve_stats["timeouts"] == 1
+    print(f"[OK] 慢presolve回退验证耗时 {elapsed:.2f}s")
+
+
+def run_task(presolve):
+    latency = {"generate": 600, "validate": 600}
+    agents = create_agents(num_agents=4, malicious_ratio=0.0,
+                           llm_caller=LLMCaller(backend="mock", accuracy=1.0, latency=latency, cache=None))
+    network = Network(delay_range=(1, 2), packet_loss=0.0, seed=1)
+    for agent in agents:
+        network.register(agent)
+    bft = BFT4Agent(agents=agents, network=network, timeout=5.0, presolve=presolve)
+    start = time.monotonic()
+    result = bft.run({"task_id": "math_002", "content": "23 * 47 = ?", "type": "math"})
+    return result, bft.get_stats(), time.monotonic() - start
+
+
+def test_consensus_overlaps_generation():
+    """生成与验证重叠：presolve模式下所有backup答案一致，端到端耗时缩短"""
+    result, stats, plain_time = run_task(presolve=False)
+    assert result["success"] and stats["presolves_started"] == 0
+
+    result, stats, presolve_time = run_task(presolve=True)
+    assert result["success"] and result["answer"] == "1081"
+    assert stats["presolves_started"] == 3 and stats["presolve_matches"] == 3
+    assert presolve_time < plain_time - 0.3, (presolve_time, plain_time)
+    print(f"[OK] presolve端到端测试通过: {plain_time:.2f}s -> {presolve_time:.2f}s")
+
+
+def main():
+    test_vote_by_comparison()
+    test_stuck_presolve_does_not_hang()
+    test_slow_presolve_leaves_budget_for_validation()
+    test_consensus_overlaps_generation()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+测试提案内容寻址存储与按摘要拉取
+
+验证PREPARE/COMMIT只携带摘要，未收到PRE-PREPARE的副本能从其他副本拉取正文
+"""
+
+from agents import create_agents
+from clock import VirtualClock
+from consensus import BFT4Agent, ProposalStore, compute_proposal_digest
+from faults import FaultSchedule
+from llm_new import LLMCaller
+from network import Network
+from transfer import encode_proposal
+
+
+def test_store_is_content_addressed():
+    """摘要由内容决定，错误摘要被拒绝，容量有界"""
+    store = ProposalStore(capacity=2)
+    proposal = {"answer": "4", "reasoning": ["2+2=4"]}
+
+    digest = store.put(proposal)
+    assert digest == compute_proposal_digest(dict(reversed(list(proposal.items()))))
+    assert store.get(digest) == proposal
+
+    try:
+        store.put({"answer": "5"}, digest)
+        assert False, "摘要不一致时应抛出异常"
+    except ValueError:
+        pass
+
+    store.put({"answer": "6"})
+    store.put({"answer": "7"})
+    assert digest not in store and len(store) == 2
+    print("[OK] 内容寻址存储")
+
+
+def test_missing_body_is_pulled_from_peer():
+    """leader到agent_3的链路断开时，agent_3从其他副本拉取提案正文"""
+    agents = create_agents(
+        num_agents=4,
+        malicious_ratio=0.0,
+        llm_caller=LLMCaller(backend="mock", accuracy=1.0),
+    )
+    # 视图0的主节点是agent_1；单向切断agent_1 -> agent_3
+    schedule = FaultSchedule(seed=1, clock=VirtualClock()).link_loss(
+        "agent_1", "agent_3", loss=1.0, bidirectional=False
+    )
+    network = Network(delay_range=(1, 2), packet_loss=0.0, seed=1, fault_schedule=schedule)
+    for agent in agents:
+        network.register(agent)
+
+    bft = BFT4Agent(agents=agents, network=network, timeout=5.0)
+    result = bft.run({"task_id": "math_001", "content": "2 + 2 = ?", "type": "math"})
+
+    assert result["success"] and result["answer"] == "4"
+    stats = bft.get_stats()
+    assert stats["proposal_fetches"] >= 1
+    assert stats["proposal_fetch_failures"] == 0
+
+    by_type = network.snapshot()["by_type"]
+    assert by_type["PROPOSAL-RESPONSE"]["delivered"] >= 1
+    # 拉取请求由对方的收件箱handler应答，不在收件箱中堆积
+    assert by_type["PROPOSAL-REQUEST"]["delivered"] >= 1
+    assert all(not agent.inbox.drain("PROPOSAL-REQUEST") for agent in agents)
+    # 投票只携带摘要：单条PREPARE远小于单条PRE-PREPARE
+    prepare_size = by_type["PREPARE"]["bytes"] / by_type["PREPARE"]["messages"]
+    pre_prepare_size = by_type["PRE-PREPARE"]["bytes"] / by_type["PRE-PREPARE"]["messages"]
+    assert prepare_size < pre_prepare_size
+    print(f"[OK] 拉取正文 {stats['proposal_fetches']} 次; PREPARE {prepare_size:.0f}B vs PRE-PREPARE {pre_prepare_size:.0f}B")
+
+
+def test_request_answered_from_local_store():
+    """持有正文的副本回传PROPOSAL-RESPONSE；只持有分块时转发分块；都没有时不应答"""
+    agents = create_agents(num_agents=4, malicious_ratio=0.0)
+    network = Network(delay_range=(1, 2), packet_loss=0.0, seed=1)
+    for agent in agents:
+        network.register(agent)
+    bft = BFT4Agent(agents=agents, network=network, timeout=5.0)
+    holder, requester = bft.replicas["agent_2"], bft.replicas["agent_3"]
+    proposal = {"answer": "4", "reasoning": ["2+2=4"], "filler": "x" * 4096}
+    digest = holder.proposal_store.put(proposal)
+
+    request = {"type": "PROPOSAL-REQUEST", "data": {"digest": digest, "requester": "agent_3"}}
+    assert network.send(request, sender_id="agent_3", receiver_id="agent_4")
+    assert digest not in requester.proposal_store
+    assert network.send(request, sender_id="agent_3", receiver_id="agent_2")
+    assert requester.proposal_store.get(digest) == proposal
+
+    # 只持有部分分块的副本把分块转给请求方，凑齐后重建
+    chunks = encode_proposal(proposal, digest, data_chunks=2, parity_chunks=1)
+    bft.replicas["agent_4"].chunk_assembler.add(chunks[0])
+    bft.replicas["agent_1"].chunk_assembler.add(chunks[2])
+    fresh = bft.replicas["agent_2"]
+    fresh.proposal_store.clear()
+    request = {"type": "PROPOSAL-REQUEST", "data": {"digest": digest, "requester": "agent_2"}}
+    network.send(request, sender_id="agent_2", receiver_id="agent_4")
+    assert digest not in fresh.proposal_store
+    network.send(request, sender_id="agent_2", receiver_id="agent_1")
+    assert fresh.proposal_store.get(digest) == proposal
+    print("[OK] 拉取请求由本地存储应答")
+
+
+def main():
+    """运行所有测试"""
+    test_store_is_content_addressed()
+    test_missing_body_is_pulled_from_peer()
+    test_request_answered_from_local_store()
+    print("\n[OK] 所有提案存储测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+测试限速与重试
+"""
+import sys
+import os
+import asyncio
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from llm_modules.context import deadline_scope, remaining_time
+from llm_modules.ratelimit import (
+    DeadlineExceeded,
+    RateLimiter,
+    RetryPolicy,
+    RetryableError,
+    TokenBucket,
+    acall_with_retry,
+    call_with_retry,
+    classify_error,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeAPIError(Exception):
+    """模拟SDK的HTTP状态错误"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = FakeResponse(status_code, headers)
+        self.status_code = status_code
+
+
+def flaky(failures, error):
+    """前failures次调用抛出error"""
+    state = {"calls": 0}
+
+    def fn():
+        state["calls"] += 1
+        if state["calls"] <= failures:
+            raise error
+        return "ok"
+
+    return fn, state
+
+
+def test_token_bucket_pacing():
+    """测试令牌桶按速率放行"""
+    bucket = TokenBucket(rate=20, capacity=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[0] == 0 and waits[1] == 0
+    assert 0.04 <= waits[2] <= 0.06
+    assert 0.09 <= waits[3] <= 0.11
+    print("[OK] 令牌桶测试通过")
+
+
+def test_rate_limiter_throughput():
+    """测试请求数与token数双重限速"""
+    limiter = RateLimiter(requests_per_second=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        assert limiter.acquire()
+    elapsed = time.monotonic() - start
+    assert elapsed >= 0.09  # 5次等待 x 20ms
+    assert limiter.get_stats()["throttled"] == 5
+
+    # 每分钟600 token = 每秒10 token，第二个60 token的请求需等待约6秒，超出预算
+    tokens = RateLimiter(tokens_per_minute=600)
+    assert tokens.acquire(tokens=600, budget=0.1)
+    assert not tokens.acquire(tokens=60, budget=0.1)
+    assert tokens.get_stats()["rejected"] == 1
+
+    assert RateLimiter.from_config({"requests_per_second": None}) is None
+    print("[OK] 限速测试通过")
+
+
+def test_classify_error():
+    """测试可重试错误识别与Retry-After解析"""
+    assert classify_error(FakeAPIError(429, {"retry-after": "2"})) == (True, 2.0)
+    assert classify_error(FakeAPIError(503, {"retry-after-ms": "250"})) == (True, 0.25)
+    assert classify_error(FakeAPIError(400)) == (False, None)
+    assert classify_error(RetryableError("busy", 429, 1.5)) == (True, 1.5)
+    assert classify_error(TimeoutError())[0]
+    assert not classify_error(ValueError("bad"))[0]
+    print("[OK] 错误分类测试通过")
+
+
+def test_retry_until_success():
+    """测试429后退避重试成功"""
+    fn, state = flaky(2, FakeAPIError(429))
+    policy = RetryPolicy(max_retries=3, base_delay=0.01, max_delay=0.02, seed=1)
+    assert call_with_retry(fn, policy=policy) == "ok"
+    assert state["calls"] == 3
+
+    # 不可重试错误直接抛出
+    fn, state = flaky(1, FakeAPIError(400))
+    try:
+        call_with_retry(fn, policy=policy)
+        assert False, "400不应重试"
+    except FakeAPIError:
+        assert state["calls"] == 1
+
+    # 重试次数用尽
+    fn, state = flaky(10, FakeAPIError(500))
+    try:
+        call_with_retry(fn, policy=RetryPolicy(max_retries=2, base_delay=0.001))
+        assert False
+    except FakeAPIError:
+        assert state["calls"] == 3
+    print("[OK] 重试测试通过")
+
+
+def test_retry_after_respected():
+    """测试Retry-After作为等待下限"""
+    policy = RetryPolicy(base_delay=0.01, seed=0)
+    assert 0.2 <= policy.backoff(0, retry_after=0.2) <= 0.21
+    assert policy.backoff(10) <= policy.max_delay
+
+    fn, state = flaky(1, FakeAPIError(429, {"retry-after": "0.1"}))
+    start = time.monotonic()
+    assert call_with_retry(fn, policy=policy) == "ok"
+    assert time.monotonic() - start >= 0.1
+    print("[OK] Retry-After测试通过")
+
+
+def test_deadline_budget():
+    """测试共识阶段截止时间限制排队与退避"""
+    assert remaining_time() is None
+    with deadline_scope(1.0):
+        with deadline_scope(5.0):
+            assert remaining_time() <= 1.0  # 嵌套取更早的截止时间
+        fn, state = flaky(1, FakeAPIError(429, {"retry-after": "3"}))
+        try:
+            call_with_retry(fn, policy=RetryPolicy())
+            assert False, "Retry-After超出截止时间应放弃"
+        except DeadlineExceeded:
+            assert state["calls"] == 1
+    assert remaining_time() is None
+
+    limiter = RateLimiter(requests_per_second=1, burst=1)
+    limiter.acquire()
+    with deadline_scope(0.2):
+        try:
+            call_with_retry(lambda: "ok", limiter=limiter)
+            assert False, "排队时间超出截止时间应放弃"
+        except DeadlineExceeded:
+            pass
+    print("[OK] 截止时间测试通过")
+
+
+def test_async_retry():
+    """测试异步重试"""
+    state = {"calls": 0}
+
+    async def fn():
+        state["calls"] += 1
+        if state["calls"] == 1:
+            raise FakeAPIError(429)
+        return "ok"
+
+    policy = RetryPolicy(base_delay=0.01)
+    assert asyncio.run(acall_with_retry(fn, RateLimiter(requests_per_second=100), policy)) == "ok"
+    assert state["calls"] == 2
+    print("[OK] 异步重试测试通过")
+
+
+def main():
+    test_token_bucket_pacing()
+    test_rate_limiter_throughput()
+    test_classify_error()
+    test_retry_until_success()
+    test_retry_after_respected()
+    test_deadline_budget()
+    test_async_retry()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+测试leader自洽性采样（并发多次生成，按多数答案提案）
+"""
+import sys
+import os
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from agents import Agent, create_agents
+from conftest import FakeLLM, make_caller
+
+
+def make_leader(llm, samples):
+    caller = make_caller(llm, cache={"enabled": True, "calls": ["generate"]})
+    return Agent("agent_1", role="leader", llm_caller=caller, samples=samples)
+
+
+def test_majority_answer():
+    """多数答案胜出（"1081"与"1081.0"属于同一等价类），置信度为一致比例"""
+    llm = FakeLLM(answers=["1081", "1082", "1081.0", "1081", "999"], delay=0.1)
+    proposal = make_leader(llm, samples=5).propose({"task_id": "math_002", "content": "23 * 47 = ?", "type": "math"})
+    assert proposal["answer"] == "1081" and proposal["reasoning"][1] == "步骤2: 得出 1081"
+    assert proposal["confidence"] == 3 / 5
+    # 独立采样：不经过响应缓存
+    assert llm.generate_calls == 5
+    print("[OK] 多数答案测试通过")
+
+
+def test_samples_run_concurrently():
+    """k次采样在一个延迟窗口内完成"""
+    llm = FakeLLM(delay=0.2)
+    start = time.monotonic()
+    proposal = make_leader(llm, samples=4).propose({"task_id": "math_001", "content": "2 + 2 = ?", "type": "math"})
+    assert time.monotonic() - start < 0.6
+    assert proposal["answer"] == "4" and proposal["confidence"] == 1.0
+    print("[OK] 并发采样测试通过")
+
+
+def test_propose_inside_running_loop():
+    """在运行中的事件循环内提案：采样走同步接口，不新建事件循环"""
+    llm = FakeLLM(answers=["7", "7", "8"], delay=0.1)
+    leader = make_leader(llm, samples=3)
+
+    async def run():
+        return leader.propose({"task_id": "t", "content": "3 + 4 = ?", "type": "math"})
+
+    proposal = asyncio.run(run())
+    assert proposal["answer"] == "7" and proposal["confidence"] == 2 / 3
+    assert llm.generate_calls == 3
+    print("[OK] 事件循环内提案测试通过")
+
+
+def test_failed_samples_ignored():
+    llm = FakeLLM(answers=["Error", "7", "Error"])
+    proposal = make_leader(llm, samples=3).propose({"task_id": "t", "content": "3 + 4 = ?", "type": "math"})
+    assert proposal["answer"] == "7" and proposal["confidence"] == 1.0
+
+    llm = FakeLLM(answers="Error")
+    assert make_leader(llm, samples=2).propose({"task_id": "t", "content": "3 + 4 = ?"})["answer"] == "Error"
+    print("[OK] 失败采样测试通过")
+
+
+def test_config():
+    agents = create_agents(num_agents=2, malicious_ratio=0.0, self_consistency={"enabled": True, "samples": 3})
+    assert [agent.samples for agent in agents] == [3, 3]
+    agents = create_agents(num_agents=2, malicious_ratio=0.0, self_consistency={"enabled": False, "samples": 3})
+    assert [agent.samples for agent in agents] == [1, 1]
+    print("[OK] 配置测试通过")
+
+
+def main():
+    test_majority_answer()
+    test_samples_run_concurrently()
+    test_propose_inside_running_loop()
+    test_failed_samples_ignored()
+    test_config()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
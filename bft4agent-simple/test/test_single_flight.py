@@ -0,0 +1,111 @@
+"""
+测试single-flight请求合并
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from conftest import FakeLLM, make_caller
+from llm_modules.singleflight import SingleFlight
+
+
+def make_slow_caller(**kwargs):
+    kwargs.setdefault("single_flight", True)
+    return make_caller(FakeLLM(delay=0.1, name="slow"), **kwargs)
+
+
+def run_threads(target, count):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(target())) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_sync_coalescing():
+    """测试并发相同请求只调用一次后端"""
+    caller = make_slow_caller()
+    proposal = {"task_id": "t1", "answer": "4"}
+    results = run_threads(lambda: caller.validate(proposal), 6)
+    assert results == ["Y"] * 6
+    assert caller.llm.calls == 1
+    stats = caller.get_single_flight_stats()
+    assert stats["calls"] == 1 and stats["coalesced"] == 5
+    assert caller.single_flight.in_flight() == 0
+    print("[OK] 同步合并测试通过")
+
+
+def test_different_keys_not_coalesced():
+    """测试不同请求互不合并"""
+    caller = make_slow_caller()
+    counter = iter(range(100))
+    run_threads(lambda: caller.validate({"task_id": f"t{next(counter)}"}), 4)
+    assert caller.llm.calls == 4
+    print("[OK] 不同请求不合并测试通过")
+
+
+def test_independent_opt_out():
+    """测试independent=True得到独立采样"""
+    caller = make_slow_caller()
+    run_threads(lambda: caller.generate("1+1", independent=True), 3)
+    assert caller.llm.calls == 3
+
+    disabled = make_slow_caller(single_flight=False)
+    run_threads(lambda: disabled.validate({"task_id": "t1"}), 3)
+    assert disabled.llm.calls == 3
+    assert disabled.get_single_flight_stats() is None
+    print("[OK] 独立采样测试通过")
+
+
+def test_error_shared():
+    """测试异常传递给所有等待者，且不残留进行中记录"""
+    flight = SingleFlight()
+    errors = []
+
+    def failing():
+        time.sleep(0.05)
+        raise RuntimeError("boom")
+
+    def call():
+        try:
+            flight.do("k", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    run_threads(call, 3)
+    assert errors == ["boom"] * 3
+    assert flight.in_flight() == 0
+    assert flight.do("k", lambda: 42) == 42
+    print("[OK] 异常共享测试通过")
+
+
+def test_async_coalescing():
+    """测试异步调用在同一事件循环内合并"""
+    caller = make_slow_caller()
+    proposal = {"task_id": "t1", "answer": "4"}
+
+    async def run():
+        return await asyncio.gather(*(caller.avalidate(proposal) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["Y"] * 5
+    assert caller.llm.calls == 1
+    print("[OK] 异步合并测试通过")
+
+
+def main():
+    test_sync_coalescing()
+    test_different_keys_not_coalesced()
+    test_independent_opt_out()
+    test_error_shared()
+    test_async_coalescing()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+测试流式增量解析与提前结束
+"""
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from llm_modules.custom import CustomLLM
+from llm_modules.streaming import (
+    AnswerStreamParser,
+    DecisionStreamParser,
+    aconsume_stream,
+    consume_stream,
+)
+
+COMPLETION = (
+    "推理步骤1: 计算 2 + 3 = 5\n"
+    "推理步骤2: 再乘以 4 得 20\n"
+    "最终答案: 20\n"
+    "解释: 以上步骤说明了……这段文字很长，不需要等待它生成完毕\n"
+)
+
+
+def chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeStream:
+    """按固定大小切分文本的流式响应"""
+
+    def __init__(self, text, size=3):
+        self.pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        for piece in self.pieces:
+            self.read += 1
+            yield chunk(piece)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAsyncStream(FakeStream):
+    async def __aiter__(self):
+        for piece in self.pieces:
+            self.read += 1
+            yield chunk(piece)
+
+    async def close(self):
+        self.closed = True
+
+
+def parse_in_pieces(text, size):
+    parser = AnswerStreamParser()
+    for i in range(0, len(text), size):
+        if parser.feed(text[i:i + size]):
+            break
+    return parser
+
+
+def test_answer_parser_matches_full_parse():
+    """测试任意切分下结果与整段解析到最终答案行为止一致，且后续文字被丢弃"""
+    head = COMPLETION[:COMPLETION.index("解释")]
+    expected = CustomLLM._parse_generation(None, head)
+    for size in (1, 2, 5, 17):
+        parser = parse_in_pieces(COMPLETION, size)
+        assert parser.done
+        assert parser.result() == expected, (size, parser.result())
+        assert "以上步骤" not in parser.content
+    print("[OK] 增量解析一致性测试通过")
+
+
+def test_answer_on_next_line_and_no_newline():
+    """测试"最终答案:"为空时继续读取，以及流结束时处理最后一行"""
+    parser = parse_in_pieces("步骤1: 想一想\n最终答案:\n答案: 7", 4)
+    assert not parser.done
+    assert parser.result() == (["步骤1: 想一想"], "7")
+
+    parser = parse_in_pieces("直接给出结论 42", 4)
+    assert parser.result() == (["直接给出结论 42"], "")
+    print("[OK] 边界情况测试通过")
+
+
+def test_decision_parser():
+    """测试读到首个Y/N即结束"""
+    parser = DecisionStreamParser()
+    assert not parser.feed("  ")
+    assert parser.feed("y, 理由是……")
+    assert parser.result() == "Y"
+    assert DecisionStreamParser().result() == "N"
+    print("[OK] 验证结论解析测试通过")
+
+
+def test_consume_stream_stops_early():
+    """测试解析完成后关闭流，不再读取剩余内容"""
+    stream = FakeStream(COMPLETION)
+    parser = AnswerStreamParser()
+    assert consume_stream(stream, parser)
+    assert stream.closed
+    assert stream.read < len(stream.pieces)
+    assert parser.result()[1] == "20"
+
+    stream = FakeAsyncStream("N, 第二步的乘法算错了，正确结果应为1081")
+    parser = DecisionStreamParser()
+    assert asyncio.run(aconsume_stream(stream, parser))
+    assert stream.closed and stream.read == 1 and parser.result() == "N"
+    print("[OK] 提前结束测试通过")
+
+
+def test_backend_streaming():
+    """测试OpenAI兼容后端的流式调用路径"""
+    streams = []
+
+    def create(**kwargs):
+        assert kwargs["stream"] is True
+        text = "Y" if kwargs["max_tokens"] == 10 else COMPLETION
+        streams.append(FakeStream(text))
+        return streams[-1]
+
+    llm = CustomLLM.__new__(CustomLLM)
+    llm.model = "fake"
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    llm.streaming = True
+
+    reasoning, answer = llm.generate("2 + 3 再乘以 4")
+    assert answer == "20" and len(reasoning) == 2
+    assert llm.validate({"task_id": "t", "answer": "20"}) == "Y"
+    assert all(s.closed for s in streams)
+    assert streams[0].read < len(streams[0].pieces)
+    print("[OK] 后端流式调用测试通过")
+
+
+def main():
+    test_answer_parser_matches_full_parse()
+    test_answer_on_next_line_and_no_newline()
+    test_decision_parser()
+    test_consume_stream_stops_early()
+    test_backend_streaming()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
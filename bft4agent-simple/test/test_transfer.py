@@ -0,0 +1,135 @@
+"""
+测试提案压缩分块传输
+
+验证压缩往返、纠删码任意k块重建，以及共识中的分块分发
+"""
+
+import dataclasses
+import random
+
+from agents import create_agents
+from consensus import BFT4Agent, compute_proposal_digest
+from llm_new import LLMCaller
+from network import Network
+from transfer import ChunkAssembler, ErasureCoder, decode_proposal, encode_proposal
+
+
+def _long_proposal():
+    return {
+        "task_id": "math_005",
+        "answer": "1081",
+        "reasoning": [f"推理步骤{i}: 将23拆分为20+3，分别乘以47后相加" for i in range(200)],
+    }
+
+
+def test_erasure_any_k_of_n():
+    """任意k个块都能重建数据块"""
+    rng = random.Random(0)
+    k, m = 4, 2
+    coder = ErasureCoder(k, m)
+    data = [bytes(rng.randrange(256) for _ in range(64)) for _ in range(k)]
+    shards = data + coder.encode(data)
+
+    for _ in range(20):
+        kept = rng.sample(range(k + m), k)
+        assert coder.decode({i: shards[i] for i in kept}) == data
+    print("[OK] 纠删码: 任意4/6块可重建")
+
+
+def test_compressed_chunks_roundtrip():
+    """压缩后分块，丢掉m个块仍可重建，且总大小远小于原文"""
+    proposal = _long_proposal()
+    digest = compute_proposal_digest(proposal)
+    chunks = encode_proposal(proposal, digest, data_chunks=4, parity_chunks=2)
+
+    assert len(chunks) == 6
+    raw_size = len(str(proposal).encode("utf-8"))
+    chunk_bytes = sum(len(c.data) for c in chunks)
+    assert chunk_bytes < raw_size / 4
+
+    survivors = [chunks[1], chunks[3], chunks[4], chunks[5]]
+    assert decode_proposal(survivors) == proposal
+
+    assembler = ChunkAssembler()
+    assert assembler.add(chunks[0]) is None
+    assert assembler.add(chunks[5]) is None
+    assert assembler.add(chunks[2]) is None
+    assert assembler.add(chunks[4]) == proposal
+    assert assembler.add(chunks[1]) is None  # 已重建，忽略后续块
+    print(f"[OK] 压缩分块: 原文约{raw_size}B, 全部块{chunk_bytes}B ({chunks[0].codec})")
+
+
+def test_assembler_retry_and_eviction():
+    """损坏的块导致重建失败时，后续块到达后换一组重试；摘要条目有上限"""
+    proposal = _long_proposal()
+    digest = compute_proposal_digest(proposal)
+    chunks = encode_proposal(proposal, digest, data_chunks=2, parity_chunks=2)
+    corrupt = dataclasses.replace(chunks[0], data=bytes(len(chunks[0].data)))
+
+    verify = lambda body, d: compute_proposal_digest(body) == d
+    assembler = ChunkAssembler(verify=verify)
+    assert assembler.add(corrupt) is None
+    assert assembler.add(chunks[1]) is None  # 重建失败，未标记完成
+    assert assembler.pending(digest) == 2
+    assert assembler.add(chunks[2]) == proposal
+    assert assembler.pending(digest) == 0 and assembler.add(chunks[3]) is None
+
+    assembler = ChunkAssembler(capacity=2)
+    for i in range(5):
+        other = encode_proposal({"answer": str(i)}, f"d{i}", data_chunks=2, parity_chunks=0)
+        assembler.add(other[0])
+    assert [assembler.pending(f"d{i}") for i in range(5)] == [0, 0, 0, 1, 1]
+    assembler.discard("d4")
+    assert assembler.pending("d4") == 0
+    print("[OK] 重建失败重试与LRU淘汰")
+
+
+def test_chunked_dispersal_in_consensus():
+    """启用分块传输时，backup由分块重建正文并完成共识，leader上行流量下降"""
+    agents = create_agents(num_agents=5, malicious_ratio=0.0, llm_caller=LLMCaller(backend="mock", accuracy=1.0))
+    for agent in agents:
+        original_propose = agent.propose
+
+        def propose(task, _original=original_propose):
+            proposal = _original(task)
+            proposal["reasoning"] = proposal["reasoning"] + _long_proposal()["reasoning"]
+            return proposal
+
+        agent.propose = propose
+
+    network = Network(delay_range=(1, 2), packet_loss=0.0, seed=1)
+    for agent in agents:
+        network.register(agent)
+
+    bft = BFT4Agent(
+        agents=agents,
+        network=network,
+        proposal_transfer={"chunked": True, "parity": 1, "min_size": 1024},
+    )
+    result = bft.run({"task_id": "math_001", "content": "2 + 2 = ?", "type": "math"})
+
+    assert result["success"] and result["answer"] == "4"
+    stats = bft.get_stats()
+    assert stats["chunked_proposals"] == 1
+    assert stats["proposal_fetches"] == 0  # 所有backup都由分块重建
+
+    snapshot = network.snapshot()
+    leader_chunk_bytes = sum(
+        counters["bytes"] for link, counters in snapshot["by_link"].items() if link.startswith("agent_1->")
+    )
+    full_body = len(str(result["proposal"]).encode("utf-8"))
+    assert leader_chunk_bytes < full_body * 2  # 不分块时约为 4 x 正文
+    print(f"[OK] 分块分发: leader上行 {leader_chunk_bytes}B, 正文约 {full_body}B")
+
+
+def main():
+    """运行所有测试"""
+    test_erasure_any_k_of_n()
+    test_compressed_chunks_roundtrip()
+    test_assembler_retry_and_eviction()
+    test_chunked_dispersal_in_consensus()
+    print("\n[OK] 所有分块传输测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+测试副本的验证结论缓存（视图切换后对相同答案的提案直接复用结论）
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from agents import Agent, create_agents
+from conftest import FakeLLM, make_caller
+from consensus import BFT4Agent
+from llm_new import LLMCaller
+from network import Network
+from verdicts import VerdictCache, verdict_key
+
+
+def make_proposal(leader_id="agent_1", answer="1081", reasoning=("步骤1: 23 * 47", "步骤2: 得出 1081")):
+    return {"task_id": "math_002", "task_content": "23 * 47 = ?", "leader_id": leader_id,
+            "timestamp": 0, "answer": answer, "reasoning": list(reasoning), "confidence": 0.95}
+
+
+def make_agent(llm):
+    return Agent("agent_3", llm_caller=make_caller(llm), verdict_cache=VerdictCache())
+
+
+def test_key_ignores_leader_and_formatting():
+    """键只取决于任务、规范化答案与推理内容"""
+    base = make_proposal()
+    assert verdict_key(base) == verdict_key({**make_proposal(leader_id="agent_2"), "timestamp": 99})
+    assert verdict_key(base) == verdict_key(make_proposal(answer=" 1081。"))
+    assert verdict_key(base) == verdict_key(make_proposal(reasoning=("步骤1:  23 * 47", "步骤2: 得出 1081 ")))
+    assert verdict_key(base) != verdict_key(make_proposal(answer="1082"))
+    assert verdict_key(base) != verdict_key(make_proposal(reasoning=("另一种推理",)))
+    print("[OK] 缓存键测试通过")
+
+
+def test_reuse_across_leaders():
+    """新leader给出相同提案时不再调用LLM；弃权不缓存"""
+    llm = FakeLLM(decision="N")
+    agent = make_agent(llm)
+    assert agent.validate(make_proposal("agent_1"))["decision"] == "N"
+    assert agent.validate(make_proposal("agent_2"))["decision"] == "N"
+    assert llm.validate_calls == 1
+    assert agent.validate(make_proposal("agent_2", answer="999"))["decision"] == "N"
+    assert llm.validate_calls == 2
+
+    votes = agent.validate_batch([make_proposal("agent_4"), make_proposal(answer="7")])
+    assert [vote["decision"] for vote in votes] == ["N", "N"] and llm.validate_calls == 3
+    assert agent.verdict_cache.get_stats()["hits"] == 2
+
+    cache = VerdictCache(capacity=1)
+    cache.put(make_proposal(), "ABSTAIN")
+    assert len(cache) == 0
+    cache.put(make_proposal(), "Y")
+    cache.put(make_proposal(answer="7"), "N")
+    assert len(cache) == 1 and cache.get(make_proposal()) is None
+    assert VerdictCache.from_config({"enabled": False}) is None
+    print("[OK] 跨视图复用测试通过")
+
+
+def test_failure_not_reused():
+    """后端全部失败时的占位N不写入结论缓存，视图切换后重新验证"""
+    llm = FakeLLM(decision="Y")
+    agent = make_agent(llm)
+    llm.down = True
+    assert agent.validate(make_proposal("agent_1"))["decision"] == "N"
+    assert [vote["decision"] for vote in agent.validate_batch([make_proposal("agent_2")])] == ["N"]
+    assert len(agent.verdict_cache) == 0
+
+    # 后端恢复，新leader提出同一答案：得到真实结论并缓存
+    llm.down = False
+    assert agent.validate(make_proposal("agent_2"))["decision"] == "Y"
+    assert agent.validate(make_proposal("agent_4"))["decision"] == "Y"
+    assert len(agent.verdict_cache) == 1 and agent.verdict_cache.get_stats()["hits"] == 1
+    print("[OK] 失败结论不复用测试通过")
+
+
+def test_cleared_per_task():
+    """每个任务开始时清空，上一任务的结论不会带入"""
+    agents = create_agents(
+        num_agents=4,
+        malicious_ratio=0.0,
+        llm_caller=LLMCaller(backend="mock", accuracy=1.0, latency={"generate": 1, "validate": 1}),
+        verdict_cache={"enabled": True},
+    )
+    stale = make_proposal(answer="stale")
+    for agent in agents:
+        agent.verdict_cache.put(stale, "Y")
+
+    network = Network(delay_range=(1, 2), packet_loss=0.0, seed=1)
+    for agent in agents:
+        network.register(agent)
+    bft = BFT4Agent(agents=agents, network=network, timeout=5.0)
+    result = bft.run({"task_id": "math_001", "content": "2 + 2 = ?", "type": "math"})
+
+    assert result["success"] and result["answer"] == "4"
+    for agent in agents:
+        assert agent.verdict_cache.get(stale) is None
+    assert sum(len(agent.verdict_cache) for agent in agents) >= 3
+    print("[OK] 按任务清空测试通过")
+
+
+def main():
+    test_key_ignores_leader_and_formatting()
+    test_reuse_across_leaders()
+    test_failure_not_reused()
+    test_cleared_per_task()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
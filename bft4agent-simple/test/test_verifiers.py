@@ -0,0 +1,91 @@
+"""
+测试分层验证：确定性验证器先于LLM运行
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from agents import Agent
+from conftest import FakeLLM, make_caller
+from verifiers import ANY_TYPE, VerifierChain, arithmetic_verifier, format_verifier
+
+
+def make_proposal(content, answer, task_type="math", reasoning=("步骤1", "步骤2")):
+    return {"task_id": "t", "task_content": content, "task_type": task_type, "leader_id": "agent_1",
+            "timestamp": 0, "answer": answer, "reasoning": list(reasoning)}
+
+
+def make_agent(llm):
+    return Agent("agent_2", llm_caller=make_caller(llm), verifiers=VerifierChain.from_config({"enabled": True}))
+
+
+def test_builtin_verifiers():
+    assert arithmetic_verifier(make_proposal("23 * 47 = ?", "1081")) == "Y"
+    assert arithmetic_verifier(make_proposal("144 / 12 = ?", "12")) == "Y"
+    assert arithmetic_verifier(make_proposal("23 * 47 = ?", "1082")) == "N"
+    # 答案不是数字、任务不是纯算术题时无法判定
+    assert arithmetic_verifier(make_proposal("23 * 47 = ?", "一千零八十一")) is None
+    assert arithmetic_verifier(make_proposal("小明有5个苹果，吃了3个，还剩几个？", "2")) is None
+    assert format_verifier(make_proposal("2 + 2 = ?", "Error")) == "N"
+    assert format_verifier(make_proposal("2 + 2 = ?", "4", reasoning=())) == "N"
+    assert format_verifier(make_proposal("2 + 2 = ?", "4")) is None
+    print("[OK] 内置验证器测试通过")
+
+
+def test_registry_by_type():
+    """按任务类型选择验证器，类型族匹配子类型"""
+    calls = []
+    chain = VerifierChain().register(ANY_TYPE, lambda p: calls.append("any"))
+    chain.register("math", lambda p: calls.append("math"))
+    chain.register("math_trap", lambda p: "N")
+    assert chain.verify({"task_type": "logic"}) is None and calls == ["any"]
+    assert chain.verify({"task_type": "math_trap"}) == "N" and calls == ["any", "any", "math"]
+    assert chain.get_stats() == {"checked": 2, "accepted": 0, "rejected": 1, "deferred": 1}
+    assert VerifierChain.from_config({"enabled": False}) is None
+    try:
+        VerifierChain.from_config({"types": {"math": ["oracle"]}})
+        assert False
+    except ValueError:
+        pass
+    print("[OK] 按类型注册测试通过")
+
+
+def test_agent_skips_llm():
+    """可判定的提案不调用LLM，其余照常交给LLM"""
+    llm = FakeLLM()
+    agent = make_agent(llm)
+    assert agent.validate(make_proposal("23 * 47 = ?", "1081"))["decision"] == "Y"
+    assert agent.validate(make_proposal("23 * 47 = ?", "999"))["decision"] == "N"
+    assert llm.validate_calls == 0
+    assert agent.validate(make_proposal("如果所有的鸟都会飞，企鹅会飞吗？", "不会", task_type="logic"))["decision"] == "Y"
+    assert llm.validate_calls == 1
+
+    # 批量验证：只有验证器无法判定的提案进入LLM批次
+    votes = agent.validate_batch([
+        make_proposal("2 + 2 = ?", "5"),
+        make_proposal("谁大？", "小明", task_type="logic"),
+        make_proposal("5 * 6 = ?", "30"),
+    ])
+    assert [vote["decision"] for vote in votes] == ["N", "Y", "Y"]
+    assert llm.validate_calls == 2  # 只有一个提案到达LLM
+    print("[OK] Agent跳过LLM验证测试通过")
+
+
+def test_proposal_carries_task_type():
+    agent = Agent("agent_1", role="leader")
+    proposal = agent.propose({"task_id": "math_001", "content": "2 + 2 = ?", "type": "math"})
+    assert proposal["task_type"] == "math"
+    print("[OK] 提案携带任务类型测试通过")
+
+
+def main():
+    test_builtin_verifiers()
+    test_registry_by_type()
+    test_agent_skips_llm()
+    test_proposal_carries_task_type()
+    print("\n所有测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+大提案的压缩分块传输
+
+LLM推理链路可能有数KB，leader原本要把完整提案发给每个backup。这里:
+- 先压缩（有zstandard时用zstd，否则用标准库zlib）
+- 再切成k个数据块，可选附加m个纠删码校验块（GF(256)上的系统Reed-Solomon码），
+  任意k块即可重建
+- leader只需把不同的块分别发给不同backup，由backup互相转发，
+  leader上行流量从 (n-1) x 提案 降到约 (k+m)/k x 提案
+"""
+
+import itertools
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+
+CODEC_ZSTD = "zstd"
+CODEC_ZLIB = "zlib"
+CODEC_NONE = "none"
+
+# 重建失败时最多尝试的k块组合数
+MAX_DECODE_ATTEMPTS = 64
+
+
+def default_codec() -> str:
+    """可用的最优压缩算法"""
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+
+def compress(data: bytes, codec: Optional[str] = None) -> Tuple[str, bytes]:
+    """
+    压缩数据
+
+    Returns:
+        (实际使用的codec, 压缩后的数据)
+    """
+    codec = codec or default_codec()
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ImportError("pip install zstandard")
+        return codec, zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == CODEC_ZLIB:
+        return codec, zlib.compress(data, 6)
+    if codec == CODEC_NONE:
+        return codec, data
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """解压数据"""
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ImportError("pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    if codec == CODEC_NONE:
+        return data
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+# === GF(256) 运算（本原多项式 x^8+x^4+x^3+x^2+1）===
+
+_GF_EXP = [0] * 512
+_GF_LOG = [0] * 256
+_value = 1
+for _i in range(255):
+    _GF_EXP[_i] = _value
+    _GF_LOG[_value] = _i
+    _value <<= 1
+    if _value & 0x100:
+        _value ^= 0x11D
+for _i in range(255, 512):
+    _GF_EXP[_i] = _GF_EXP[_i - 255]
+
+
+def _gf_mul(a: int, b: int) -> int:
+    if a == 0 or b == 0:
+        return 0
+    return _GF_EXP[_GF_LOG[a] + _GF_LOG[b]]
+
+
+def _gf_inv(a: int) -> int:
+    if a == 0:
+        raise ZeroDivisionError("GF(256) inverse of 0")
+    return _GF_EXP[255 - _GF_LOG[a]]
+
+
+def _gf_pow(a: int, n: int) -> int:
+    if n == 0:
+        return 1
+    if a == 0:
+        return 0
+    return _GF_EXP[(_GF_LOG[a] * n) % 255]
+
+
+# 乘以常数c的查表（bytes.translate在C层完成逐字节乘法）
+_MUL_TABLES = [bytes(_gf_mul(c, x) for x in range(256)) for c in range(256)]
+
+
+def _scale(shard: bytes, c: int) -> int:
+    """c * shard，以大整数表示便于异或累加"""
+    if c == 0:
+        return 0
+    return int.from_bytes(shard.translate(_MUL_TABLES[c]), "big")
+
+
+def _mat_mul(a: List[List[int]], b: List[List[int]]) -> List[List[int]]:
+    result = []
+    for row in a:
+        out = []
+        for j in range(len(b[0])):
+            acc = 0
+            for t, value in enumerate(row):
+                acc ^= _gf_mul(value, b[t][j])
+            out.append(acc)
+        result.append(out)
+    return result
+
+
+def _mat_inv(matrix: List[List[int]]) -> List[List[int]]:
+    """GF(256)上的Gauss-Jordan求逆"""
+    size = len(matrix)
+    work = [list(row) + [1 if i == j else 0 for j in range(size)] for i, row in enumerate(matrix)]
+    for col in range(size):
+        pivot = next((r for r in range(col, size) if work[r][col]), None)
+        if pivot is None:
+            raise ValueError("Singular matrix")
+        work[col], work[pivot] = work[pivot], work[col]
+        inv = _gf_inv(work[col][col])
+        work[col] = [_gf_mul(v, inv) for v in work[col]]
+        for r in range(size):
+            if r != col and work[r][col]:
+                factor = work[r][col]
+                work[r] = [v ^ _gf_mul(factor, p) for v, p in zip(work[r], work[col])]
+    return [row[size:] for row in work]
+
+
+class ErasureCoder:
+    """系统Reed-Solomon纠删码：k个数据块 + m个校验块，任意k块可重建"""
+
+    def __init__(self, data_shards: int, parity_shards: int):
+        if data_shards < 1 or parity_shards < 0 or data_shards + parity_shards > 255:
+            raise ValueError(f"Invalid shard counts: k={data_shards}, m={parity_shards}")
+        self.k = data_shards
+        self.m = parity_shards
+        total = data_shards + parity_shards
+
+        # 编码矩阵 = Vandermonde * inv(Vandermonde前k行)，前k行为单位阵（系统码）
+        vandermonde = [[_gf_pow(i, j) for j in range(self.k)] for i in range(total)]
+        top_inv = _mat_inv(vandermonde[:self.k])
+        self.matrix = _mat_mul(vandermonde, top_inv)
+
+    def encode(self, shards: List[bytes]) -> List[bytes]:
+        """由k个等长数据块计算m个校验块"""
+        if len(shards) != self.k:
+            raise ValueError(f"Expected {self.k} data shards, got {len(shards)}")
+        size = len(shards[0])
+        parity = []
+        for row in self.matrix[self.k:]:
+            acc = 0
+            for coeff, shard in zip(row, shards):
+                acc ^= _scale(shard, coeff)
+            parity.append(acc.to_bytes(size, "big"))
+        return parity
+
+    def decode(self, available: Dict[int, bytes]) -> List[bytes]:
+        """
+        由任意k个块（序号 -> 数据）重建全部k个数据块
+        """
+        if len(available) < self.k:
+            raise ValueError(f"Need {self.k} shards to reconstruct, got {len(available)}")
+
+        indices = sorted(available)[:self.k]
+        if indices == list(range(self.k)):
+            return [available[i] for i in indices]
+
+        size = len(available[indices[0]])
+        decode_matrix = _mat_inv([self.matrix[i] for i in indices])
+        data = []
+        for row in decode_matrix:
+            acc = 0
+            for coeff, index in zip(row, indices):
+                acc ^= _scale(available[index], coeff)
+            data.append(acc.to_bytes(size, "big"))
+        return data
+
+
+@dataclass
+class ProposalChunk:
+    """提案分块"""
+    digest: str  # 提案内容摘要
+    index: int  # 块序号（0..k-1为数据块，k..k+m-1为校验块）
+    data_chunks: int  # k
+    parity_chunks: int  # m
+    codec: str
+    payload_length: int  # 压缩后数据长度（去除末块填充）
+    data: bytes = b""
+
+
+def encode_proposal(
+    proposal: Dict,
+    digest: str,
+    data_chunks: int,
+    parity_chunks: int = 0,
+    codec: Optional[str] = None,
+) -> List[ProposalChunk]:
+    """
+    将提案压缩并切分为 data_chunks + parity_chunks 个块
+
+    Args:
+        proposal: 提案正文
+        digest: 提案内容摘要（重建后用于校验）
+        data_chunks: 数据块数k
+        parity_chunks: 校验块数m（0表示不做纠删码，需要收齐全部数据块）
+        codec: 压缩算法，None表示自动选择
+    """
+    raw = json.dumps(proposal, ensure_ascii=False, default=str).encode("utf-8")
+    codec, payload = compress(raw, codec)
+
+    k = max(1, min(data_chunks, len(payload)))
+    chunk_size = -(-len(payload) // k)
+    padded = payload.ljust(chunk_size * k, b"\0")
+    shards = [padded[i * chunk_size:(i + 1) * chunk_size] for i in range(k)]
+    if parity_chunks:
+        shards += ErasureCoder(k, parity_chunks).encode(shards)
+
+    return [
+        ProposalChunk(
+            digest=digest,
+            index=i,
+            data_chunks=k,
+            parity_chunks=parity_chunks,
+            codec=codec,
+            payload_length=len(payload),
+            data=shard,
+        )
+        for i, shard in enumerate(shards)
+    ]
+
+
+def decode_proposal(chunks: List[ProposalChunk]) -> Dict:
+    """
+    由收到的块重建提案（需至少k个不同序号的块）
+
+    Raises:
+        ValueError: 块不足或块元数据不一致
+    """
+    if not chunks:
+        raise ValueError("No chunks")
+    first = chunks[0]
+    available = {c.index: c.data for c in chunks if c.digest == first.digest}
+    if len(available) < first.data_chunks:
+        raise ValueError(f"Need {first.data_chunks} chunks, got {len(available)}")
+
+    if first.parity_chunks:
+        shards = ErasureCoder(first.data_chunks, first.parity_chunks).decode(available)
+    else:
+        shards = [available[i] for i in range(first.data_chunks)]
+
+    payload = b"".join(shards)[:first.payload_length]
+    return json.loads(decompress(payload, first.codec).decode("utf-8"))
+
+
+class ChunkAssembler:
+    """按摘要收集分块，收齐k块后重建提案"""
+
+    def __init__(self, capacity: int = 64, verify: Optional[Callable[[Dict, str], bool]] = None):
+        """
+        Args:
+            capacity: 未完成与已完成的摘要各自最多保留的条数（LRU淘汰）
+            verify: (proposal, digest) -> bool，校验重建的正文与摘要一致
+        """
+        self.capacity = capacity
+        self.verify = verify
+        self._chunks: "OrderedDict[str, Dict[int, ProposalChunk]]" = OrderedDict()
+        self._completed: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, chunk: ProposalChunk) -> Optional[Dict]:
+        """
+        加入一个块（已重建过的提案的后续块直接忽略）
+
+        重建失败（块损坏或与摘要不符）时保留已收到的块，后续块到达后换一组块重试
+
+        Returns:
+            本次加入后块已足够时返回重建的提案，否则返回None
+        """
+        with self._lock:
+            if chunk.digest in self._completed:
+                return None
+            received = self._chunks.get(chunk.digest)
+            if received is None:
+                received = self._chunks[chunk.digest] = {}
+                while len(self._chunks) > self.capacity:
+                    self._chunks.popitem(last=False)
+            received[chunk.index] = chunk
+            if len(received) < chunk.data_chunks:
+                return None
+            candidates = list(received.values())
+
+        proposal = self._decode(candidates, chunk.digest)
+        if proposal is None:
+            return None
+        with self._lock:
+            if chunk.digest in self._completed:
+                return None
+            self._chunks.pop(chunk.digest, None)
+            self._completed[chunk.digest] = None
+            while len(self._completed) > self.capacity:
+                self._completed.popitem(last=False)
+        return proposal
+
+    def _decode(self, chunks: List[ProposalChunk], digest: str) -> Optional[Dict]:
+        """依次尝试k块组合（最多MAX_DECODE_ATTEMPTS组），返回第一个通过校验的正文"""
+        k = chunks[0].data_chunks
+        ordered = sorted(chunks, key=lambda c: c.index)
+        for subset in itertools.islice(itertools.combinations(ordered, k), MAX_DECODE_ATTEMPTS):
+            try:
+                proposal = decode_proposal(list(subset))
+            except Exception:
+                # 损坏的块可能在纠删解码、解压或JSON解析任一环节失败
+                continue
+            if self.verify is None or self.verify(proposal, digest):
+                return proposal
+        return None
+
+    def discard(self, digest: str):
+        """丢弃某个提案的分块与完成记录"""
+        with self._lock:
+            self._chunks.pop(digest, None)
+            self._completed.pop(digest, None)
+
+    def held(self, digest: str) -> List[ProposalChunk]:
+        """已收到但尚未重建的块（用于应答其他副本的拉取请求）"""
+        with self._lock:
+            return list(self._chunks.get(digest, {}).values())
+
+    def pending(self, digest: str) -> int:
+        """已收到但尚未重建的块数"""
+        return len(self._chunks.get(digest, {}))
+
+    def clear(self):
+        with self._lock:
+            self._chunks.clear()
+            self._completed.clear()
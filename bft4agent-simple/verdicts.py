@@ -0,0 +1,84 @@
+"""
+每个副本的验证结论缓存
+
+视图切换后新leader往往给出相同的答案，副本无需再为已评价过的提案调用LLM。
+结论按 (任务内容哈希, 答案等价类, 推理摘要) 缓存，与leader ID、时间戳无关，
+因此跨视图仍能命中；BFT4Agent.run在每个任务开始时清空。
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from answers import answer_class
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def reasoning_digest(reasoning) -> str:
+    """推理过程摘要（忽略各步骤内的空白差异）"""
+    if isinstance(reasoning, str):
+        reasoning = [reasoning]
+    return _digest("\n".join(" ".join(str(step).split()) for step in reasoning or []))
+
+
+def verdict_key(proposal: Dict) -> Tuple[str, int, str]:
+    return (
+        _digest(proposal.get("task_content", "")),
+        answer_class(proposal.get("answer", "")),
+        reasoning_digest(proposal.get("reasoning", [])),
+    )
+
+
+class VerdictCache:
+    """提案语义内容 -> Y/N 的LRU缓存（线程安全）"""
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self._verdicts: "OrderedDict[Tuple[str, int, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    @classmethod
+    def from_config(cls, spec) -> Optional["VerdictCache"]:
+        """spec: {"enabled": True, "capacity": 1024}，为空或未启用时返回None"""
+        if not spec or not spec.get("enabled", True):
+            return None
+        return cls(capacity=spec.get("capacity", 1024))
+
+    def get(self, proposal: Dict) -> Optional[str]:
+        key = verdict_key(proposal)
+        with self._lock:
+            decision = self._verdicts.get(key)
+            if decision is None:
+                self.stats["misses"] += 1
+                return None
+            self._verdicts.move_to_end(key)
+            self.stats["hits"] += 1
+            return decision
+
+    def put(self, proposal: Dict, decision: str):
+        """记录结论（弃权不缓存）"""
+        if decision not in ("Y", "N"):
+            return
+        key = verdict_key(proposal)
+        with self._lock:
+            self._verdicts[key] = decision
+            self._verdicts.move_to_end(key)
+            self.stats["stores"] += 1
+            while len(self._verdicts) > self.capacity:
+                self._verdicts.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._verdicts.clear()
+
+    def __len__(self):
+        return len(self._verdicts)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
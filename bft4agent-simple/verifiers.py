@@ -0,0 +1,131 @@
+"""
+确定性验证器（分层验证的第一层）
+
+Agent.validate在调用LLM之前先运行按任务类型注册的验证器链：
+能确定性判定的提案（纯算术题、格式不合法的提案）直接得出Y/N，
+只有验证器无法判定的提案才交给LLM。
+
+验证器是 (proposal) -> "Y" | "N" | None 的函数，None表示无法判定、交给下一个验证器。
+"""
+
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+import arith
+from answers import to_number
+
+Verifier = Callable[[Dict], Optional[str]]
+
+# 任意类型都运行的验证器注册在该键下
+ANY_TYPE = "*"
+
+# 整个任务即为一道算术题，如 "23 * 47 = ?"
+_PURE_ARITHMETIC = re.compile(r"^[\d.\s+\-*/%^×÷()（）]+=\s*[?？]?\s*$")
+# 生成失败时各后端返回的占位答案
+_FAILED_ANSWERS = {"", "无", "Error"}
+
+
+def format_verifier(proposal: Dict) -> Optional[str]:
+    """提案缺少答案或推理过程时直接否决"""
+    answer = str(proposal.get("answer", "") or "").strip()
+    if answer in _FAILED_ANSWERS or not proposal.get("reasoning"):
+        return "N"
+    return None
+
+
+def arithmetic_verifier(proposal: Dict) -> Optional[str]:
+    """任务是纯算术表达式时精确计算并比对答案；答案不是数字时交给LLM"""
+    content = proposal.get("task_content", "")
+    if not _PURE_ARITHMETIC.match(content):
+        return None
+    solved = arith.solve(content)
+    if solved is None:
+        return None
+    proposed = to_number(proposal.get("answer", ""))
+    if proposed is None:
+        return None
+    return "Y" if abs(proposed - solved[1]) < 1e-6 else "N"
+
+
+# 可在配置中按名称引用的内置验证器
+BUILTIN_VERIFIERS: Dict[str, Verifier] = {
+    "format": format_verifier,
+    "arithmetic": arithmetic_verifier,
+}
+
+# 默认注册：所有类型做格式检查，math类做算术验证
+DEFAULT_REGISTRY = {
+    ANY_TYPE: ["format"],
+    "math": ["arithmetic"],
+}
+
+
+class VerifierChain:
+    """按任务类型注册的验证器链（可在多个Agent间共享）"""
+
+    def __init__(self):
+        self._verifiers: Dict[str, List[Verifier]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"checked": 0, "accepted": 0, "rejected": 0, "deferred": 0}
+
+    @classmethod
+    def from_config(cls, spec) -> Optional["VerifierChain"]:
+        """
+        由配置创建
+
+        spec: {"enabled": True, "types": {"*": ["format"], "math": ["arithmetic"]}}，
+        省略types时使用DEFAULT_REGISTRY；spec为空或未启用时返回None
+        """
+        if not spec or not spec.get("enabled", True):
+            return None
+        chain = cls()
+        for task_type, names in (spec.get("types") or DEFAULT_REGISTRY).items():
+            for name in names:
+                if name not in BUILTIN_VERIFIERS:
+                    raise ValueError(f"Unknown verifier: {name}")
+                chain.register(task_type, BUILTIN_VERIFIERS[name])
+        return chain
+
+    def register(self, task_type: str, verifier: Verifier) -> "VerifierChain":
+        """
+        注册验证器
+
+        Args:
+            task_type: 任务类型（如 "math"；"math"同时匹配 "math_basic" 等子类型），ANY_TYPE匹配所有类型
+            verifier: (proposal) -> "Y" | "N" | None
+        """
+        self._verifiers.setdefault(task_type, []).append(verifier)
+        return self
+
+    def verifiers_for(self, task_type: Optional[str]) -> List[Verifier]:
+        """依次为: 通用验证器、类型族（"math_basic"的"math"）、精确类型"""
+        chain = list(self._verifiers.get(ANY_TYPE, []))
+        if task_type:
+            family = task_type.split("_", 1)[0]
+            if family != task_type:
+                chain.extend(self._verifiers.get(family, []))
+            chain.extend(self._verifiers.get(task_type, []))
+        return chain
+
+    def verify(self, proposal: Dict) -> Optional[str]:
+        """
+        运行验证器链
+
+        Returns:
+            第一个给出结论的验证器的 "Y"/"N"；都无法判定时为None（需要LLM验证）
+        """
+        decision = None
+        for verifier in self.verifiers_for(proposal.get("task_type")):
+            decision = verifier(proposal)
+            if decision is not None:
+                break
+        key = {"Y": "accepted", "N": "rejected"}.get(decision, "deferred")
+        with self._lock:
+            self.stats["checked"] += 1
+            self.stats[key] += 1
+        return decision
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)